@@ -1,6 +1,8 @@
 import flet as ft
 import os
 import sys
+import threading
+from functools import partial
 from pathlib import Path
 
 # Agregar el directorio scripts al path para importar las funciones
@@ -10,36 +12,70 @@ if scripts_path not in sys.path:
 
 # Importaciones de los scripts con manejo de errores
 try:
-    from estructurar_sua_mod import estructurar_1sua_destino, estructurar_varios_suas
-    from estructurar_emision_mod import estrucurar_varias_emisiones_destino, estructurar_1emision
-    from estructurar_visor import estructurar_visor
+    from estructurar_sua_mod import estructurar_1sua, estructurar_suas, guardar_sua_excel
+    from estructurar_emision_mod import estructurar_emision, estructurar_emisiones, guardar_emision_excel
+    from estructurar_visor import estructurar_visor_datos, guardar_visor_excel, buscar_archivos_visor
     from confronta import sua_vs_emision
+    from salida_formatos import guardar_en_formatos
+    from buscar_archivos import buscar_archivos
 except ImportError as e:
     print(f"Error importando módulos: {e}")
     # Definir funciones dummy para evitar errores en tiempo de ejecución
-    def estructurar_1sua_destino(*args, **kwargs):
-        print("Función estructurar_1sua_destino no disponible")
+    def sua_vs_emision(*args, **kwargs):
+        print("Función sua_vs_emision no disponible")
         return None
     
-    def estructurar_varios_suas(*args, **kwargs):
-        print("Función estructurar_varios_suas no disponible")
+    def estructurar_1sua(*args, **kwargs):
+        print("Función estructurar_1sua no disponible")
         return None
     
-    def estrucurar_varias_emisiones_destino(*args, **kwargs):
-        print("Función estrucurar_varias_emisiones_destino no disponible")
+    def estructurar_suas(*args, **kwargs):
+        print("Función estructurar_suas no disponible")
         return None
     
-    def estructurar_1emision(*args, **kwargs):
-        print("Función estructurar_1emision no disponible")
+    def estructurar_emision(*args, **kwargs):
+        print("Función estructurar_emision no disponible")
         return None
-        
-    def estructurar_visor(*args, **kwargs):
-        print("Función estructurar_visor no disponible")
+    
+    def estructurar_emisiones(*args, **kwargs):
+        print("Función estructurar_emisiones no disponible")
         return None
-        
-    def sua_vs_emision(*args, **kwargs):
-        print("Función sua_vs_emision no disponible")
+    
+    def estructurar_visor_datos(*args, **kwargs):
+        print("Función estructurar_visor_datos no disponible")
+        return None
+    
+    def guardar_sua_excel(*args, **kwargs):
+        print("Función guardar_sua_excel no disponible")
+        return None
+    
+    def guardar_emision_excel(*args, **kwargs):
+        print("Función guardar_emision_excel no disponible")
+        return None
+    
+    def guardar_visor_excel(*args, **kwargs):
+        print("Función guardar_visor_excel no disponible")
         return None
+    
+    def guardar_en_formatos(*args, **kwargs):
+        print("Función guardar_en_formatos no disponible")
+        return []
+    
+    def buscar_archivos(*args, **kwargs):
+        print("Función buscar_archivos no disponible")
+        return []
+    
+    def buscar_archivos_visor(*args, **kwargs):
+        print("Función buscar_archivos_visor no disponible")
+        return {}
+
+# Opciones del formato de salida: clave del dropdown -> formatos a guardar
+OPCIONES_FORMATO_SALIDA = {
+    "xlsx": ("xlsx",),
+    "parquet": ("parquet",),
+    "arrow": ("arrow",),
+    "xlsx+parquet": ("xlsx", "parquet"),
+}
 
 class ConfrontasPage(ft.Container):
     def __init__(self, page: ft.Page, navigate_to_home_callback=None, navigate_to_checklist_callback=None, navigate_to_webscrap_callback=None):
@@ -69,6 +105,15 @@ class ConfrontasPage(ft.Container):
         self.selected_output_folder = None
         self.selected_visor_folder = None
         
+        # Los SUA y emisiones estructurados se confrontan en memoria; el Excel intermedio es opcional
+        self.guardar_estructurados = True
+        
+        # Agregar los SUA leídos al historial de SUA es opcional
+        self.agregar_historial = False
+        
+        # Formato de los archivos generados (estructurados y confronta)
+        self.formato_salida = ("xlsx",)
+        
         # Referencias a elementos
         self.main_content_ref = ft.Ref[ft.Container]()
         self.terminal_ref = ft.Ref[ft.Container]()
@@ -403,6 +448,10 @@ class ConfrontasPage(ft.Container):
                     ),
                     on_click=self._select_output_folder
                 ),
+                # Casillas para guardar los estructurados y agregar los SUA al historial, y formato de salida
+                self._create_guardar_estructurados_checkbox(),
+                self._create_agregar_historial_checkbox(),
+                self._create_formato_salida_dropdown(),
                 # Botón Confrontar
                 ft.ElevatedButton(
                     text="⚔️ Confrontar",
@@ -459,6 +508,10 @@ class ConfrontasPage(ft.Container):
                     ),
                     on_click=self._select_output_folder
                 ),
+                # Casillas para guardar los estructurados y agregar los SUA al historial, y formato de salida
+                self._create_guardar_estructurados_checkbox(),
+                self._create_agregar_historial_checkbox(),
+                self._create_formato_salida_dropdown(),
                 # Botón Confrontar
                 ft.ElevatedButton(
                     text="⚔️ Confrontar",
@@ -535,6 +588,10 @@ class ConfrontasPage(ft.Container):
                     ),
                     on_click=self._select_output_folder
                 ),
+                # Casillas para guardar los estructurados y agregar los SUA al historial, y formato de salida
+                self._create_guardar_estructurados_checkbox(),
+                self._create_agregar_historial_checkbox(),
+                self._create_formato_salida_dropdown(),
                 # Botón Confrontar
                 ft.ElevatedButton(
                     text="⚔️ Confrontar",
@@ -611,6 +668,10 @@ class ConfrontasPage(ft.Container):
                     ),
                     on_click=self._select_output_folder
                 ),
+                # Casillas para guardar los estructurados y agregar los SUA al historial, y formato de salida
+                self._create_guardar_estructurados_checkbox(),
+                self._create_agregar_historial_checkbox(),
+                self._create_formato_salida_dropdown(),
                 # Botón Confrontar
                 ft.ElevatedButton(
                     text="⚔️ Confrontar",
@@ -667,6 +728,10 @@ class ConfrontasPage(ft.Container):
                     ),
                     on_click=self._select_output_folder
                 ),
+                # Casillas para guardar los estructurados y agregar los SUA al historial, y formato de salida
+                self._create_guardar_estructurados_checkbox(),
+                self._create_agregar_historial_checkbox(),
+                self._create_formato_salida_dropdown(),
                 # Botón Confrontar
                 ft.ElevatedButton(
                     text="⚔️ Confrontar",
@@ -738,6 +803,47 @@ class ConfrontasPage(ft.Container):
             ]
         )
 
+    def _create_guardar_estructurados_checkbox(self):
+        """Casilla para guardar también el SUA y la emisión estructurados"""
+        return ft.Checkbox(
+            label="Guardar estructurados",
+            value=self.guardar_estructurados,
+            on_change=self._on_guardar_estructurados_change
+        )
+
+    def _on_guardar_estructurados_change(self, e):
+        self.guardar_estructurados = e.control.value
+
+    def _create_agregar_historial_checkbox(self):
+        """Casilla para agregar los SUA leídos al historial de SUA"""
+        return ft.Checkbox(
+            label="Agregar SUA al historial",
+            value=self.agregar_historial,
+            on_change=self._on_agregar_historial_change
+        )
+
+    def _on_agregar_historial_change(self, e):
+        self.agregar_historial = e.control.value
+
+    def _create_formato_salida_dropdown(self):
+        """Selector del formato de los archivos generados (Excel, Parquet o Arrow IPC)"""
+        seleccion = next(clave for clave, formatos in OPCIONES_FORMATO_SALIDA.items() if formatos == self.formato_salida)
+        return ft.Dropdown(
+            label="Formato de salida",
+            width=250,
+            value=seleccion,
+            options=[
+                ft.dropdown.Option("xlsx", "Excel (.xlsx)"),
+                ft.dropdown.Option("parquet", "Parquet"),
+                ft.dropdown.Option("arrow", "Arrow IPC"),
+                ft.dropdown.Option("xlsx+parquet", "Excel + Parquet"),
+            ],
+            on_change=self._on_formato_salida_change
+        )
+
+    def _on_formato_salida_change(self, e):
+        self.formato_salida = OPCIONES_FORMATO_SALIDA[e.control.value]
+
     def _create_default_content(self):
         """Contenido por defecto"""
         return ft.Container(
@@ -802,6 +908,22 @@ class ConfrontasPage(ft.Container):
             )
             self.page.update()
 
+    def _listar_en_segundo_plano(self, listar, mensaje):
+        """
+        Lista la carpeta elegida en un hilo aparte, para no congelar la página en unidades de
+        red lentas, y reporta cuántos elementos encontró. El listado queda en memoria
+        (buscar_archivos), así que al estructurar la carpeta solo se revisa si cambió.
+        """
+        def tarea():
+            try:
+                encontrados = listar()
+            except Exception as ex:
+                self._add_terminal_message(f"[WARNING] No se pudo listar la carpeta: {ex}", self.grey_color)
+                return
+            self._add_terminal_message(f"{mensaje}: {len(encontrados)}", "black")
+        
+        threading.Thread(target=tarea, daemon=True).start()
+
     def _clear_terminal(self):
         """Limpiar el terminal"""
         if self.terminal_ref.current:
@@ -859,27 +981,27 @@ class ConfrontasPage(ft.Container):
             
             # Paso 1: Estructurar archivo SUA
             self._add_terminal_message("[INFO] Estructurando archivo .SUA...", "black")
-            sua_excel_path = self._estructurar_sua_with_output_folder(self.selected_sua_file, self.selected_output_folder)
+            sua_estructurado = self._estructurar_sua_with_output_folder(self.selected_sua_file, self.selected_output_folder)
             
-            if not sua_excel_path:
+            if not sua_estructurado:
                 self._add_terminal_message("[ERROR] Error al estructurar archivo .SUA", "red")
                 return
             
-            self._add_terminal_message(f"[SUCCESS] SUA estructurado: {os.path.basename(sua_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] SUA estructurado: {sua_estructurado['nombre']}", "black")
             
             # Paso 2: Estructurar emisiones
             self._add_terminal_message("[INFO] Estructurando archivos de emisión...", "black")
-            emision_excel_path = self._estructurar_emisiones_with_output_folder(self.selected_emissions_folder, self.selected_output_folder)
+            emision_estructurada = self._estructurar_emisiones_with_output_folder(self.selected_emissions_folder, self.selected_output_folder)
             
-            if not emision_excel_path:
+            if not emision_estructurada:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos de emisión", "red")
                 return
                 
-            self._add_terminal_message(f"[SUCCESS] Emisiones estructuradas: {os.path.basename(emision_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] Emisiones estructuradas: {emision_estructurada['nombre']}", "black")
             
             # Paso 3: Realizar confrontación
             self._add_terminal_message("[INFO] Iniciando confrontación SUA vs Emisión...", "black")
-            confronta_result = sua_vs_emision(sua_excel_path, emision_excel_path, self.selected_output_folder)
+            confronta_result = sua_vs_emision(sua_estructurado, emision_estructurada, self.selected_output_folder, self.formato_salida)
             
             if confronta_result:
                 self._add_terminal_message(f"[SUCCESS] Confrontación completada: {os.path.basename(confronta_result)}", "black")
@@ -890,61 +1012,42 @@ class ConfrontasPage(ft.Container):
         except Exception as e:
             self._add_terminal_message(f"[ERROR] Error inesperado: {str(e)}", "red")
 
-    def _estructurar_sua_with_output_folder(self, sua_path, output_folder):
-        """Estructurar archivo SUA guardando en la carpeta de destino"""
+    def _estructurar_en_memoria(self, estructurar, guardar_excel, origen, output_folder, descripcion):
+        """
+        Estructurar en memoria para confrontar sin releer Excel; si está marcada la casilla,
+        guardar también el Excel estructurado en la carpeta de destino
+        """
         try:
-            # Usar la función modificada que acepta carpeta de destino
-            result_path = estructurar_1sua_destino(sua_path, output_folder)
+            estructurado = estructurar(origen)
+            if not estructurado:
+                return None
             
-            if result_path and os.path.exists(result_path):
-                return result_path
-            return None
+            if self.guardar_estructurados:
+                for ruta in guardar_en_formatos(estructurado, output_folder, self.formato_salida, guardar_excel):
+                    self._add_terminal_message(f"[INFO] Archivo guardado: {os.path.basename(ruta)}", "black")
+            return estructurado
             
         except Exception as e:
-            self._add_terminal_message(f"[ERROR] Error al estructurar SUA: {str(e)}", "red")
+            self._add_terminal_message(f"[ERROR] Error al estructurar {descripcion}: {str(e)}", "red")
             return None
 
+    def _estructurar_sua_with_output_folder(self, sua_path, output_folder):
+        """Estructurar archivo SUA (y agregarlo al historial si se pidió), guardando el Excel en la carpeta de destino si se pidió"""
+        return self._estructurar_en_memoria(partial(estructurar_1sua, historial=self.agregar_historial), guardar_sua_excel,
+                                            sua_path, output_folder, "SUA")
+
     def _estructurar_emisiones_with_output_folder(self, emissions_folder, output_folder):
-        """Estructurar emisiones guardando en la carpeta de destino"""
-        try:
-            # Usar la función modificada que acepta carpeta de destino
-            result_path = estrucurar_varias_emisiones_destino(emissions_folder, output_folder)
-            
-            if result_path and os.path.exists(result_path):
-                return result_path
-            return None
-            
-        except Exception as e:
-            self._add_terminal_message(f"[ERROR] Error al estructurar emisiones: {str(e)}", "red")
-            return None
+        """Estructurar emisiones, guardando el Excel en la carpeta de destino si se pidió"""
+        return self._estructurar_en_memoria(estructurar_emisiones, guardar_emision_excel, emissions_folder, output_folder, "emisiones")
 
     def _estructurar_varios_suas_with_output_folder(self, sua_folder, output_folder):
-        """Estructurar múltiples archivos SUA guardando en la carpeta de destino"""
-        try:
-            # Usar la función modificada que acepta carpeta de destino
-            result_path = estructurar_varios_suas(sua_folder, output_folder)
-            
-            if result_path and os.path.exists(result_path):
-                return result_path
-            return None
-            
-        except Exception as e:
-            self._add_terminal_message(f"[ERROR] Error al estructurar múltiples SUA: {str(e)}", "red")
-            return None
+        """Estructurar múltiples archivos SUA (y agregarlos al historial si se pidió), guardando el Excel en la carpeta de destino si se pidió"""
+        return self._estructurar_en_memoria(partial(estructurar_suas, historial=self.agregar_historial), guardar_sua_excel,
+                                            sua_folder, output_folder, "múltiples SUA")
 
     def _estructurar_1emision_with_output_folder(self, emision_path, output_folder):
-        """Estructurar archivo de emisión individual guardando en la carpeta de destino"""
-        try:
-            # Usar la función modificada que acepta carpeta de destino
-            result_path = estructurar_1emision(emision_path, output_folder)
-            
-            if result_path and os.path.exists(result_path):
-                return result_path
-            return None
-            
-        except Exception as e:
-            self._add_terminal_message(f"[ERROR] Error al estructurar emisión: {str(e)}", "red")
-            return None
+        """Estructurar archivo de emisión individual, guardando el Excel en la carpeta de destino si se pidió"""
+        return self._estructurar_en_memoria(estructurar_emision, guardar_emision_excel, emision_path, output_folder, "emisión")
 
     # Funciones placeholder para otros tipos de confrontación
     def _execute_n_sua_vs_1_em(self):
@@ -970,27 +1073,27 @@ class ConfrontasPage(ft.Container):
             
             # Paso 1: Estructurar carpeta de archivos SUA
             self._add_terminal_message("[INFO] Estructurando archivos .SUA de la carpeta...", "black")
-            sua_excel_path = self._estructurar_varios_suas_with_output_folder(self.selected_sua_folder, self.selected_output_folder)
+            sua_estructurado = self._estructurar_varios_suas_with_output_folder(self.selected_sua_folder, self.selected_output_folder)
             
-            if not sua_excel_path:
+            if not sua_estructurado:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos .SUA", "red")
                 return
             
-            self._add_terminal_message(f"[SUCCESS] SUA's estructurados: {os.path.basename(sua_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] SUA's estructurados: {sua_estructurado['nombre']}", "black")
             
             # Paso 2: Estructurar archivo de emisión
             self._add_terminal_message("[INFO] Estructurando archivo de emisión...", "black")
-            emision_excel_path = self._estructurar_1emision_with_output_folder(self.selected_emission_file, self.selected_output_folder)
+            emision_estructurada = self._estructurar_1emision_with_output_folder(self.selected_emission_file, self.selected_output_folder)
             
-            if not emision_excel_path:
+            if not emision_estructurada:
                 self._add_terminal_message("[ERROR] Error al estructurar archivo de emisión", "red")
                 return
                 
-            self._add_terminal_message(f"[SUCCESS] Emisión estructurada: {os.path.basename(emision_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] Emisión estructurada: {emision_estructurada['nombre']}", "black")
             
             # Paso 3: Realizar confrontación
             self._add_terminal_message("[INFO] Iniciando confrontación SUA vs Emisión...", "black")
-            confronta_result = sua_vs_emision(sua_excel_path, emision_excel_path, self.selected_output_folder)
+            confronta_result = sua_vs_emision(sua_estructurado, emision_estructurada, self.selected_output_folder, self.formato_salida)
             
             if confronta_result:
                 self._add_terminal_message(f"[SUCCESS] Confrontación completada: {os.path.basename(confronta_result)}", "black")
@@ -1024,27 +1127,27 @@ class ConfrontasPage(ft.Container):
             
             # Paso 1: Estructurar carpeta de archivos SUA
             self._add_terminal_message("[INFO] Estructurando archivos .SUA de la carpeta...", "black")
-            sua_excel_path = self._estructurar_varios_suas_with_output_folder(self.selected_sua_folder, self.selected_output_folder)
+            sua_estructurado = self._estructurar_varios_suas_with_output_folder(self.selected_sua_folder, self.selected_output_folder)
             
-            if not sua_excel_path:
+            if not sua_estructurado:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos .SUA", "red")
                 return
             
-            self._add_terminal_message(f"[SUCCESS] SUA's estructurados: {os.path.basename(sua_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] SUA's estructurados: {sua_estructurado['nombre']}", "black")
             
             # Paso 2: Estructurar carpeta de emisiones
             self._add_terminal_message("[INFO] Estructurando archivos de emisión de la carpeta...", "black")
-            emision_excel_path = self._estructurar_emisiones_with_output_folder(self.selected_emissions_folder, self.selected_output_folder)
+            emision_estructurada = self._estructurar_emisiones_with_output_folder(self.selected_emissions_folder, self.selected_output_folder)
             
-            if not emision_excel_path:
+            if not emision_estructurada:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos de emisión", "red")
                 return
                 
-            self._add_terminal_message(f"[SUCCESS] Emisiones estructuradas: {os.path.basename(emision_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] Emisiones estructuradas: {emision_estructurada['nombre']}", "black")
             
             # Paso 3: Realizar confrontación
             self._add_terminal_message("[INFO] Iniciando confrontación SUA vs Emisión...", "black")
-            confronta_result = sua_vs_emision(sua_excel_path, emision_excel_path, self.selected_output_folder)
+            confronta_result = sua_vs_emision(sua_estructurado, emision_estructurada, self.selected_output_folder, self.formato_salida)
             
             if confronta_result:
                 self._add_terminal_message(f"[SUCCESS] Confrontación completada: {os.path.basename(confronta_result)}", "black")
@@ -1078,27 +1181,27 @@ class ConfrontasPage(ft.Container):
             
             # Paso 1: Estructurar archivo SUA
             self._add_terminal_message("[INFO] Estructurando archivo .SUA...", "black")
-            sua_excel_path = self._estructurar_sua_with_output_folder(self.selected_sua_file, self.selected_output_folder)
+            sua_estructurado = self._estructurar_sua_with_output_folder(self.selected_sua_file, self.selected_output_folder)
             
-            if not sua_excel_path:
+            if not sua_estructurado:
                 self._add_terminal_message("[ERROR] Error al estructurar archivo .SUA", "red")
                 return
             
-            self._add_terminal_message(f"[SUCCESS] SUA estructurado: {os.path.basename(sua_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] SUA estructurado: {sua_estructurado['nombre']}", "black")
             
             # Paso 2: Estructurar archivo de emisión
             self._add_terminal_message("[INFO] Estructurando archivo de emisión...", "black")
-            emision_excel_path = self._estructurar_1emision_with_output_folder(self.selected_emission_file, self.selected_output_folder)
+            emision_estructurada = self._estructurar_1emision_with_output_folder(self.selected_emission_file, self.selected_output_folder)
             
-            if not emision_excel_path:
+            if not emision_estructurada:
                 self._add_terminal_message("[ERROR] Error al estructurar archivo de emisión", "red")
                 return
                 
-            self._add_terminal_message(f"[SUCCESS] Emisión estructurada: {os.path.basename(emision_excel_path)}", "black")
+            self._add_terminal_message(f"[SUCCESS] Emisión estructurada: {emision_estructurada['nombre']}", "black")
             
             # Paso 3: Realizar confrontación
             self._add_terminal_message("[INFO] Iniciando confrontación SUA vs Emisión...", "black")
-            confronta_result = sua_vs_emision(sua_excel_path, emision_excel_path, self.selected_output_folder)
+            confronta_result = sua_vs_emision(sua_estructurado, emision_estructurada, self.selected_output_folder, self.formato_salida)
             
             if confronta_result:
                 self._add_terminal_message(f"[SUCCESS] Confrontación completada: {os.path.basename(confronta_result)}", "black")
@@ -1128,30 +1231,30 @@ class ConfrontasPage(ft.Container):
             
             # Paso 1: Estructurar varios SUA's
             self._add_terminal_message("[INFO] Paso 1/3: Estructurando archivos SUA...", "blue")
-            sua_result = estructurar_varios_suas(self.selected_sua_folder, self.selected_output_folder)
+            sua_result = self._estructurar_varios_suas_with_output_folder(self.selected_sua_folder, self.selected_output_folder)
             
             if sua_result:
-                self._add_terminal_message(f"[SUCCESS] Archivo SUA estructurado: {sua_result}", "green")
+                self._add_terminal_message(f"[SUCCESS] Archivo SUA estructurado: {sua_result['nombre']}", "green")
             else:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos SUA", "red")
                 return
             
             # Paso 2: Estructurar Visor
             self._add_terminal_message("[INFO] Paso 2/3: Estructurando archivos del Visor...", "blue")
-            visor_result = estructurar_visor(self.selected_visor_folder)
+            visor_result = estructurar_visor_datos(self.selected_visor_folder)
             
             if visor_result:
-                self._add_terminal_message(f"[SUCCESS] Archivo Visor estructurado: {visor_result}", "green")
-                
-                # Mover el archivo del visor a la carpeta de destino si no está allí
-                import shutil
-                visor_filename = os.path.basename(visor_result)
-                visor_destino = os.path.join(self.selected_output_folder, visor_filename)
+                self._add_terminal_message(f"[SUCCESS] Archivo Visor estructurado: {visor_result['nombre']}", "green")
                 
-                if visor_result != visor_destino:
-                    shutil.copy2(visor_result, visor_destino)
-                    self._add_terminal_message(f"[INFO] Archivo Visor copiado a: {visor_destino}", "blue")
-                    visor_result = visor_destino
+                if self.guardar_estructurados:
+                    # Guardar los archivos del visor en su carpeta y copiarlos a la carpeta de destino
+                    import shutil
+                    for visor_archivo in guardar_en_formatos(visor_result, self.selected_visor_folder, self.formato_salida, guardar_visor_excel):
+                        visor_destino = os.path.join(self.selected_output_folder, os.path.basename(visor_archivo))
+                        
+                        if visor_archivo != visor_destino:
+                            shutil.copy2(visor_archivo, visor_destino)
+                            self._add_terminal_message(f"[INFO] Archivo Visor copiado a: {visor_destino}", "blue")
                 
             else:
                 self._add_terminal_message("[ERROR] Error al estructurar archivos del Visor", "red")
@@ -1159,7 +1262,7 @@ class ConfrontasPage(ft.Container):
             
             # Paso 3: Ejecutar confrontación SUA vs Emisión (Visor)
             self._add_terminal_message("[INFO] Paso 3/3: Ejecutando confrontación...", "blue")
-            confronta_result = sua_vs_emision(sua_result, visor_result, self.selected_output_folder)
+            confronta_result = sua_vs_emision(sua_result, visor_result, self.selected_output_folder, self.formato_salida)
             
             if confronta_result:
                 self._add_terminal_message(f"[SUCCESS] Confrontación completada: {confronta_result}", "green")
@@ -1224,6 +1327,8 @@ class ConfrontasPage(ft.Container):
             self.selected_sua_folder = e.path
             folder_name = os.path.basename(self.selected_sua_folder)
             self._add_terminal_message(f"[SUCCESS] Carpeta .SUA seleccionada: {folder_name}", "black")
+            self._listar_en_segundo_plano(partial(buscar_archivos, self.selected_sua_folder, extensiones=('.sua',)),
+                                          "[INFO] Archivos .SUA encontrados")
         else:
             self._add_terminal_message("[WARNING] No se seleccionó carpeta .SUA", self.grey_color)
 
@@ -1274,6 +1379,8 @@ class ConfrontasPage(ft.Container):
             self.selected_emissions_folder = e.path
             folder_name = os.path.basename(self.selected_emissions_folder)
             self._add_terminal_message(f"[SUCCESS] Carpeta de emisiones seleccionada: {folder_name}", "black")
+            self._listar_en_segundo_plano(partial(buscar_archivos, self.selected_emissions_folder, extensiones=('.xls',)),
+                                          "[INFO] Archivos .xls encontrados")
         else:
             self._add_terminal_message("[WARNING] No se seleccionó carpeta de emisiones", self.grey_color)
 
@@ -1310,6 +1417,8 @@ class ConfrontasPage(ft.Container):
             self.selected_visor_folder = e.path
             folder_name = os.path.basename(self.selected_visor_folder)
             self._add_terminal_message(f"[SUCCESS] Carpeta del Visor seleccionada: {folder_name}", "black")
+            self._listar_en_segundo_plano(partial(buscar_archivos_visor, self.selected_visor_folder),
+                                          "[INFO] Carpetas con archivos del Visor")
         else:
             self._add_terminal_message("[WARNING] No se seleccionó carpeta del Visor", self.grey_color)
 
@@ -0,0 +1,115 @@
+import io
+import os
+import zipfile
+import contextlib
+
+
+# Los archivos dentro de un .zip se identifican con una ruta "virtual" que continúa la del .zip,
+# p. ej. C:\descargas\IDSE_02.zip\CARPETA\CDEMMO99.txt; así se leen directamente del .zip sin
+# descomprimirlos a disco, y el resto del código los trata como cualquier otra ruta.
+
+
+def es_zip(ruta):
+    """Indica si la ruta es un archivo .zip en disco"""
+    return ruta.lower().endswith('.zip') and os.path.isfile(ruta)
+
+
+def dividir_ruta_zip(ruta):
+    """
+    Separa una ruta virtual en el .zip que la contiene y el nombre del archivo dentro de él.
+
+    Args:
+        ruta (str): Ruta en disco o ruta virtual dentro de un .zip
+
+    Returns:
+        tuple: (ruta del .zip, nombre dentro del .zip), o (None, None) si no está en un .zip
+    """
+    actual = ruta
+    partes = []
+    while True:
+        # Solo se consulta el disco para los componentes que terminan en .zip
+        if partes and es_zip(actual):
+            return actual, '/'.join(reversed(partes))
+        padre, nombre = os.path.split(actual)
+        if not nombre or padre == actual:
+            return None, None
+        partes.append(nombre)
+        actual = padre
+
+
+def ruta_en_zip(ruta_zip, miembro):
+    """Ruta virtual de un archivo dentro de un .zip"""
+    return os.path.join(ruta_zip, *[parte for parte in miembro.split('/') if parte])
+
+
+def miembros_zip(ruta_zip):
+    """
+    Lista los archivos (no carpetas) de un .zip, en el orden en que están guardados.
+
+    Returns:
+        list: Nombres de los archivos dentro del .zip
+    """
+    with zipfile.ZipFile(ruta_zip) as zip_ref:
+        return [miembro.filename for miembro in zip_ref.infolist() if not miembro.is_dir()]
+
+
+@contextlib.contextmanager
+def abrir_archivo(ruta, modo='rb', encoding=None):
+    """
+    Abre un archivo en disco o dentro de un .zip (ruta virtual) sin extraerlo.
+
+    Args:
+        ruta (str): Ruta en disco o ruta virtual dentro de un .zip
+        modo (str): 'rb' o 'r' (texto)
+        encoding (str): Codificación para el modo texto
+
+    Yields:
+        Archivo abierto para lectura
+    """
+    ruta_zip, miembro = dividir_ruta_zip(ruta)
+    if ruta_zip is None:
+        with open(ruta, modo, encoding=encoding) as archivo:
+            yield archivo
+        return
+
+    with zipfile.ZipFile(ruta_zip) as zip_ref, zip_ref.open(miembro) as archivo:
+        if 'b' in modo:
+            yield archivo
+        else:
+            with io.TextIOWrapper(archivo, encoding=encoding) as texto:
+                yield texto
+
+
+def leer_bytes(ruta):
+    """Lee el contenido completo de un archivo en disco o dentro de un .zip"""
+    with abrir_archivo(ruta) as archivo:
+        return archivo.read()
+
+
+def estado_archivo(ruta):
+    """
+    Datos que cambian cuando cambia el archivo, para claves de caché.
+
+    Returns:
+        tuple: (tamaño, mtime en ns) en disco; dentro de un .zip, el tamaño descomprimido,
+            el mtime del .zip y el CRC-32 del archivo
+    """
+    ruta_zip, miembro = dividir_ruta_zip(ruta)
+    if ruta_zip is None:
+        info = os.stat(ruta)
+        return info.st_size, info.st_mtime_ns
+
+    with zipfile.ZipFile(ruta_zip) as zip_ref:
+        miembro = zip_ref.getinfo(miembro)
+    return miembro.file_size, os.stat(ruta_zip).st_mtime_ns, miembro.CRC
+
+
+def carpeta_real(ruta):
+    """
+    Carpeta en disco donde pueden escribirse resultados: para un .zip, o una ruta dentro de
+    uno, la carpeta que contiene al .zip; para cualquier otra ruta, la misma ruta.
+    """
+    ruta_zip, _ = dividir_ruta_zip(ruta)
+    if ruta_zip is None and es_zip(ruta):
+        ruta_zip = ruta
+    return os.path.dirname(ruta_zip) if ruta_zip is not None else ruta
@@ -0,0 +1,216 @@
+import os
+import zipfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from archivos_zip import es_zip, dividir_ruta_zip
+
+
+class ArchivoEncontrado(NamedTuple):
+    """Archivo encontrado por buscar_archivos"""
+    ruta: str
+    nombre: str
+    carpeta: str
+    nivel: int  # 0 = directamente en la carpeta buscada
+
+
+# Listados de carpetas ya leídos: (carpeta, seguir_enlaces) -> (mtime de la carpeta, entradas).
+# Crear, borrar o renombrar algo dentro de una carpeta cambia su mtime, así que un listado
+# con el mismo mtime sigue siendo válido y no se vuelve a leer. Se guardan como máximo
+# MAX_LISTADOS; al pasarse se olvidan los usados hace más tiempo.
+MAX_LISTADOS = 20_000
+_listados = OrderedDict()
+_candado_listados = threading.Lock()
+
+
+def _listado_guardado(clave, mtime):
+    """Listado guardado con esa clave si sigue vigente (mismo mtime), o None"""
+    with _candado_listados:
+        en_cache = _listados.get(clave)
+        if en_cache is None or en_cache[0] != mtime:
+            return None
+        _listados.move_to_end(clave)
+        return en_cache[1]
+
+
+def _guardar_listado(clave, mtime, listado):
+    with _candado_listados:
+        _listados[clave] = (mtime, listado)
+        _listados.move_to_end(clave)
+        while len(_listados) > MAX_LISTADOS:
+            _listados.popitem(last=False)
+
+
+def listar_carpeta(carpeta, seguir_enlaces=True):
+    """
+    Lista una carpeta con os.scandir, reutilizando el listado anterior si la carpeta no ha
+    cambiado (mismo mtime). En una unidad de red basta un stat por carpeta para volver a
+    recorrer una carpeta ya vista.
+
+    Args:
+        carpeta (str): Carpeta a listar
+        seguir_enlaces (bool): Si los enlaces simbólicos a carpetas cuentan como carpetas
+
+    Returns:
+        tuple: (nombre, ruta, es_archivo, es_carpeta) por entrada, en el orden de os.scandir
+
+    Raises:
+        OSError: Si la carpeta no existe o no se puede leer
+    """
+    mtime = os.stat(carpeta).st_mtime_ns
+    clave = (carpeta, seguir_enlaces)
+    en_cache = _listado_guardado(clave, mtime)
+    if en_cache is not None:
+        return en_cache
+
+    with os.scandir(carpeta) as entradas:
+        listado = tuple(
+            (entrada.name, entrada.path, entrada.is_file(), entrada.is_dir(follow_symlinks=seguir_enlaces))
+            for entrada in entradas
+        )
+    _guardar_listado(clave, mtime, listado)
+    return listado
+
+
+def listar_zip(ruta_zip):
+    """
+    Lista el contenido de un .zip como si fueran carpetas (rutas virtuales, ver archivos_zip),
+    reutilizando el listado anterior si el .zip no ha cambiado (mismo mtime).
+
+    Args:
+        ruta_zip (str): Ruta del .zip
+
+    Returns:
+        dict: Ruta virtual de cada carpeta (incluido el propio .zip) -> entradas con el mismo
+            formato que listar_carpeta
+    """
+    mtime = os.stat(ruta_zip).st_mtime_ns
+    clave = (ruta_zip, 'zip')
+    en_cache = _listado_guardado(clave, mtime)
+    if en_cache is not None:
+        return en_cache
+
+    carpetas = {ruta_zip: []}
+    vistas = set()
+    with zipfile.ZipFile(ruta_zip) as zip_ref:
+        for miembro in zip_ref.infolist():
+            partes = [parte for parte in miembro.filename.split('/') if parte]
+            actual = ruta_zip
+            for i, parte in enumerate(partes):
+                ruta = os.path.join(actual, parte)
+                es_archivo = i == len(partes) - 1 and not miembro.is_dir()
+                if ruta not in vistas:
+                    vistas.add(ruta)
+                    carpetas[actual].append((parte, ruta, es_archivo, not es_archivo))
+                if not es_archivo:
+                    carpetas.setdefault(ruta, [])
+                actual = ruta
+    listado = {carpeta: tuple(entradas) for carpeta, entradas in carpetas.items()}
+    _guardar_listado(clave, mtime, listado)
+    return listado
+
+
+def limpiar_listados():
+    """Olvida los listados de carpetas guardados por listar_carpeta"""
+    with _candado_listados:
+        _listados.clear()
+
+
+def buscar_archivos(directorio, extensiones=None, nombres=None, max_nivel=5, filtro=None,
+                    por_nivel=False, hilos=None, en_zip=False):
+    """
+    Busca archivos en una carpeta y sus subcarpetas. Las carpetas de cada nivel se listan a
+    la vez en un grupo de hilos (útil en unidades de red con mucha latencia) y los listados
+    se guardan en memoria por mtime (ver listar_carpeta).
+
+    Args:
+        directorio (str): Carpeta donde buscar
+        extensiones (tuple): Extensiones aceptadas, sin distinguir mayúsculas (p. ej. ('.sua',))
+        nombres (tuple): Nombres aceptados, sin distinguir mayúsculas (p. ej. ('CDEMMO99.txt',))
+        max_nivel (int): Niveles de subcarpetas a revisar (None para no tener límite; en ese
+            caso no se siguen los enlaces simbólicos a carpetas)
+        filtro (callable): Revisión adicional de cada archivo, filtro(ruta) -> bool; se ejecuta
+            en los hilos y un error cuenta como False
+        por_nivel (bool): Ordenar por nivel (primero los de la carpeta buscada, como glob) en
+            lugar del recorrido en profundidad en el orden de cada carpeta
+        hilos (int): Hilos para listar carpetas (por defecto, el de ThreadPoolExecutor)
+        en_zip (bool): Buscar también dentro de los .zip, como si fueran carpetas; los archivos
+            encontrados en ellos tienen rutas virtuales (ver archivos_zip). directorio puede
+            ser un .zip
+
+    Returns:
+        list: ArchivoEncontrado por cada archivo que cumple los criterios
+    """
+    extensiones = tuple(extension.lower() for extension in extensiones) if extensiones else None
+    nombres = {nombre.lower() for nombre in nombres} if nombres else None
+    seguir_enlaces = max_nivel is not None
+
+    def coincide(nombre):
+        nombre = nombre.lower()
+        if nombres is not None and nombre not in nombres:
+            return False
+        return extensiones is None or nombre.endswith(extensiones)
+
+    def listar(carpeta):
+        try:
+            if not en_zip:
+                return listar_carpeta(carpeta, seguir_enlaces)
+
+            ruta_zip, _ = dividir_ruta_zip(carpeta)
+            if ruta_zip is not None or es_zip(carpeta):
+                return listar_zip(ruta_zip or carpeta).get(carpeta, ())
+            # Los .zip de la carpeta se recorren como subcarpetas
+            return tuple(
+                (nombre, ruta, False, True) if es_archivo and nombre.lower().endswith('.zip')
+                else (nombre, ruta, es_archivo, es_carpeta)
+                for nombre, ruta, es_archivo, es_carpeta in listar_carpeta(carpeta, seguir_enlaces)
+            )
+        except PermissionError:
+            print(f"Sin permisos para acceder a: {carpeta}")
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"Error accediendo a {carpeta}: {e}")
+        return ()
+
+    def revisar(archivo):
+        try:
+            return bool(filtro(archivo.ruta))
+        except Exception:
+            return False  # Archivos que no se pueden abrir se ignoran
+
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        # Listar nivel por nivel; las carpetas de un mismo nivel se leen en paralelo
+        listados = {}
+        niveles = []
+        carpetas_nivel = [directorio]
+        while carpetas_nivel:
+            niveles.append(carpetas_nivel)
+            listados.update(zip(carpetas_nivel, executor.map(listar, carpetas_nivel)))
+            if max_nivel is not None and len(niveles) > max_nivel:
+                break
+            carpetas_nivel = [ruta for carpeta in carpetas_nivel
+                              for _, ruta, _, es_carpeta in listados[carpeta] if es_carpeta]
+
+        encontrados = []
+        if por_nivel:
+            for nivel, carpetas in enumerate(niveles):
+                for carpeta in carpetas:
+                    encontrados.extend(
+                        ArchivoEncontrado(ruta, nombre, carpeta, nivel)
+                        for nombre, ruta, es_archivo, _ in listados[carpeta]
+                        if es_archivo and coincide(nombre)
+                    )
+        else:
+            def recorrer(carpeta, nivel):
+                for nombre, ruta, es_archivo, es_carpeta in listados[carpeta]:
+                    if es_archivo and coincide(nombre):
+                        encontrados.append(ArchivoEncontrado(ruta, nombre, carpeta, nivel))
+                    elif es_carpeta and ruta in listados:
+                        recorrer(ruta, nivel + 1)
+            recorrer(directorio, 0)
+
+        if filtro is not None:
+            validos = list(executor.map(revisar, encontrados))
+            encontrados = [archivo for archivo, valido in zip(encontrados, validos) if valido]
+
+    return encontrados
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import hashlib
+import functools
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from archivos_zip import estado_archivo
+
+
+# Versión del formato de la caché (manifiesto y tablas); los cambios en los parsers se
+# detectan solos con huella_codigo
+VERSION_CACHE = 3
+
+# Módulos de scripts/ que dan forma a las tablas guardadas (parsers, tipos y conversión a
+# polars, lectura de .zip); solo un cambio en ellos invalida la caché
+MODULOS_CACHE = (
+    'estructurar_sua_mod.py', 'estructurar_emision_mod.py', 'estructurar_visor.py',
+    'esquemas.py', 'salida_formatos.py', 'archivos_zip.py',
+)
+
+# Las entradas sin usar en más de DIAS_SIN_USO_CACHE días se eliminan, y después las usadas
+# hace más tiempo hasta que la caché ocupe como máximo TAMAÑO_MAXIMO_CACHE bytes
+DIAS_SIN_USO_CACHE = 30
+TAMAÑO_MAXIMO_CACHE = 2 * 1024 ** 3
+
+# Si la caché ya se recortó en este proceso
+_recortada = False
+
+# Carpeta donde se guardan los DataFrames ya estructurados (se puede cambiar con IMSS_CACHE_DIR)
+CARPETA_CACHE = os.environ.get('IMSS_CACHE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'web_app_imss'
+)
+
+
+@functools.lru_cache(maxsize=None)
+def huella_codigo():
+    """
+    Huella del código de MODULOS_CACHE. Forma parte de las claves de caché, así que un
+    cambio en los parsers invalida lo guardado sin tener que incrementar VERSION_CACHE;
+    los cambios en la interfaz u otros scripts no.
+
+    Returns:
+        str: Huella SHA-1 hexadecimal
+    """
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    huella = hashlib.sha1()
+    for nombre in MODULOS_CACHE:
+        huella.update(nombre.encode('utf-8'))
+        with open(os.path.join(carpeta, nombre), 'rb') as f:
+            huella.update(f.read())
+    return huella.hexdigest()
+
+
+def clave_archivo(ruta, tipo, *opciones):
+    """
+    Genera la clave de caché de un archivo. Tiene dos partes: el origen (tipo, ruta y
+    opciones) y la versión (tamaño y fecha de modificación del archivo, del .zip y CRC si
+    está dentro de uno, y la huella del código); si el archivo o el parser cambian, la
+    versión también, y al guardarla se reemplaza la entrada anterior del mismo origen.
+
+    Args:
+        ruta (str): Ruta del archivo de origen (en disco o dentro de un .zip)
+        tipo (str): Tipo de estructurado (p. ej. 'sua', 'emision', 'cdemmo99')
+        *opciones: Parámetros adicionales que cambian el resultado
+
+    Returns:
+        str: Clave "origen-versión" en hexadecimal
+    """
+    origen = [tipo, os.path.abspath(ruta)]
+    origen.extend(str(opcion) for opcion in opciones)
+    version = [str(VERSION_CACHE), huella_codigo()]
+    version.extend(str(dato) for dato in estado_archivo(ruta))
+    return '-'.join(hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:20] for partes in (origen, version))
+
+
+def _ruta_tabla(clave, nombre):
+    return os.path.join(CARPETA_CACHE, f"{clave}_{nombre}.parquet")
+
+
+def _ruta_manifiesto(clave):
+    return os.path.join(CARPETA_CACHE, f"{clave}.json")
+
+
+def _valor_json(valor):
+    """Convierte escalares de numpy a tipos de Python para serializarlos en JSON"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Valor no serializable en caché: {valor!r}")
+
+
+def _a_arrow(df):
+    """Convierte un DataFrame de polars o pandas a tabla Arrow, junto con lo necesario para restaurarlo"""
+    if isinstance(df, pl.DataFrame):
+        return df.to_arrow(), {'tipo': 'polars', 'columnas_json': []}
+
+    # Las columnas object pueden mezclar texto y números (p. ej. '-' y 1.0); se guardan como JSON
+    columnas_json = [col for col in df.columns if df[col].dtype == object]
+    df = df.copy()
+    for col in columnas_json:
+        df[col] = [None if not isinstance(valor, str) and pd.isna(valor)
+                   else json.dumps(valor, default=_valor_json) for valor in df[col]]
+    return pa.Table.from_pandas(df, preserve_index=False), {'tipo': 'pandas', 'columnas_json': columnas_json}
+
+
+def _desde_arrow(tabla, detalle):
+    """Restaura el DataFrame guardado por _a_arrow"""
+    if detalle['tipo'] == 'polars':
+        return pl.from_arrow(tabla)
+
+    df = tabla.to_pandas()
+    for col in detalle['columnas_json']:
+        df[col] = pd.Series([np.nan if valor is None else json.loads(valor) for valor in df[col].astype(object)],
+                            index=df.index, dtype=object)
+    return df
+
+
+def leer_cache(clave):
+    """
+    Busca en la caché los DataFrames guardados con una clave.
+
+    Args:
+        clave (str): Clave generada con clave_archivo
+
+    Returns:
+        tuple: (dict de DataFrames, dict de metadatos), o None si no hay datos válidos
+    """
+    try:
+        with open(_ruta_manifiesto(clave), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+
+        tablas = {}
+        for nombre, detalle in manifiesto['tablas'].items():
+            tablas[nombre] = None if detalle is None else _desde_arrow(pq.read_table(_ruta_tabla(clave, nombre)), detalle)
+
+        # La fecha del manifiesto marca el último uso de la entrada (ver recortar_cache)
+        os.utime(_ruta_manifiesto(clave))
+        return tablas, manifiesto['metadatos']
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"No se pudo leer la caché {clave}: {e}")
+        return None
+
+
+def guardar_cache(clave, tablas, metadatos=None):
+    """
+    Guarda DataFrames (polars o pandas) en la caché en formato Parquet y elimina la entrada
+    que reemplaza (mismo origen, otra versión). La primera vez en cada proceso también se
+    recorta la caché (recortar_cache). Los errores solo se reportan: la caché nunca debe
+    detener el procesamiento.
+
+    Args:
+        clave (str): Clave generada con clave_archivo
+        tablas (dict): Nombre -> DataFrame (o None)
+        metadatos (dict): Datos adicionales serializables en JSON
+    """
+    try:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+
+        detalles = {}
+        for nombre, df in tablas.items():
+            if df is None:
+                detalles[nombre] = None
+                continue
+            tabla, detalles[nombre] = _a_arrow(df)
+            temporal = _ruta_tabla(clave, nombre) + '.tmp'
+            pq.write_table(tabla, temporal)
+            os.replace(temporal, _ruta_tabla(clave, nombre))
+
+        # El manifiesto se escribe al final: una entrada sin manifiesto se considera inexistente
+        temporal = _ruta_manifiesto(clave) + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'tablas': detalles, 'metadatos': metadatos or {}}, f, ensure_ascii=False)
+        os.replace(temporal, _ruta_manifiesto(clave))
+
+        entradas = _entradas()
+        origen = clave.split('-')[0]
+        _eliminar_entradas(entradas, [entrada for entrada in entradas
+                                      if entrada != clave and entrada.split('-')[0] == origen])
+        if not _recortada:
+            recortar_cache()
+    except Exception as e:
+        print(f"No se pudo guardar en caché {clave}: {e}")
+
+
+def _entradas():
+    """Archivos de la caché agrupados por clave: clave -> lista de nombres de archivo"""
+    entradas = {}
+    if not os.path.isdir(CARPETA_CACHE):
+        return entradas
+    for nombre in os.listdir(CARPETA_CACHE):
+        if nombre.endswith(('.parquet', '.json', '.tmp')):
+            entradas.setdefault(nombre.split('_')[0].split('.')[0], []).append(nombre)
+    return entradas
+
+
+def _eliminar_entradas(entradas, claves):
+    """Elimina todos los archivos de las entradas indicadas (de _entradas); regresa cuántas se eliminaron"""
+    eliminadas = 0
+    for clave in claves:
+        for nombre in entradas.get(clave, []):
+            try:
+                os.remove(os.path.join(CARPETA_CACHE, nombre))
+            except OSError as e:
+                print(f"No se pudo eliminar {nombre}: {e}")
+        eliminadas += 1
+    return eliminadas
+
+
+def recortar_cache(dias_sin_uso=DIAS_SIN_USO_CACHE, tamaño_maximo=TAMAÑO_MAXIMO_CACHE):
+    """
+    Elimina las entradas de la caché sin usar en más de `dias_sin_uso` días y después las
+    usadas hace más tiempo hasta que la caché ocupe como máximo `tamaño_maximo` bytes.
+
+    Args:
+        dias_sin_uso (float): Días sin leerse ni guardarse tras los cuales se elimina una entrada
+        tamaño_maximo (int): Tamaño máximo de la caché en bytes
+
+    Returns:
+        int: Número de entradas eliminadas
+    """
+    global _recortada
+    _recortada = True
+
+    # Último uso (fecha del manifiesto, o del archivo más reciente si no tiene) y tamaño de cada entrada
+    entradas = _entradas()
+    usos = []
+    for clave, nombres in entradas.items():
+        ultimo_uso = 0
+        tamaño = 0
+        for nombre in nombres:
+            try:
+                estado = os.stat(os.path.join(CARPETA_CACHE, nombre))
+            except OSError:
+                continue
+            tamaño += estado.st_size
+            if nombre == f"{clave}.json" or f"{clave}.json" not in nombres:
+                ultimo_uso = max(ultimo_uso, estado.st_mtime)
+        usos.append((ultimo_uso, tamaño, clave))
+    usos.sort()
+
+    limite = time.time() - dias_sin_uso * 24 * 60 * 60
+    total = sum(tamaño for _, tamaño, _ in usos)
+    eliminar = []
+    for ultimo_uso, tamaño, clave in usos:
+        if ultimo_uso >= limite and total <= tamaño_maximo:
+            break
+        eliminar.append(clave)
+        total -= tamaño
+    return _eliminar_entradas(entradas, eliminar)
+
+
+def limpiar_cache():
+    """
+    Elimina todos los archivos de la caché.
+
+    Returns:
+        int: Número de archivos eliminados
+    """
+    eliminados = 0
+    if not os.path.isdir(CARPETA_CACHE):
+        return eliminados
+
+    for nombre in os.listdir(CARPETA_CACHE):
+        if nombre.endswith(('.parquet', '.json', '.tmp')):
+            try:
+                os.remove(os.path.join(CARPETA_CACHE, nombre))
+                eliminados += 1
+            except OSError as e:
+                print(f"No se pudo eliminar {nombre}: {e}")
+    return eliminados
@@ -4,20 +4,31 @@ import os
 import re
 from openpyxl.styles import PatternFill, Font
 from openpyxl import Workbook
+from salida_excel import escribir_hoja
+from salida_formatos import FORMATO_EXCEL, guardar_en_formatos, a_polars
+from esquemas import TIPOS_COLUMNAS, IMPORTE, SIN_CREDITO, aplicar_esquema, normalizar_credito
 
-def sua_vs_emision(sua_path, emision_path, archive_path):
+def sua_vs_emision(sua_path, emision_path, archive_path, formato=FORMATO_EXCEL):
     """
     Compara archivos SUA vs Emisión y genera un archivo Excel con las diferencias.
     
+    El SUA y la emisión pueden ser la ruta del Excel estructurado o el resultado en memoria
+    de las funciones estructurar_* (dict con 'nombre' y 'hojas'); en ese caso se confrontan
+    directamente sin escribir ni volver a leer ningún Excel intermedio.
+    
     Args:
-        sua_path (str): Ruta del archivo SUA
-        emision_path (str): Ruta del archivo de emisión
+        sua_path (str | dict): Archivo SUA estructurado o su resultado en memoria
+        emision_path (str | dict): Archivo de emisión estructurado o su resultado en memoria
         archive_path (str): Ruta donde guardar el archivo resultado
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+    
+    Returns:
+        str: Ruta del Excel resultado (o del primer archivo Parquet/Arrow si no se pidió Excel)
     """
     
     # Extraer período de los nombres de archivo
-    sua_filename = os.path.basename(sua_path)
-    emision_filename = os.path.basename(emision_path)
+    sua_filename = nombre_estructurado(sua_path)
+    emision_filename = nombre_estructurado(emision_path)
     
     # Extraer mes y año del nombre del archivo SUA
     sua_match = re.search(r'(\d{2})-(\d{4})', sua_filename)
@@ -39,231 +50,107 @@ def sua_vs_emision(sua_path, emision_path, archive_path):
     # Determinar número de hojas según el mes (par = 2 hojas, impar = 1 hoja)
     num_hojas = 2 if mes % 2 == 0 else 1
     
-    # Crear archivo Excel resultado
-    wb = Workbook()
-    ws = wb.active
-    wb.remove(ws)  # Remover hoja por defecto
+    # Procesar hoja 1 (MENSUAL) y hoja 2 (BIMESTRAL) si es necesario
+    hojas = {"MENSUAL": procesar_hoja_mensual(sua_path, emision_path)}
+    if num_hojas == 2:
+        hojas["BIMESTRAL"] = procesar_hoja_bimestral(sua_path, emision_path)
+    
+    resultado = {'nombre': f"{sua_mes}_{sua_año}_CONFRONTA", 'hojas': hojas}
+    return guardar_en_formatos(resultado, archive_path, formato, guardar_confronta_excel)[0]
+
+
+def guardar_confronta_excel(resultado, archive_path):
+    """
+    Guarda las hojas de la confrontación en Excel con encabezados morado y verde.
+    
+    Args:
+        resultado (dict): 'nombre' del archivo y 'hojas' (nombre de hoja -> pl.DataFrame)
+        archive_path (str): Carpeta donde guardar el archivo
+    
+    Returns:
+        str: Ruta del archivo Excel creado
+    """
+    # Crear archivo Excel resultado (modo write_only: las filas se escriben directo al archivo)
+    wb = Workbook(write_only=True)
     
     # Colores para formato (morado y verde del Joker)
     purple_fill = PatternFill(start_color="8B008B", end_color="8B008B", fill_type="solid")
     green_font = Font(color="00FF00", bold=True)
     
-    # Procesar hoja 1 (MENSUAL)
-    hoja1_result = procesar_hoja_mensual(sua_path, emision_path)
-    ws1 = wb.create_sheet("MENSUAL")
-    escribir_dataframe_a_excel(ws1, hoja1_result, purple_fill, green_font)
-    
-    # Procesar hoja 2 (BIMESTRAL) si es necesario
-    if num_hojas == 2:
-        hoja2_result = procesar_hoja_bimestral(sua_path, emision_path)
-        ws2 = wb.create_sheet("BIMESTRAL")
-        escribir_dataframe_a_excel(ws2, hoja2_result, purple_fill, green_font)
+    for nombre_hoja, hoja_result in resultado['hojas'].items():
+        ws = wb.create_sheet(nombre_hoja)
+        escribir_dataframe_a_excel(ws, hoja_result, purple_fill, green_font)
     
     # Guardar archivo
-    output_filename = f"{sua_mes}_{sua_año}_CONFRONTA.xlsx"
-    output_path = os.path.join(archive_path, output_filename)
+    output_path = os.path.join(archive_path, f"{resultado['nombre']}.xlsx")
     wb.save(output_path)
     
     return output_path
 
 
+# Columnas numéricas que se restan SUA - Emisión en cada hoja
+COLUMNAS_COMPARACION_MENSUAL = ["DIAS", "CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR",
+                                "GMP_PAT", "GMP_OBR", "RT", "IV_PAT", "IV_OBR", "GPS", "TOTAL"]
+COLUMNAS_COMPARACION_BIMESTRAL = ["DIAS", "RETIRO", "CEAV_PAT", "CEAV_OBR", "TOTAL_RCV",
+                                  "APORTACION_PAT", "AMORTIZACION", "TOTAL_INF", "TOTAL"]
+
+# Sufijo con el que se distinguen las columnas de emisión después del join
+SUFIJO_EMISION = "__EMISION"
+
+
+def nombre_estructurado(origen):
+    """Nombre del archivo estructurado (ruta) o el que tendría el resultado en memoria"""
+    if isinstance(origen, dict):
+        return origen['nombre']
+    return os.path.basename(origen)
+
+
+def hoja_a_polars(df):
+    """
+    Convierte una hoja estructurada en memoria a polars igual que si se hubiera leído del
+    Excel: las columnas que mezclan texto y números quedan como texto (a_polars) y los
+    textos vacíos quedan como nulos.
+    
+    Args:
+        df (pd.DataFrame | pl.DataFrame): Hoja estructurada
+    
+    Returns:
+        pl.DataFrame: Hoja lista para comparar
+    """
+    return a_polars(df).with_columns(pl.col(pl.Utf8).replace("", None))
+
+
+def leer_hoja(origen, numero_hoja):
+    """
+    Lee una hoja (1 = mensual, 2 = bimestral) del Excel estructurado o del resultado en
+    memoria, con los tipos de esquemas.TIPOS_COLUMNAS para que las comparaciones sean exactas.
+    
+    Args:
+        origen (str | dict): Ruta del Excel o resultado de una función estructurar_*
+        numero_hoja (int): Posición de la hoja, empezando en 1
+    
+    Returns:
+        pl.DataFrame: Hoja leída
+    """
+    if isinstance(origen, dict):
+        hojas = list(origen['hojas'].values())
+        if numero_hoja > len(hojas):
+            raise ValueError(f"{origen['nombre']} no tiene la hoja {numero_hoja}")
+        return aplicar_esquema(hoja_a_polars(hojas[numero_hoja - 1]))
+    return aplicar_esquema(pl.read_excel(origen, sheet_id=numero_hoja))
+
+
 def procesar_hoja_mensual(sua_path, emision_path):
     """Procesa la comparación de la hoja mensual (hoja 1)"""
     
     # Leer archivos con polars
     try:
-        sua_df = pl.read_excel(sua_path, sheet_id=1)
-        emision_df = pl.read_excel(emision_path, sheet_id=1)
+        sua_df = leer_hoja(sua_path, 1)
+        emision_df = leer_hoja(emision_path, 1)
     except Exception as e:
         raise ValueError(f"Error al leer los archivos Excel: {e}")
     
-    # Crear columna compuesta para identificación única (usando primeros 10 dígitos de RP)
-    sua_df = sua_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    emision_df = emision_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    # Obtener todas las IDs únicas de ambos archivos
-    todas_ids = set(sua_df["ID_UNICO"].to_list()) | set(emision_df["ID_UNICO"].to_list())
-    
-    resultados = []
-    
-    for id_unico in todas_ids:
-        sua_row = sua_df.filter(pl.col("ID_UNICO") == id_unico)
-        emision_row = emision_df.filter(pl.col("ID_UNICO") == id_unico)
-        
-        sua_existe = len(sua_row) > 0
-        emision_existe = len(emision_row) > 0
-        
-        # Preparar fila resultado
-        if sua_existe:
-            sua_data = sua_row.to_dicts()[0]
-            resultado = sua_data.copy()
-        else:
-            emision_data = emision_row.to_dicts()[0]
-            resultado = {col: None for col in sua_df.columns}
-            resultado["RP"] = emision_data["RP"]
-            resultado["NSS"] = emision_data["NSS"]
-            resultado["ID_UNICO"] = emision_data["ID_UNICO"]
-        
-        observaciones = []
-        
-        # Procesar según disponibilidad de datos
-        if sua_existe and emision_existe:
-            sua_data = sua_row.to_dicts()[0]
-            emision_data = emision_row.to_dicts()[0]
-            
-            # Comparar NOMBRE_ASEGURADO
-            if "NOMBRE_ASEGURADO" in sua_data and "NOMBRE_ASEGURADO" in emision_data:
-                if sua_data["NOMBRE_ASEGURADO"] != emision_data["NOMBRE_ASEGURADO"]:
-                    observaciones.append("NOMBRE DIFERENTE")
-                resultado["NOMBRE_ASEGURADO"] = emision_data["NOMBRE_ASEGURADO"]
-            
-            # Mantener SDI de emisión, o de SUA si no existe en emisión
-            if "SDI" in emision_data:
-                resultado["SDI"] = emision_data["SDI"]
-            elif "SDI" in sua_data:
-                resultado["SDI"] = sua_data["SDI"]
-            
-            # Comparar y calcular diferencias para columnas numéricas (excluyendo SDI)
-            columnas_comparacion = ["DIAS", "CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR", 
-                                  "GMP_PAT", "GMP_OBR", "RT", "IV_PAT", "IV_OBR", "GPS", "TOTAL"]
-            
-            diferencias_cuotas = False
-            diferencia_dias = False
-            diferencia_total = 0
-            
-            for columna in columnas_comparacion:
-                if columna in sua_data and columna in emision_data:
-                    sua_val = sua_data[columna] or 0
-                    emision_val = emision_data[columna] or 0
-                    
-                    # Redondear valores a 2 decimales para comparación precisa
-                    if isinstance(sua_val, (float, int)) and isinstance(emision_val, (float, int)):
-                        sua_val = round(float(sua_val), 2)
-                        emision_val = round(float(emision_val), 2)
-                    
-                    diferencia = sua_val - emision_val
-                    
-                    # Redondear la diferencia a 2 decimales
-                    diferencia = round(diferencia, 2)
-                    
-                    if columna == "DIAS":
-                        resultado[columna] = diferencia
-                        if diferencia != 0:
-                            diferencia_dias = True
-                            if diferencia > 0:
-                                observaciones.append("MAS DIAS EN SUA")
-                            else:
-                                observaciones.append("MAS DIAS EN EMISION")
-                    elif columna == "TOTAL":
-                        resultado[columna] = diferencia
-                        diferencia_total = diferencia
-                    else:
-                        resultado[columna] = diferencia
-                        if diferencia != 0:
-                            diferencias_cuotas = True
-            
-            # Verificar condiciones específicas para comentarios especiales
-            if diferencias_cuotas and not diferencia_dias:
-                # Verificar si solo hay diferencia en RT
-                rt_diferencia = resultado.get("RT", 0) or 0
-                otras_diferencias = any([
-                    resultado.get("CF", 0) != 0,
-                    resultado.get("EXC_PAT", 0) != 0,
-                    resultado.get("EXC_OBR", 0) != 0,
-                    resultado.get("PD_PAT", 0) != 0,
-                    resultado.get("PD_OBR", 0) != 0,
-                    resultado.get("GMP_PAT", 0) != 0,
-                    resultado.get("GMP_OBR", 0) != 0,
-                    resultado.get("IV_PAT", 0) != 0,
-                    resultado.get("IV_OBR", 0) != 0,
-                    resultado.get("GPS", 0) != 0
-                ])
-                
-                if rt_diferencia != 0 and not otras_diferencias:
-                    observaciones.append("REVISAR PRIMA DE RIESGO")
-                
-                # Verificar si solo hay diferencias en GMP y IV (pensionado)
-                elif not rt_diferencia and not resultado.get("CF", 0) and not resultado.get("EXC_PAT", 0) and not resultado.get("EXC_OBR", 0) and not resultado.get("PD_PAT", 0) and not resultado.get("PD_OBR", 0) and not resultado.get("GPS", 0):
-                    # Verificar que TODAS las columnas GMP y IV tengan diferencias (pensionado)
-                    gmp_iv_todas_diferentes = all([
-                        resultado.get("GMP_PAT", 0) != 0,
-                        resultado.get("GMP_OBR", 0) != 0,
-                        resultado.get("IV_PAT", 0) != 0,
-                        resultado.get("IV_OBR", 0) != 0
-                    ])
-                    
-                    if gmp_iv_todas_diferentes:
-                        observaciones.append("PENSIONADO")
-            
-            # Verificar diferencias por incapacidad/ausentismo
-            if diferencia_total != 0:
-                inc_val = sua_data.get("INC", 0) or 0
-                aus_val = sua_data.get("AUS", 0) or 0
-                
-                if inc_val > 0 or aus_val > 0:
-                    dias_emision = emision_data.get("DIAS", 0) or 0
-                    total_emision = emision_data.get("TOTAL", 0) or 0
-                    
-                    if dias_emision > 0:
-                        calculo_incapacidad = (total_emision / dias_emision) * (inc_val + aus_val)
-                        # Redondear a 2 decimales para comparación precisa
-                        calculo_incapacidad = round(calculo_incapacidad, 2)
-                        diferencia_total_redondeada = round(abs(diferencia_total), 2)
-                        
-                        if abs(diferencia_total_redondeada - abs(calculo_incapacidad)) < 0.40:  # Tolerancia para cálculo de incapacidad
-                            observaciones = [obs for obs in observaciones if "DIFERENCIAS" not in obs]
-                            observaciones.append("SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO")
-                        else:
-                            if not any("DIFERENCIAS" in obs for obs in observaciones):
-                                observaciones.append("DIFERENCIAS")
-                    else:
-                        if not any("DIFERENCIAS" in obs for obs in observaciones):
-                            observaciones.append("DIFERENCIAS")
-                else:
-                    if not any("DIFERENCIAS" in obs for obs in observaciones):
-                        observaciones.append("DIFERENCIAS")
-            
-            # Mantener valores de INC y AUS de SUA
-            resultado["INC"] = sua_data.get("INC", 0)
-            resultado["AUS"] = sua_data.get("AUS", 0)
-            
-        elif sua_existe and not emision_existe:
-            observaciones.append("NO APARECE EN EMISION")
-        elif not sua_existe and emision_existe:
-            emision_data = emision_row.to_dicts()[0]
-            observaciones.append("NO APARECE EN SUA")
-            resultado["NOMBRE_ASEGURADO"] = emision_data.get("NOMBRE_ASEGURADO", "")
-            # Valores nulos para columnas que no existen en emisión
-            for col in ["RFC", "CURP", "N_MOVS", "INC", "AUS"]:
-                resultado[col] = None
-        
-        # Establecer observaciones finales
-        if not observaciones:
-            resultado["OBSERVACIONES"] = "SIN DIFERENCIAS"
-        else:
-            resultado["OBSERVACIONES"] = ", ".join(observaciones)
-        
-        resultados.append(resultado)
-    
-    # Convertir a DataFrame de polars
-    if resultados:
-        # Remover ID_UNICO antes de retornar
-        for resultado in resultados:
-            resultado.pop("ID_UNICO", None)
-        
-        resultado_df = pl.DataFrame(resultados)
-        
-        # Ordenar por RP y después por NOMBRE ASEGURADO
-        resultado_df = resultado_df.sort(["RP", "NOMBRE ASEGURADO"])
-        
-        return resultado_df
-    else:
-        return pl.DataFrame()
+    return comparar_mensual(sua_df, emision_df)
 
 
 def procesar_hoja_bimestral(sua_path, emision_path):
@@ -271,243 +158,395 @@ def procesar_hoja_bimestral(sua_path, emision_path):
     
     # Leer archivos con polars
     try:
-        sua_df = pl.read_excel(sua_path, sheet_id=2)
-        emision_df = pl.read_excel(emision_path, sheet_id=2)
+        sua_df = leer_hoja(sua_path, 2)
+        emision_df = leer_hoja(emision_path, 2)
     except Exception as e:
         raise ValueError(f"Error al leer las hojas bimestrales: {e}")
     
-    # Crear columna compuesta para identificación única (usando primeros 10 dígitos de RP)
-    sua_df = sua_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
+    return comparar_bimestral(sua_df, emision_df)
+
+
+def unir_por_id_unico(sua_df, emision_df, sufijo=SUFIJO_EMISION):
+    """
+    Une dos DataFrames con un full outer join sobre ID_UNICO (RP a 10 posiciones + NSS).
+    
+    Si un ID se repite dentro del mismo archivo solo se conserva su primera fila.
+    Las columnas del lado derecho se renombran con el sufijo indicado y se agregan
+    las columnas booleanas _EN_SUA y _EN_DERECHA (emisión u otro SUA) para saber de qué
+    lado existe cada ID.
     
-    emision_df = emision_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
+    Args:
+        sua_df (pl.DataFrame): DataFrame del lado izquierdo (SUA)
+        emision_df (pl.DataFrame): DataFrame del lado derecho (Emisión u otro SUA)
+        sufijo (str): Sufijo para las columnas del lado derecho
+    
+    Returns:
+        pl.DataFrame: DataFrame unido con una fila por ID_UNICO
+    """
+    id_unico = pl.concat_str(
+        [pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS").cast(pl.Utf8)], separator="_"
+    ).alias("ID_UNICO")
+    
+    izquierdo = (
+        sua_df.with_columns(id_unico)
+        .unique(subset="ID_UNICO", keep="first", maintain_order=True)
+        .with_columns(pl.lit(True).alias("_EN_SUA"))
+    )
+    derecho = emision_df.with_columns(id_unico).unique(subset="ID_UNICO", keep="first", maintain_order=True)
+    derecho = derecho.rename({col: f"{col}{sufijo}" for col in derecho.columns})
+    derecho = derecho.with_columns(pl.lit(True).alias("_EN_DERECHA"))
+    
+    unido = izquierdo.join(
+        derecho, left_on="ID_UNICO", right_on=f"ID_UNICO{sufijo}",
+        how="full", coalesce=False, maintain_order="left_right"
+    )
+    return unido.with_columns([
+        pl.col("_EN_SUA").fill_null(False),
+        pl.col("_EN_DERECHA").fill_null(False)
     ])
+
+
+def diferencia_redondeada(col_sua, col_emision, tipo=IMPORTE):
+    """
+    Diferencia SUA - Emisión con el tipo de la columna, tratando nulos como 0; los importes
+    se llevan a decimales exactos de 2 posiciones, así que la resta no tiene error de redondeo.
+    """
+    return col_sua.fill_null(0).cast(tipo) - col_emision.fill_null(0).cast(tipo)
+
+
+def _es_distinto_de_cero(expr):
+    """Equivale a `valor != 0` en Python: un nulo cuenta como distinto de cero"""
+    return (expr != 0).fill_null(True)
+
+
+def _es_cero_o_nulo(expr):
+    """Equivale a `not valor` en Python para valores numéricos"""
+    return (expr == 0).fill_null(True)
+
+
+def columnas_por_origen(columnas, sua_columns, valores_ambos, valores_solo_emision):
+    """
+    Genera una expresión por columna que toma el valor calculado para las filas en ambos
+    archivos, el valor de las filas que solo existen en el lado derecho, o el valor original
+    del SUA. Las columnas sin valor definido para un caso quedan en nulo.
+    """
+    ambos = pl.col("_EN_SUA") & pl.col("_EN_DERECHA")
+    solo_emision = ~pl.col("_EN_SUA")
+    
+    expresiones = []
+    for col in columnas:
+        valor_sua = pl.col(col) if col in sua_columns else pl.lit(None)
+        expresiones.append(
+            pl.when(ambos).then(valores_ambos.get(col, pl.lit(None)))
+            .when(solo_emision).then(valores_solo_emision.get(col, pl.lit(None)))
+            .otherwise(valor_sua)
+            .alias(col)
+        )
+    return expresiones
+
+
+def _armar_resultado(unido, sua_columns, valores_ambos, valores_solo_emision, observaciones,
+                     extras_ambos, extras_solo_emision):
+    """
+    Construye el DataFrame final a partir del join, eligiendo para cada columna el valor
+    que corresponde según el ID exista en ambos archivos, solo en SUA o solo en emisión.
+    """
+    ambos = pl.col("_EN_SUA") & pl.col("_EN_DERECHA")
+    solo_emision = ~pl.col("_EN_SUA")
+    
+    hay_ambos = unido.select(ambos.any()).item()
+    hay_solo_emision = unido.select(solo_emision.any()).item()
+    
+    # Mismo orden de columnas que tenían los diccionarios del cálculo fila por fila
+    columnas = [col for col in sua_columns if col != "ID_UNICO"]
+    if hay_ambos:
+        columnas += [col for col in extras_ambos if col not in columnas]
+    if hay_solo_emision:
+        columnas += [col for col in extras_solo_emision if col not in columnas]
+    
+    expresiones = columnas_por_origen(columnas, sua_columns, valores_ambos, valores_solo_emision)
+    
+    # Observaciones de las filas que existen en ambos archivos, separadas por coma
+    observaciones_ambos = pl.concat_str(
+        [pl.when(condicion).then(pl.lit(texto)) for condicion, texto in observaciones],
+        separator=", ",
+        ignore_nulls=True
+    ) if observaciones else pl.lit("")
+    
+    expresiones.append(
+        pl.when(ambos).then(
+            pl.when(observaciones_ambos == "").then(pl.lit("SIN DIFERENCIAS")).otherwise(observaciones_ambos)
+        )
+        .when(solo_emision).then(pl.lit("NO APARECE EN SUA"))
+        .otherwise(pl.lit("NO APARECE EN EMISION"))
+        .alias("OBSERVACIONES")
+    )
+    
+    return unido.select(expresiones)
+
+
+def comparar_mensual(sua_df, emision_df):
+    """
+    Compara la hoja mensual de SUA contra la de emisión con un solo join por ID_UNICO.
     
-    # Obtener todas las IDs únicas de ambos archivos
-    todas_ids = set(sua_df["ID_UNICO"].to_list()) | set(emision_df["ID_UNICO"].to_list())
+    Args:
+        sua_df (pl.DataFrame): Hoja mensual del SUA estructurado
+        emision_df (pl.DataFrame): Hoja mensual (EMA) de la emisión estructurada
     
-    resultados = []
+    Returns:
+        pl.DataFrame: Diferencias por trabajador con columna OBSERVACIONES
+    """
+    if sua_df.is_empty() and emision_df.is_empty():
+        return pl.DataFrame()
     
-    for id_unico in todas_ids:
-        sua_row = sua_df.filter(pl.col("ID_UNICO") == id_unico)
-        emision_row = emision_df.filter(pl.col("ID_UNICO") == id_unico)
-        
-        sua_existe = len(sua_row) > 0
-        emision_existe = len(emision_row) > 0
+    unido = unir_por_id_unico(sua_df, emision_df)
+    sua_columns = sua_df.columns
+    emision_columns = emision_df.columns
+    
+    def emision(col):
+        return pl.col(f"{col}{SUFIJO_EMISION}")
+    
+    valores = {col: pl.col(col) for col in sua_columns}
+    observaciones = []
+    
+    # Comparar NOMBRE_ASEGURADO
+    if "NOMBRE_ASEGURADO" in sua_columns and "NOMBRE_ASEGURADO" in emision_columns:
+        observaciones.append((pl.col("NOMBRE_ASEGURADO").ne_missing(emision("NOMBRE_ASEGURADO")), "NOMBRE DIFERENTE"))
+        valores["NOMBRE_ASEGURADO"] = emision("NOMBRE_ASEGURADO")
+    
+    # Mantener SDI de emisión, o de SUA si no existe en emisión
+    if "SDI" in emision_columns:
+        valores["SDI"] = emision("SDI")
+    
+    # Calcular diferencias para columnas numéricas (excluyendo SDI)
+    diferencia_total = pl.lit(0.0)
+    cuotas_con_diferencia = []
+    diferencia_dias = pl.lit(False)
+    for columna in COLUMNAS_COMPARACION_MENSUAL:
+        if columna in sua_columns and columna in emision_columns:
+            diferencia = diferencia_redondeada(pl.col(columna), emision(columna), TIPOS_COLUMNAS[columna])
+            valores[columna] = diferencia
+            if columna == "DIAS":
+                diferencia_dias = diferencia != 0
+                observaciones.append((diferencia > 0, "MAS DIAS EN SUA"))
+                observaciones.append((diferencia < 0, "MAS DIAS EN EMISION"))
+            elif columna == "TOTAL":
+                diferencia_total = diferencia
+            else:
+                cuotas_con_diferencia.append(diferencia != 0)
+    
+    # Comentarios especiales cuando solo hay diferencias en cuotas
+    if cuotas_con_diferencia:
+        def resultado(col):
+            return valores.get(col, pl.lit(0))
         
-        # Preparar fila resultado
-        if sua_existe:
-            sua_data = sua_row.to_dicts()[0]
-            resultado = sua_data.copy()
-        else:
-            emision_data = emision_row.to_dicts()[0]
-            resultado = {col: None for col in sua_df.columns}
-            resultado["RP"] = emision_data["RP"]
-            resultado["NSS"] = emision_data["NSS"]
-            resultado["ID_UNICO"] = emision_data["ID_UNICO"]
-        
-        observaciones = []
-        
-        # Procesar según disponibilidad de datos
-        if sua_existe and emision_existe:
-            sua_data = sua_row.to_dicts()[0]
-            emision_data = emision_row.to_dicts()[0]
-            
-            # Comparar NOMBRE_ASEGURADO
-            if "NOMBRE_ASEGURADO" in sua_data and "NOMBRE_ASEGURADO" in emision_data:
-                if sua_data["NOMBRE_ASEGURADO"] != emision_data["NOMBRE_ASEGURADO"]:
-                    observaciones.append("NOMBRE DIFERENTE")
-                resultado["NOMBRE_ASEGURADO"] = emision_data["NOMBRE_ASEGURADO"]
-            
-            # Comparar N_CREDITO
-            if "N_CREDITO" in sua_data and "N_CREDITO" in emision_data:
-                sua_credito = sua_data["N_CREDITO"] or "-"
-                emision_credito = emision_data["N_CREDITO"] or "-"
-                
-                # Solo comparar si ambos tienen valores diferentes a "-"
-                if sua_credito != "-" and emision_credito != "-" and sua_credito != emision_credito:
-                    observaciones.append("NUMERO DE CREDITO DIFERENTE")
-                
-                # Mantener el valor de emisión si existe, sino el de SUA
-                resultado["N_CREDITO"] = emision_credito if emision_credito != "-" else sua_credito
-            
-            # Mantener SDI de emisión, o de SUA si no existe en emisión
-            if "SDI" in emision_data:
-                resultado["SDI"] = emision_data["SDI"]
-            elif "SDI" in sua_data:
-                resultado["SDI"] = sua_data["SDI"]
-            
-            # Comparar y calcular diferencias para columnas numéricas (excluyendo SDI)
-            columnas_comparacion = ["DIAS", "RETIRO", "CEAV_PAT", "CEAV_OBR", "TOTAL_RCV", 
-                                  "APORTACION_PAT", "AMORTIZACION", "TOTAL_INF", "TOTAL"]
-            
-            diferencias_cuotas = False
-            diferencia_dias = False
-            diferencia_total = 0
-            diferencia_total_rcv = 0
-            
-            for columna in columnas_comparacion:
-                if columna in sua_data and columna in emision_data:
-                    sua_val = sua_data[columna] or 0
-                    emision_val = emision_data[columna] or 0
-                    
-                    # Redondear valores a 2 decimales para comparación precisa
-                    if isinstance(sua_val, (float, int)) and isinstance(emision_val, (float, int)):
-                        sua_val = round(float(sua_val), 2)
-                        emision_val = round(float(emision_val), 2)
-                    
-                    diferencia = sua_val - emision_val
-                    
-                    # Redondear la diferencia a 2 decimales
-                    diferencia = round(diferencia, 2)
-                    
-                    if columna == "DIAS":
-                        resultado[columna] = diferencia
-                        if diferencia != 0:
-                            diferencia_dias = True
-                            if diferencia > 0:
-                                observaciones.append("MAS DIAS EN SUA")
-                            else:
-                                observaciones.append("MAS DIAS EN EMISION")
-                    elif columna == "TOTAL":
-                        resultado[columna] = diferencia
-                        diferencia_total = diferencia
-                    elif columna == "TOTAL_RCV":
-                        resultado[columna] = diferencia
-                        diferencia_total_rcv = diferencia
-                    else:
-                        resultado[columna] = diferencia
-                        if diferencia != 0:
-                            diferencias_cuotas = True
-            
-            # Verificar diferencias por incapacidad/ausentismo en bimestral
-            if diferencia_total != 0:
-                inc_val = sua_data.get("INC", 0) or 0
-                aus_val = sua_data.get("AUS", 0) or 0
-                
-                if inc_val > 0 or aus_val > 0:
-                    dias_emision = emision_data.get("DIAS", 0) or 0
-                    ceav_pat_emision = emision_data.get("CEAV_PAT", 0) or 0
-                    ceav_obr_emision = emision_data.get("CEAV_OBR", 0) or 0
-                    
-                    # Verificar si hay diferencia en AMORTIZACION
-                    diferencia_amortizacion = 0
-                    if "AMORTIZACION" in sua_data and "AMORTIZACION" in emision_data:
-                        amortizacion_sua = sua_data.get("AMORTIZACION", 0) or 0
-                        amortizacion_emision = emision_data.get("AMORTIZACION", 0) or 0
-                        # Redondear valores a 2 decimales para comparación precisa
-                        amortizacion_sua = round(float(amortizacion_sua), 2)
-                        amortizacion_emision = round(float(amortizacion_emision), 2)
-                        diferencia_amortizacion = amortizacion_sua - amortizacion_emision
-                        diferencia_amortizacion = round(diferencia_amortizacion, 2)
-                    
-                    if dias_emision > 0:
-                        calculo_incapacidad = ((ceav_pat_emision + ceav_obr_emision) / dias_emision) * (inc_val + aus_val)
-                        # Redondear a 2 decimales para comparación precisa
-                        calculo_incapacidad = round(calculo_incapacidad, 2)
-                        diferencia_total_rcv_redondeada = round(abs(diferencia_total_rcv), 2)
-                        
-                        # Solo aplicar "SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO" si no hay diferencia en AMORTIZACION
-                        if (abs(diferencia_total_rcv_redondeada - abs(calculo_incapacidad)) < 0.40 and 
-                            diferencia_amortizacion == 0):
-                            observaciones = [obs for obs in observaciones if "DIFERENCIAS" not in obs]
-                            observaciones.append("SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO")
-                        else:
-                            if not any("DIFERENCIAS" in obs for obs in observaciones):
-                                observaciones.append("DIFERENCIAS")
-                    else:
-                        if not any("DIFERENCIAS" in obs for obs in observaciones):
-                            observaciones.append("DIFERENCIAS")
-                else:
-                    if not any("DIFERENCIAS" in obs for obs in observaciones):
-                        observaciones.append("DIFERENCIAS")
-            
-            # Mantener valores de INC y AUS de SUA
-            resultado["INC"] = sua_data.get("INC", 0)
-            resultado["AUS"] = sua_data.get("AUS", 0)
-            
-            # Mantener valores que solo existen en emisión
-            resultado["T_CREDITO"] = emision_data.get("T_CREDITO", "")
-            resultado["V_CREDITO"] = emision_data.get("V_CREDITO", 0)
-            
-        elif sua_existe and not emision_existe:
-            observaciones.append("NO APARECE EN EMISION")
-        elif not sua_existe and emision_existe:
-            emision_data = emision_row.to_dicts()[0]
-            observaciones.append("NO APARECE EN SUA")
-            resultado["NOMBRE_ASEGURADO"] = emision_data.get("NOMBRE_ASEGURADO", "")
-            resultado["T_CREDITO"] = emision_data.get("T_CREDITO", "")
-            resultado["V_CREDITO"] = emision_data.get("V_CREDITO", 0)
-            resultado["N_CREDITO"] = emision_data.get("N_CREDITO", "")
-            # Valores nulos para columnas que no existen en emisión
-            for col in ["RFC", "CURP", "N_MOVS", "INC", "AUS"]:
-                resultado[col] = None
+        solo_cuotas = pl.any_horizontal(cuotas_con_diferencia) & ~diferencia_dias
+        rt_diferencia = resultado("RT").fill_null(0)
+        otras_diferencias = pl.any_horizontal([
+            _es_distinto_de_cero(resultado(col))
+            for col in ["CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR",
+                        "GMP_PAT", "GMP_OBR", "IV_PAT", "IV_OBR", "GPS"]
+        ])
+        prima_de_riesgo = solo_cuotas & (rt_diferencia != 0) & ~otras_diferencias
         
-        # Establecer observaciones finales
-        if not observaciones:
-            resultado["OBSERVACIONES"] = "SIN DIFERENCIAS"
-        else:
-            resultado["OBSERVACIONES"] = ", ".join(observaciones)
-        
-        resultados.append(resultado)
+        # Pensionado: diferencias únicamente (y en todas) las columnas GMP e IV
+        pensionado = (
+            solo_cuotas
+            & (rt_diferencia == 0)
+            & pl.all_horizontal([
+                _es_cero_o_nulo(resultado(col))
+                for col in ["CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR", "GPS"]
+            ])
+            & pl.all_horizontal([
+                _es_distinto_de_cero(resultado(col))
+                for col in ["GMP_PAT", "GMP_OBR", "IV_PAT", "IV_OBR"]
+            ])
+        )
+        observaciones.append((prima_de_riesgo, "REVISAR PRIMA DE RIESGO"))
+        observaciones.append((pensionado, "PENSIONADO"))
+    
+    # Verificar diferencias por incapacidad/ausentismo
+    inc_val = pl.col("INC").fill_null(0) if "INC" in sua_columns else pl.lit(0)
+    aus_val = pl.col("AUS").fill_null(0) if "AUS" in sua_columns else pl.lit(0)
+    dias_emision = emision("DIAS").fill_null(0) if "DIAS" in emision_columns else pl.lit(0)
+    total_emision = emision("TOTAL").fill_null(0) if "TOTAL" in emision_columns else pl.lit(0)
+    
+    calculo_incapacidad = ((total_emision.cast(pl.Float64) / dias_emision) * (inc_val + aus_val)).round(2)
+    sin_diferencias_incapacidad = (
+        ((inc_val > 0) | (aus_val > 0))
+        & (dias_emision > 0)
+        & ((diferencia_total.cast(pl.Float64).abs() - calculo_incapacidad.abs()).abs() < 0.40)  # Tolerancia para cálculo de incapacidad
+    )
+    observaciones.append((
+        (diferencia_total != 0) & sin_diferencias_incapacidad, "SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO"
+    ))
+    observaciones.append(((diferencia_total != 0) & ~sin_diferencias_incapacidad, "DIFERENCIAS"))
+    
+    # Mantener valores de INC y AUS de SUA
+    valores["INC"] = pl.col("INC") if "INC" in sua_columns else pl.lit(0)
+    valores["AUS"] = pl.col("AUS") if "AUS" in sua_columns else pl.lit(0)
+    
+    # Filas que solo aparecen en emisión
+    valores_solo_emision = {
+        "RP": emision("RP"),
+        "NSS": emision("NSS"),
+        "NOMBRE_ASEGURADO": emision("NOMBRE_ASEGURADO") if "NOMBRE_ASEGURADO" in emision_columns else pl.lit("")
+    }
+    
+    resultado_df = _armar_resultado(
+        unido, sua_columns, valores, valores_solo_emision, observaciones,
+        extras_ambos=["INC", "AUS"],
+        extras_solo_emision=["NOMBRE_ASEGURADO", "RFC", "CURP", "N_MOVS", "INC", "AUS"]
+    )
+    
+    # Ordenar por RP y después por NOMBRE ASEGURADO
+    return resultado_df.sort(["RP", "NOMBRE ASEGURADO"], maintain_order=True)
+
+
+def comparar_bimestral(sua_df, emision_df):
+    """
+    Compara la hoja bimestral de SUA contra la de emisión con un solo join por ID_UNICO.
     
-    # Convertir a DataFrame de polars
-    if resultados:
-        # Remover ID_UNICO antes de retornar
-        for resultado in resultados:
-            resultado.pop("ID_UNICO", None)
-        
-        resultado_df = pl.DataFrame(resultados)
-        
-        # Ordenar por RP y después por NOMBRE ASEGURADO
-        resultado_df = resultado_df.sort(["RP", "NOMBRE ASEGURADO"])
-        
-        # Reordenar columnas para que T_CREDITO y V_CREDITO vayan antes de N_CREDITO
-        columnas_originales = resultado_df.columns
-        columnas_reordenadas = []
-        
-        for col in columnas_originales:
-            if col not in ["T_CREDITO", "V_CREDITO", "N_CREDITO"]:
-                columnas_reordenadas.append(col)
-            elif col == "N_CREDITO":
-                # Insertar T_CREDITO y V_CREDITO antes de N_CREDITO
-                if "T_CREDITO" in columnas_originales:
-                    columnas_reordenadas.append("T_CREDITO")
-                if "V_CREDITO" in columnas_originales:
-                    columnas_reordenadas.append("V_CREDITO")
-                columnas_reordenadas.append("N_CREDITO")
-        
-        # Agregar cualquier columna faltante al final
-        for col in ["T_CREDITO", "V_CREDITO"]:
-            if col in columnas_originales and col not in columnas_reordenadas:
-                columnas_reordenadas.append(col)
-        
-        resultado_df = resultado_df.select(columnas_reordenadas)
-        
-        return resultado_df
-    else:
+    Args:
+        sua_df (pl.DataFrame): Hoja bimestral del SUA estructurado
+        emision_df (pl.DataFrame): Hoja bimestral (EBA) de la emisión estructurada
+    
+    Returns:
+        pl.DataFrame: Diferencias por trabajador con columna OBSERVACIONES
+    """
+    if sua_df.is_empty() and emision_df.is_empty():
         return pl.DataFrame()
+    
+    unido = unir_por_id_unico(sua_df, emision_df)
+    sua_columns = sua_df.columns
+    emision_columns = emision_df.columns
+    
+    def emision(col):
+        return pl.col(f"{col}{SUFIJO_EMISION}")
+    
+    valores = {col: pl.col(col) for col in sua_columns}
+    observaciones = []
+    
+    # Comparar NOMBRE_ASEGURADO
+    if "NOMBRE_ASEGURADO" in sua_columns and "NOMBRE_ASEGURADO" in emision_columns:
+        observaciones.append((pl.col("NOMBRE_ASEGURADO").ne_missing(emision("NOMBRE_ASEGURADO")), "NOMBRE DIFERENTE"))
+        valores["NOMBRE_ASEGURADO"] = emision("NOMBRE_ASEGURADO")
+    
+    # Comparar N_CREDITO, solo si ambos tienen valores diferentes a "-"
+    if "N_CREDITO" in sua_columns and "N_CREDITO" in emision_columns:
+        sua_credito = normalizar_credito(pl.col("N_CREDITO"))
+        emision_credito = normalizar_credito(emision("N_CREDITO"))
+        observaciones.append((
+            (sua_credito != SIN_CREDITO) & (emision_credito != SIN_CREDITO) & (sua_credito != emision_credito),
+            "NUMERO DE CREDITO DIFERENTE"
+        ))
+        # Mantener el valor de emisión si existe, sino el de SUA
+        valores["N_CREDITO"] = pl.when(emision_credito != SIN_CREDITO).then(emision_credito).otherwise(sua_credito)
+    
+    # Mantener SDI de emisión, o de SUA si no existe en emisión
+    if "SDI" in emision_columns:
+        valores["SDI"] = emision("SDI")
+    
+    # Calcular diferencias para columnas numéricas (excluyendo SDI)
+    diferencia_total = pl.lit(0.0)
+    diferencia_total_rcv = pl.lit(0.0)
+    for columna in COLUMNAS_COMPARACION_BIMESTRAL:
+        if columna in sua_columns and columna in emision_columns:
+            diferencia = diferencia_redondeada(pl.col(columna), emision(columna), TIPOS_COLUMNAS[columna])
+            valores[columna] = diferencia
+            if columna == "DIAS":
+                observaciones.append((diferencia > 0, "MAS DIAS EN SUA"))
+                observaciones.append((diferencia < 0, "MAS DIAS EN EMISION"))
+            elif columna == "TOTAL":
+                diferencia_total = diferencia
+            elif columna == "TOTAL_RCV":
+                diferencia_total_rcv = diferencia
+    
+    # Verificar diferencias por incapacidad/ausentismo en bimestral
+    inc_val = pl.col("INC").fill_null(0) if "INC" in sua_columns else pl.lit(0)
+    aus_val = pl.col("AUS").fill_null(0) if "AUS" in sua_columns else pl.lit(0)
+    dias_emision = emision("DIAS").fill_null(0) if "DIAS" in emision_columns else pl.lit(0)
+    ceav_pat_emision = emision("CEAV_PAT").fill_null(0) if "CEAV_PAT" in emision_columns else pl.lit(0)
+    ceav_obr_emision = emision("CEAV_OBR").fill_null(0) if "CEAV_OBR" in emision_columns else pl.lit(0)
+    
+    # Diferencia en AMORTIZACION (si existe en ambos archivos)
+    if "AMORTIZACION" in sua_columns and "AMORTIZACION" in emision_columns:
+        diferencia_amortizacion = diferencia_redondeada(pl.col("AMORTIZACION"), emision("AMORTIZACION"),
+                                                        TIPOS_COLUMNAS["AMORTIZACION"])
+    else:
+        diferencia_amortizacion = pl.lit(0.0)
+    
+    calculo_incapacidad = (
+        ((ceav_pat_emision + ceav_obr_emision).cast(pl.Float64) / dias_emision) * (inc_val + aus_val)
+    ).round(2)
+    # Solo aplicar "SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO" si no hay diferencia en AMORTIZACION
+    sin_diferencias_incapacidad = (
+        ((inc_val > 0) | (aus_val > 0))
+        & (dias_emision > 0)
+        & ((diferencia_total_rcv.cast(pl.Float64).abs() - calculo_incapacidad.abs()).abs() < 0.40)
+        & (diferencia_amortizacion == 0)
+    )
+    observaciones.append((
+        (diferencia_total != 0) & sin_diferencias_incapacidad, "SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO"
+    ))
+    observaciones.append(((diferencia_total != 0) & ~sin_diferencias_incapacidad, "DIFERENCIAS"))
+    
+    # Mantener valores de INC y AUS de SUA y los que solo existen en emisión
+    valores["INC"] = pl.col("INC") if "INC" in sua_columns else pl.lit(0)
+    valores["AUS"] = pl.col("AUS") if "AUS" in sua_columns else pl.lit(0)
+    t_credito_emision = emision("T_CREDITO") if "T_CREDITO" in emision_columns else pl.lit("")
+    v_credito_emision = emision("V_CREDITO") if "V_CREDITO" in emision_columns else pl.lit(0)
+    valores["T_CREDITO"] = t_credito_emision
+    valores["V_CREDITO"] = v_credito_emision
+    
+    # Filas que solo aparecen en emisión
+    valores_solo_emision = {
+        "RP": emision("RP"),
+        "NSS": emision("NSS"),
+        "NOMBRE_ASEGURADO": emision("NOMBRE_ASEGURADO") if "NOMBRE_ASEGURADO" in emision_columns else pl.lit(""),
+        "T_CREDITO": t_credito_emision,
+        "V_CREDITO": v_credito_emision,
+        "N_CREDITO": emision("N_CREDITO") if "N_CREDITO" in emision_columns else pl.lit("")
+    }
+    
+    resultado_df = _armar_resultado(
+        unido, sua_columns, valores, valores_solo_emision, observaciones,
+        extras_ambos=["INC", "AUS", "T_CREDITO", "V_CREDITO"],
+        extras_solo_emision=["NOMBRE_ASEGURADO", "T_CREDITO", "V_CREDITO", "N_CREDITO",
+                             "RFC", "CURP", "N_MOVS", "INC", "AUS"]
+    )
+    
+    # Ordenar por RP y después por NOMBRE ASEGURADO
+    resultado_df = resultado_df.sort(["RP", "NOMBRE ASEGURADO"], maintain_order=True)
+    
+    # Reordenar columnas para que T_CREDITO y V_CREDITO vayan antes de N_CREDITO
+    columnas_originales = resultado_df.columns
+    columnas_reordenadas = []
+    
+    for col in columnas_originales:
+        if col not in ["T_CREDITO", "V_CREDITO", "N_CREDITO"]:
+            columnas_reordenadas.append(col)
+        elif col == "N_CREDITO":
+            # Insertar T_CREDITO y V_CREDITO antes de N_CREDITO
+            if "T_CREDITO" in columnas_originales:
+                columnas_reordenadas.append("T_CREDITO")
+            if "V_CREDITO" in columnas_originales:
+                columnas_reordenadas.append("V_CREDITO")
+            columnas_reordenadas.append("N_CREDITO")
+    
+    # Agregar cualquier columna faltante al final
+    for col in ["T_CREDITO", "V_CREDITO"]:
+        if col in columnas_originales and col not in columnas_reordenadas:
+            columnas_reordenadas.append(col)
+    
+    return resultado_df.select(columnas_reordenadas)
 
 
 def escribir_dataframe_a_excel(worksheet, dataframe, purple_fill, green_font):
-    """Escribe un DataFrame de polars a una hoja de Excel con formato"""
+    """Escribe un DataFrame de polars a una hoja de Excel (modo write_only) con formato"""
     
     if dataframe.is_empty():
         return
     
-    # Convertir a pandas para facilitar escritura a Excel
-    df_pandas = dataframe.to_pandas()
-    
-    # Escribir encabezados
-    for col_idx, column_name in enumerate(df_pandas.columns, 1):
-        cell = worksheet.cell(row=1, column=col_idx)
-        cell.value = column_name
-        cell.fill = purple_fill
-        cell.font = green_font
-    
-    # Escribir datos
-    for row_idx, row in enumerate(df_pandas.itertuples(index=False), 2):
-        for col_idx, value in enumerate(row, 1):
-            worksheet.cell(row=row_idx, column=col_idx).value = value
\ No newline at end of file
+    # Las filas se agregan completas directo desde las columnas de polars
+    escribir_hoja(worksheet, dataframe, purple_fill, green_font, ajustar_ancho=False)
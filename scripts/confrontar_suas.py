@@ -4,6 +4,9 @@ import os
 import re
 from openpyxl.styles import PatternFill, Font
 from openpyxl import Workbook
+from confronta import unir_por_id_unico, columnas_por_origen, diferencia_redondeada
+from esquemas import TIPOS_COLUMNAS, aplicar_esquema
+from salida_excel import ajustar_anchos
 
 def confronta_entre_suas(sua1_path, sua2_path, archive_path):
     sua1_filename = os.path.basename(sua1_path)
@@ -45,159 +48,96 @@ def confronta_entre_suas(sua1_path, sua2_path, archive_path):
     
     return output_path
 
+# Sufijo de las columnas del segundo SUA después del join
+SUFIJO_SUA2 = "__SUA2"
+
+
 def procesar_hoja_sua_mensual(sua1_path, sua2_path):
     try:
-        sua1_df = pl.read_excel(sua1_path, sheet_name="SUA_MENSUAL")
-        sua2_df = pl.read_excel(sua2_path, sheet_name="SUA_MENSUAL")
+        sua1_df = aplicar_esquema(pl.read_excel(sua1_path, sheet_name="SUA_MENSUAL"))
+        sua2_df = aplicar_esquema(pl.read_excel(sua2_path, sheet_name="SUA_MENSUAL"))
     except Exception as e:
         raise ValueError(f"Error al leer los archivos Excel: {e}")
     
-    sua1_df = sua1_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    sua2_df = sua2_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    todas_ids = set(sua1_df["ID_UNICO"].to_list()) | set(sua2_df["ID_UNICO"].to_list())
-    
-    resultados = []
-    
-    for id_unico in todas_ids:
-        sua1_row = sua1_df.filter(pl.col("ID_UNICO") == id_unico)
-        sua2_row = sua2_df.filter(pl.col("ID_UNICO") == id_unico)
-        
-        sua1_existe = len(sua1_row) > 0
-        sua2_existe = len(sua2_row) > 0
-        
-        if sua1_existe:
-            sua1_data = sua1_row.to_dicts()[0]
-            resultado = sua1_data.copy()
-        else:
-            sua2_data = sua2_row.to_dicts()[0]
-            resultado = {col: None for col in sua1_df.columns}
-            resultado["RP"] = sua2_data["RP"]
-            resultado["NSS"] = sua2_data["NSS"]
-            resultado["ID_UNICO"] = sua2_data["ID_UNICO"]
-        
-        if sua1_existe and sua2_existe:
-            sua1_data = sua1_row.to_dicts()[0]
-            sua2_data = sua2_row.to_dicts()[0]
-            
-            resultado["NOMBRE ASEGURADO"] = sua2_data["NOMBRE ASEGURADO"]
-            resultado["RFC"] = sua2_data["RFC"]
-            resultado["CURP"] = sua2_data["CURP"]
-            resultado["N_MOVS"] = sua2_data["N_MOVS"]
-            resultado["SDI"] = sua2_data["SDI"]
-            resultado["INC"] = sua1_data.get("INC", 0)
-            resultado["AUS"] = sua1_data.get("AUS", 0)
-            
-            columnas_numericas = ["DIAS", "CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR", 
-                                "GMP_PAT", "GMP_OBR", "RT", "IV_PAT", "IV_OBR", "GPS", "TOTAL"]
-            
-            for columna in columnas_numericas:
-                if columna in sua1_data and columna in sua2_data:
-                    sua1_val = sua1_data[columna] or 0
-                    sua2_val = sua2_data[columna] or 0
-                    
-                    if isinstance(sua1_val, (float, int)) and isinstance(sua2_val, (float, int)):
-                        sua1_val = round(float(sua1_val), 2)
-                        sua2_val = round(float(sua2_val), 2)
-                    
-                    diferencia = sua1_val - sua2_val
-                    diferencia = round(diferencia, 2)
-                    resultado[columna] = diferencia
-                    
-        elif sua1_existe and not sua2_existe:
-            pass
-        elif not sua1_existe and sua2_existe:
-            sua2_data = sua2_row.to_dicts()[0]
-            resultado["NOMBRE ASEGURADO"] = sua2_data.get("NOMBRE ASEGURADO", "")
-            for col in ["RFC", "CURP", "N_MOVS", "INC", "AUS"]:
-                resultado[col] = None
-        
-        resultados.append(resultado)
-    
-    result_df = pl.DataFrame(resultados)
-    return result_df.to_pandas()
+    columnas_numericas = ["DIAS", "CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR", 
+                        "GMP_PAT", "GMP_OBR", "RT", "IV_PAT", "IV_OBR", "GPS", "TOTAL"]
+    
+    return comparar_suas(sua1_df, sua2_df, columnas_numericas,
+                         ["NOMBRE ASEGURADO", "RFC", "CURP", "N_MOVS", "SDI"],
+                         ["RFC", "CURP", "N_MOVS", "INC", "AUS"])
 
 def procesar_hoja_sua_bimestral(sua1_path, sua2_path):
     try:
-        sua1_df = pl.read_excel(sua1_path, sheet_name="SUA_BIMESTRAL")
-        sua2_df = pl.read_excel(sua2_path, sheet_name="SUA_BIMESTRAL")
+        sua1_df = aplicar_esquema(pl.read_excel(sua1_path, sheet_name="SUA_BIMESTRAL"))
+        sua2_df = aplicar_esquema(pl.read_excel(sua2_path, sheet_name="SUA_BIMESTRAL"))
     except Exception as e:
         raise ValueError(f"Error al leer las hojas SUA_BIMESTRAL: {e}")
     
-    sua1_df = sua1_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    sua2_df = sua2_df.with_columns([
-        pl.concat_str([pl.col("RP").cast(pl.Utf8).str.slice(0, 10), pl.col("NSS")], separator="_").alias("ID_UNICO")
-    ])
-    
-    todas_ids = set(sua1_df["ID_UNICO"].to_list()) | set(sua2_df["ID_UNICO"].to_list())
-    
-    resultados = []
-    
-    for id_unico in todas_ids:
-        sua1_row = sua1_df.filter(pl.col("ID_UNICO") == id_unico)
-        sua2_row = sua2_df.filter(pl.col("ID_UNICO") == id_unico)
-        
-        sua1_existe = len(sua1_row) > 0
-        sua2_existe = len(sua2_row) > 0
-        
-        if sua1_existe:
-            sua1_data = sua1_row.to_dicts()[0]
-            resultado = sua1_data.copy()
-        else:
-            sua2_data = sua2_row.to_dicts()[0]
-            resultado = {col: None for col in sua1_df.columns}
-            resultado["RP"] = sua2_data["RP"]
-            resultado["NSS"] = sua2_data["NSS"]
-            resultado["ID_UNICO"] = sua2_data["ID_UNICO"]
-        
-        if sua1_existe and sua2_existe:
-            sua1_data = sua1_row.to_dicts()[0]
-            sua2_data = sua2_row.to_dicts()[0]
-            
-            resultado["NOMBRE ASEGURADO"] = sua2_data["NOMBRE ASEGURADO"]
-            resultado["RFC"] = sua2_data["RFC"]
-            resultado["CURP"] = sua2_data["CURP"]
-            resultado["N_MOVS"] = sua2_data["N_MOVS"]
-            resultado["SDI"] = sua2_data["SDI"]
-            resultado["N_CREDITO"] = sua2_data["N_CREDITO"]
-            resultado["INC"] = sua1_data.get("INC", 0)
-            resultado["AUS"] = sua1_data.get("AUS", 0)
-            
-            columnas_numericas = ["DIAS", "RETIRO", "CEAV_PAT", "CEAV_OBR", "TOTAL_RCV", 
-                                "APORTACION_PAT", "AMORTIZACION", "TOTAL_INF", "TOTAL"]
-            
-            for columna in columnas_numericas:
-                if columna in sua1_data and columna in sua2_data:
-                    sua1_val = sua1_data[columna] or 0
-                    sua2_val = sua2_data[columna] or 0
-                    
-                    if isinstance(sua1_val, (float, int)) and isinstance(sua2_val, (float, int)):
-                        sua1_val = round(float(sua1_val), 2)
-                        sua2_val = round(float(sua2_val), 2)
-                    
-                    diferencia = sua1_val - sua2_val
-                    diferencia = round(diferencia, 2)
-                    resultado[columna] = diferencia
-                    
-        elif sua1_existe and not sua2_existe:
-            pass
-        elif not sua1_existe and sua2_existe:
-            sua2_data = sua2_row.to_dicts()[0]
-            resultado["NOMBRE ASEGURADO"] = sua2_data.get("NOMBRE ASEGURADO", "")
-            for col in ["RFC", "CURP", "N_MOVS", "N_CREDITO", "INC", "AUS"]:
-                resultado[col] = None
-        
-        resultados.append(resultado)
-    
-    result_df = pl.DataFrame(resultados)
+    columnas_numericas = ["DIAS", "RETIRO", "CEAV_PAT", "CEAV_OBR", "TOTAL_RCV", 
+                        "APORTACION_PAT", "AMORTIZACION", "TOTAL_INF", "TOTAL"]
+    
+    return comparar_suas(sua1_df, sua2_df, columnas_numericas,
+                         ["NOMBRE ASEGURADO", "RFC", "CURP", "N_MOVS", "SDI", "N_CREDITO"],
+                         ["RFC", "CURP", "N_MOVS", "N_CREDITO", "INC", "AUS"])
+
+def comparar_suas(sua1_df, sua2_df, columnas_numericas, columnas_de_sua2, columnas_nulas_solo_sua2):
+    """
+    Compara dos SUA con un solo join por ID_UNICO (RP a 10 posiciones + NSS).
+    
+    Args:
+        sua1_df (pl.DataFrame): Hoja del primer SUA
+        sua2_df (pl.DataFrame): Hoja del segundo SUA
+        columnas_numericas (list): Columnas que se restan SUA1 - SUA2
+        columnas_de_sua2 (list): Columnas que toman el valor del segundo SUA cuando el ID existe en ambos
+        columnas_nulas_solo_sua2 (list): Columnas que quedan vacías cuando el ID solo existe en el segundo SUA
+    
+    Returns:
+        pd.DataFrame: Una fila por ID_UNICO con las diferencias calculadas
+    
+    Raises:
+        KeyError: Si hay IDs en ambos SUA y al segundo le falta alguna de columnas_de_sua2
+            (igual que el cálculo fila por fila). Las columnas numéricas que faltan en
+            alguno de los dos no se restan y conservan el valor del primer SUA.
+    """
+    unido = unir_por_id_unico(sua1_df, sua2_df, sufijo=SUFIJO_SUA2)
+    sua1_columns = unido.columns[:unido.columns.index("_EN_SUA")]
+    sua2_columns = sua2_df.columns
+    
+    hay_ambos = unido.select((pl.col("_EN_SUA") & pl.col("_EN_DERECHA")).any()).item()
+    hay_solo_sua2 = unido.select((~pl.col("_EN_SUA")).any()).item()
+    
+    faltantes = [col for col in columnas_de_sua2 if col not in sua2_columns]
+    if hay_ambos and faltantes:
+        raise KeyError(f"Al segundo SUA le faltan las columnas: {', '.join(faltantes)}")
+    
+    def sua2(col):
+        return pl.col(f"{col}{SUFIJO_SUA2}")
+    
+    valores_ambos = {col: pl.col(col) for col in sua1_columns}
+    for col in columnas_de_sua2:
+        if col in sua2_columns:
+            valores_ambos[col] = sua2(col)
+    valores_ambos["INC"] = pl.col("INC") if "INC" in sua1_columns else pl.lit(0)
+    valores_ambos["AUS"] = pl.col("AUS") if "AUS" in sua1_columns else pl.lit(0)
+    
+    for columna in columnas_numericas:
+        if columna in sua1_columns and columna in sua2_columns:
+            valores_ambos[columna] = diferencia_redondeada(pl.col(columna), sua2(columna), TIPOS_COLUMNAS[columna])
+    
+    valores_solo_sua2 = {
+        "RP": sua2("RP"),
+        "NSS": sua2("NSS"),
+        "ID_UNICO": sua2("ID_UNICO"),
+        "NOMBRE ASEGURADO": sua2("NOMBRE ASEGURADO") if "NOMBRE ASEGURADO" in sua2_columns else pl.lit("")
+    }
+    
+    columnas = list(sua1_columns)
+    if hay_ambos:
+        columnas += [col for col in valores_ambos if col not in columnas]
+    if hay_solo_sua2:
+        columnas += [col for col in ["NOMBRE ASEGURADO"] + columnas_nulas_solo_sua2 if col not in columnas]
+    
+    result_df = unido.select(columnas_por_origen(columnas, sua1_columns, valores_ambos, valores_solo_sua2))
     return result_df.to_pandas()
 
 def escribir_dataframe_a_excel(worksheet, df, header_fill, header_font):
@@ -211,14 +151,4 @@ def escribir_dataframe_a_excel(worksheet, df, header_fill, header_font):
         for col_num, cell_value in enumerate(row_data, 1):
             worksheet.cell(row=row_num, column=col_num, value=cell_value)
     
-    for column in worksheet.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        worksheet.column_dimensions[column_letter].width = adjusted_width
\ No newline at end of file
+    ajustar_anchos(worksheet, df)
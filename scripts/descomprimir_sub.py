@@ -1,109 +1,276 @@
 import os
+import json
+import zlib
+import queue
+import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
+from buscar_archivos import buscar_archivos
+
+
+# Tamaño de los bloques con que se copia cada archivo del zip al disco
+TAMAÑO_BLOQUE = 1024 * 1024
+
+# Manifiesto de los .zip descomprimidos, en el directorio raíz (ver procesar_archivos_zip)
+MANIFIESTO_ZIP = 'manifiesto_zip.json'
 
 
 def buscar_archivos_zip(directorio_raiz):
     """
     Busca recursivamente todos los archivos .zip en el directorio y sus subcarpetas
     """
-    archivos_zip = []
-    
-    for root, dirs, files in os.walk(directorio_raiz):
-        for file in files:
-            if file.lower().endswith('.zip'):
-                ruta_completa = os.path.join(root, file)
-                archivos_zip.append(ruta_completa)
-    
-    return archivos_zip
+    archivos_zip = buscar_archivos(directorio_raiz, extensiones=('.zip',), max_nivel=None)
+    return [archivo.ruta for archivo in archivos_zip]
+
+
+def crc_archivo(ruta):
+    """
+    Calcula el CRC-32 de un archivo en disco, leyéndolo por bloques
+    """
+    crc = 0
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMAÑO_BLOQUE), b''):
+            crc = zlib.crc32(bloque, crc)
+    return crc
 
 
-def descomprimir_archivo(ruta_zip, directorio_destino=None):
+def ruta_destino_segura(directorio_destino, nombre):
+    """
+    Ruta donde se escribe un archivo del zip, sin componentes que salgan del destino
+    ('..', rutas absolutas), igual que hace zipfile al extraer
+    """
+    nombre = os.path.splitdrive(nombre.replace(os.sep, '/'))[1]
+    partes = [parte for parte in nombre.split('/') if parte not in ('', '.', '..')]
+    return os.path.join(directorio_destino, *partes)
+
+
+def descomprimir_archivo(ruta_zip, directorio_destino=None, crc_archivos=None):
     """
     Descomprime un archivo .zip en el directorio especificado
     Si no se especifica directorio, se descomprime en la misma carpeta del .zip
+    
+    Si se pasa crc_archivos (ruta en disco -> [CRC-32, mtime]), un archivo que ya existe con
+    el mismo tamaño y CRC no se vuelve a escribir; el CRC guardado solo se usa si el archivo
+    conserva ese mtime (si no, se calcula). Al terminar, crc_archivos queda con la ruta,
+    el CRC y el mtime de cada archivo del zip
     """
     try:
         if directorio_destino is None:
             directorio_destino = os.path.dirname(ruta_zip)
+        if crc_archivos is None:
+            crc_archivos = {}
         
         with zipfile.ZipFile(ruta_zip, 'r') as zip_ref:
             # Obtener la lista de archivos en el zip
-            archivos_en_zip = zip_ref.namelist()
+            miembros = zip_ref.infolist()
             
             # Encontrar el directorio raíz común más profundo
             # Esto ayuda a extraer desde el nivel más interno cuando hay una sola carpeta contenedora
             directorios_raiz = set()
             archivos_en_raiz = []
             
-            for archivo in archivos_en_zip:
-                if '/' in archivo:
+            for miembro in miembros:
+                if '/' in miembro.filename:
                     # Es un archivo o carpeta dentro de un directorio
-                    primer_directorio = archivo.split('/')[0]
+                    primer_directorio = miembro.filename.split('/')[0]
                     directorios_raiz.add(primer_directorio)
                 else:
                     # Es un archivo en la raíz del zip
-                    archivos_en_raiz.append(archivo)
+                    archivos_en_raiz.append(miembro.filename)
             
             # Si hay solo un directorio raíz y no hay archivos en la raíz,
             # extraer desde ese directorio para evitar carpetas contenedoras innecesarias
+            prefijo_a_remover = ''
             if len(directorios_raiz) == 1 and len(archivos_en_raiz) == 0:
-                directorio_contenedor = list(directorios_raiz)[0]
-                prefijo_a_remover = directorio_contenedor + '/'
+                prefijo_a_remover = list(directorios_raiz)[0] + '/'
+            
+            extraidos = {}
+            sin_cambios = 0
+            for miembro in miembros:
+                # Remover el prefijo del directorio contenedor
+                nueva_ruta = miembro.filename[len(prefijo_a_remover):]
+                ruta_destino_archivo = ruta_destino_segura(directorio_destino, nueva_ruta)
                 
-                # Extraer removiendo el directorio contenedor
-                for archivo in archivos_en_zip:
-                    if archivo.startswith(prefijo_a_remover):
-                        # Remover el prefijo del directorio contenedor
-                        nueva_ruta = archivo[len(prefijo_a_remover):]
-                        
-                        if nueva_ruta:  # No procesar rutas vacías
-                            ruta_destino_archivo = os.path.join(directorio_destino, nueva_ruta)
-                            
-                            # Si es un directorio, crearlo
-                            if archivo.endswith('/'):
-                                os.makedirs(ruta_destino_archivo, exist_ok=True)
-                            else:
-                                # Si es un archivo, crear el directorio padre y extraer
-                                directorio_padre = os.path.dirname(ruta_destino_archivo)
-                                if directorio_padre:
-                                    os.makedirs(directorio_padre, exist_ok=True)
-                                
-                                # Leer el contenido del archivo del zip y escribirlo
-                                with zip_ref.open(archivo) as source, open(ruta_destino_archivo, 'wb') as target:
-                                    target.write(source.read())
-            else:
-                # Si hay múltiples directorios raíz o archivos en la raíz, extraer todo normalmente
-                zip_ref.extractall(directorio_destino)
+                if ruta_destino_archivo == directorio_destino:  # No procesar rutas vacías
+                    continue
+                
+                # Si es un directorio, crearlo
+                if miembro.is_dir():
+                    os.makedirs(ruta_destino_archivo, exist_ok=True)
+                    continue
+                
+                # Si el archivo ya existe igual (mismo tamaño y CRC), no se vuelve a escribir
+                if os.path.isfile(ruta_destino_archivo):
+                    estado = os.stat(ruta_destino_archivo)
+                    if estado.st_size == miembro.file_size:
+                        anterior = crc_archivos.get(ruta_destino_archivo)
+                        if anterior is not None and anterior[1] == estado.st_mtime_ns:
+                            crc_actual = anterior[0]
+                        else:
+                            crc_actual = crc_archivo(ruta_destino_archivo)
+                        if crc_actual == miembro.CRC:
+                            extraidos[ruta_destino_archivo] = [miembro.CRC, estado.st_mtime_ns]
+                            sin_cambios += 1
+                            continue
+                
+                # Si es un archivo, crear el directorio padre y extraer
+                directorio_padre = os.path.dirname(ruta_destino_archivo)
+                if directorio_padre:
+                    os.makedirs(directorio_padre, exist_ok=True)
+                
+                # Copiar el contenido por bloques, sin cargar el archivo completo en memoria
+                with zip_ref.open(miembro) as source, open(ruta_destino_archivo, 'wb') as target:
+                    shutil.copyfileobj(source, target, TAMAÑO_BLOQUE)
+                extraidos[ruta_destino_archivo] = [miembro.CRC, os.stat(ruta_destino_archivo).st_mtime_ns]
+        
+        crc_archivos.clear()
+        crc_archivos.update(extraidos)
         
-        return True, f"Descomprimido exitosamente: {os.path.basename(ruta_zip)}"
+        mensaje = f"Descomprimido exitosamente: {os.path.basename(ruta_zip)}"
+        if sin_cambios:
+            mensaje += f" ({sin_cambios} archivos sin cambios)"
+        return True, mensaje
         
     except Exception as e:
         return False, f"Error al descomprimir {os.path.basename(ruta_zip)}: {str(e)}"
 
 
-def procesar_archivos_zip(directorio_raiz, progreso_callback=None):
+def registro_valido(registro):
+    """
+    Indica si una entrada del manifiesto tiene el formato esperado
+    ({'tamaño': int, 'mtime': int, 'archivos': {ruta: [CRC, mtime]}})
+    """
+    if not isinstance(registro, dict):
+        return False
+    if not isinstance(registro.get('tamaño'), int) or not isinstance(registro.get('mtime'), int):
+        return False
+    archivos = registro.get('archivos')
+    return isinstance(archivos, dict) and all(
+        isinstance(ruta, str) and isinstance(crc_mtime, list) and len(crc_mtime) == 2
+        and all(isinstance(valor, int) for valor in crc_mtime)
+        for ruta, crc_mtime in archivos.items()
+    )
+
+
+def leer_manifiesto(directorio_raiz):
+    """
+    Lee el manifiesto de los .zip ya descomprimidos en el directorio:
+    ruta relativa del .zip -> {'tamaño', 'mtime', 'archivos': {ruta relativa: [CRC, mtime]}}
+    
+    Las entradas con otro formato (manifiesto editado a mano o dañado) se descartan; esos
+    .zip se vuelven a descomprimir
+    """
+    try:
+        with open(os.path.join(directorio_raiz, MANIFIESTO_ZIP), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(manifiesto, dict):
+        return {}
+    return {clave: registro for clave, registro in manifiesto.items() if registro_valido(registro)}
+
+
+def guardar_manifiesto(directorio_raiz, manifiesto):
+    """
+    Guarda el manifiesto de forma atómica (archivo temporal y os.replace)
     """
-    Procesa todos los archivos .zip encontrados en el directorio y subcarpetas
+    ruta = os.path.join(directorio_raiz, MANIFIESTO_ZIP)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def procesar_archivos_zip(directorio_raiz, progreso_callback=None, hilos=None):
+    """
+    Procesa todos los archivos .zip encontrados en el directorio y subcarpetas, varios a la
+    vez en un grupo de hilos. Los .zip de una misma carpeta se descomprimen uno tras otro
+    (pueden escribir los mismos archivos); progreso_callback se llama desde el hilo que
+    invoca esta función cada vez que termina un .zip.
+    
+    Los .zip ya descomprimidos que no han cambiado (mismo tamaño y fecha de modificación,
+    según el manifiesto del directorio) y cuyos archivos siguen en disco se omiten.
     """
     archivos_zip = buscar_archivos_zip(directorio_raiz)
     
     if not archivos_zip:
         return "No se encontraron archivos .zip en el directorio seleccionado."
     
-    resultados = []
     total_archivos = len(archivos_zip)
+    manifiesto = leer_manifiesto(directorio_raiz)
+    mensajes = {}
+    procesados = 0
+    
+    # Separar los .zip sin cambios desde la última vez y agrupar los demás por carpeta de destino
+    zips_por_carpeta = {}
+    datos_zip = {}
+    for ruta_zip in archivos_zip:
+        clave = os.path.relpath(ruta_zip, directorio_raiz)
+        estado = os.stat(ruta_zip)
+        registro = manifiesto.get(clave)
+        datos_zip[ruta_zip] = (clave, estado)
+        
+        if (registro is not None and registro['tamaño'] == estado.st_size
+                and registro['mtime'] == estado.st_mtime_ns
+                and all(os.path.isfile(os.path.join(directorio_raiz, ruta))
+                        for ruta in registro['archivos'])):
+            mensajes[ruta_zip] = f"Sin cambios, se omite: {os.path.basename(ruta_zip)}"
+            procesados += 1
+            if progreso_callback:
+                progreso_callback(procesados, total_archivos, os.path.basename(ruta_zip))
+            continue
+        
+        zips_por_carpeta.setdefault(os.path.dirname(ruta_zip), []).append(ruta_zip)
+    
+    terminados = queue.Queue()
+    
+    def descomprimir_carpeta(rutas_zip):
+        for ruta_zip in rutas_zip:
+            # Cada .zip deja siempre un resultado; si no, el ciclo de abajo esperaría para siempre
+            crc_archivos = {}
+            try:
+                # CRC de los archivos que dejó la extracción anterior de este .zip
+                registro = manifiesto.get(datos_zip[ruta_zip][0]) or {'archivos': {}}
+                crc_archivos = {os.path.join(directorio_raiz, ruta): crc_mtime
+                                for ruta, crc_mtime in registro['archivos'].items()}
+                exito, mensaje = descomprimir_archivo(ruta_zip, crc_archivos=crc_archivos)
+            except Exception as e:
+                exito, mensaje = False, f"Error al descomprimir {os.path.basename(ruta_zip)}: {str(e)}"
+            terminados.put((ruta_zip, exito, mensaje, crc_archivos))
     
-    for i, ruta_zip in enumerate(archivos_zip):
-        if progreso_callback:
-            progreso_callback(i + 1, total_archivos, os.path.basename(ruta_zip))
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for rutas_zip in zips_por_carpeta.values():
+            executor.submit(descomprimir_carpeta, rutas_zip)
         
-        exito, mensaje = descomprimir_archivo(ruta_zip)
-        resultados.append(mensaje)
+        while procesados < total_archivos:
+            ruta_zip, exito, mensaje, crc_archivos = terminados.get()
+            mensajes[ruta_zip] = mensaje
+            
+            clave, estado = datos_zip[ruta_zip]
+            if exito:
+                manifiesto[clave] = {
+                    'tamaño': estado.st_size,
+                    'mtime': estado.st_mtime_ns,
+                    'archivos': {os.path.relpath(ruta, directorio_raiz): crc_mtime
+                                 for ruta, crc_mtime in crc_archivos.items()}
+                }
+            else:
+                manifiesto.pop(clave, None)
+            
+            procesados += 1
+            if progreso_callback:
+                progreso_callback(procesados, total_archivos, os.path.basename(ruta_zip))
+    
+    try:
+        guardar_manifiesto(directorio_raiz, manifiesto)
+    except OSError as e:
+        print(f"No se pudo guardar el manifiesto: {e}")
     
-    return resultados
+    # Resultados en el mismo orden en que se encontraron los .zip
+    return [mensajes[ruta_zip] for ruta_zip in archivos_zip]
 
 
 class InterfazDescompresor:
@@ -150,6 +317,7 @@ Instrucciones:
 3. Los archivos se descomprimirán en la misma carpeta donde se encuentra cada .zip
 4. Si un .zip contiene solo una carpeta contenedora, se extraerá sin esa carpeta extra
 5. Si un .zip tiene múltiples carpetas/archivos en la raíz, se extraerá normalmente
+6. Los .zip ya descomprimidos que no han cambiado se omiten (ver manifiesto_zip.json)
         """
         
         info_label = ttk.Label(main_frame, text=info_text, justify=tk.LEFT, 
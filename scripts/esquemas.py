@@ -0,0 +1,130 @@
+import polars as pl
+
+
+# Tipos de las columnas de las hojas estructuradas (SUA_MENSUAL, SUA_BIMESTRAL, EMA y EBA).
+# Una misma columna tiene el mismo tipo en todas las hojas, así que una hoja leída de un
+# Excel se puede tipar solo con el nombre de sus columnas (aplicar_esquema).
+TEXTO = pl.Utf8
+REGISTRO_PATRONAL = pl.Categorical()  # Se repite en todas las filas de un mismo patrón
+DIAS = pl.Int16
+IMPORTE = pl.Decimal(18, 2)  # Pesos con centavos exactos (sumas y restas sin error de redondeo)
+
+# El NSS es un texto de 11 dígitos; si viene como número se completa con ceros a la izquierda
+LONGITUD_NSS = 11
+
+# Valor de N_CREDITO cuando el trabajador no tiene crédito (en lugar de nulo, "" o "-")
+SIN_CREDITO = '-'
+
+TIPOS_COLUMNAS = {
+    'RP': REGISTRO_PATRONAL,
+    'NSS': TEXTO,
+    'NOMBRE ASEGURADO': TEXTO,
+    'RFC': TEXTO,
+    'CURP': TEXTO,
+    'N_CREDITO': TEXTO,
+    'T_CREDITO': TEXTO,
+    'MOVIMIENTOS': TEXTO,
+    'DIAS': DIAS,
+    'INCAPACIDAD': DIAS,
+    'AUSENTISMO': DIAS,
+    'INC': DIAS,
+    'AUS': DIAS,
+    'V_CREDITO': pl.Float64,  # Porcentaje, cuota o factor según T_CREDITO; no es un importe
+    'SDI': IMPORTE,
+    'CF': IMPORTE,
+    'EXC_PAT': IMPORTE,
+    'EXC_OBR': IMPORTE,
+    'PD_PAT': IMPORTE,
+    'PD_OBR': IMPORTE,
+    'GMP_PAT': IMPORTE,
+    'GMP_OBR': IMPORTE,
+    'RT': IMPORTE,
+    'IV_PAT': IMPORTE,
+    'IV_OBR': IMPORTE,
+    'GPS': IMPORTE,
+    'RETIRO': IMPORTE,
+    'CEAV_PAT': IMPORTE,
+    'CEAV_OBR': IMPORTE,
+    'TOTAL_RCV': IMPORTE,
+    'APORTACION_PAT': IMPORTE,
+    'AMORTIZACION': IMPORTE,
+    'TOTAL_INF': IMPORTE,
+    'TOTAL': IMPORTE,
+}
+
+
+# Texto que se escribe en Excel en lugar de una celda vacía. V_CREDITO es numérico (nulo sin
+# crédito), pero en las hojas de Excel se muestra '-' igual que N_CREDITO
+VACIOS_EXCEL = {'V_CREDITO': SIN_CREDITO}
+
+
+def _esquema(columnas):
+    return pl.Schema([(columna, TIPOS_COLUMNAS[columna]) for columna in columnas])
+
+
+# Columnas (en orden) y tipos de cada hoja
+ESQUEMAS = {
+    'SUA_MENSUAL': _esquema([
+        'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'RFC', 'CURP', 'N_CREDITO', 'MOVIMIENTOS',
+        'INCAPACIDAD', 'AUSENTISMO', 'CF', 'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT',
+        'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS', 'TOTAL'
+    ]),
+    'SUA_BIMESTRAL': _esquema([
+        'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'N_CREDITO', 'RETIRO', 'CEAV_PAT',
+        'CEAV_OBR', 'APORTACION_PAT', 'AMORTIZACION', 'TOTAL'
+    ]),
+    'EMA': _esquema([
+        'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'CF', 'EXC_PAT', 'EXC_OBR', 'PD_PAT',
+        'PD_OBR', 'GMP_PAT', 'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS', 'TOTAL'
+    ]),
+    'EBA': _esquema([
+        'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'RETIRO', 'CEAV_PAT', 'CEAV_OBR',
+        'TOTAL_RCV', 'APORTACION_PAT', 'T_CREDITO', 'V_CREDITO', 'N_CREDITO', 'AMORTIZACION',
+        'TOTAL_INF', 'TOTAL'
+    ]),
+}
+
+
+def normalizar_credito(expr):
+    """N_CREDITO como texto, con SIN_CREDITO cuando viene vacío (nulo, "" o "-")"""
+    texto = expr.cast(pl.Utf8).str.strip_chars()
+    return pl.when(texto.is_null() | (texto == '')).then(pl.lit(SIN_CREDITO)).otherwise(texto)
+
+
+def _convertir(columna, origen, destino):
+    """Expresión que convierte una columna de su tipo de origen al del esquema"""
+    expr = pl.col(columna)
+    if destino == TEXTO or destino == REGISTRO_PATRONAL:
+        if origen.is_float():
+            # Números leídos de Excel (p. ej. 1234567890.0) como texto, sin '.0'
+            expr = pl.when(expr == expr.floor()).then(expr.cast(pl.Int64).cast(pl.Utf8)).otherwise(expr.cast(pl.Utf8))
+        elif origen != REGISTRO_PATRONAL:
+            expr = expr.cast(pl.Utf8)
+        if columna == 'NSS' and origen.is_numeric():
+            expr = expr.str.zfill(LONGITUD_NSS)
+        if columna == 'N_CREDITO':
+            expr = normalizar_credito(expr)
+        return expr.cast(destino)
+
+    # Un texto que no es número queda en nulo, igual que al leerlo de Excel
+    return expr.cast(destino, strict=origen.is_numeric())
+
+
+def aplicar_esquema(df):
+    """
+    Convierte las columnas conocidas de una hoja a sus tipos compactos (TIPOS_COLUMNAS):
+    RP categórico, NSS de 11 dígitos, días como Int16, importes como decimales exactos y
+    N_CREDITO siempre con texto. Las demás columnas se dejan igual.
+
+    Args:
+        df (pl.DataFrame | pl.LazyFrame): Hoja estructurada o leída de un Excel
+
+    Returns:
+        pl.DataFrame | pl.LazyFrame: La misma hoja con los tipos del esquema
+    """
+    expresiones = [
+        _convertir(columna, origen, TIPOS_COLUMNAS[columna]).alias(columna)
+        for columna, origen in df.collect_schema().items()
+        if columna in TIPOS_COLUMNAS and (origen != TIPOS_COLUMNAS[columna] or columna == 'N_CREDITO')
+    ]
+    return df.with_columns(expresiones) if expresiones else df
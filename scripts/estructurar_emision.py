@@ -1,13 +1,15 @@
 import os
 import pandas as pd
-import xlrd
 from openpyxl import load_workbook
+from salida_excel import ajustar_anchos
+from buscar_archivos import buscar_archivos
 from openpyxl.styles import PatternFill, Font, Alignment
+from estructurar_emision_mod import abrir_emision
 
 def estructurar_1emision(emision_path):
-    # Cargar el archivo de Excel (.xls) usando xlrd
-    wb = xlrd.open_workbook(emision_path)
-    ws = wb.sheet_by_index(0)  # Primera hoja (índice 0)
+    # Cargar el archivo de Excel (.xls) una sola vez
+    emision = abrir_emision(emision_path)
+    ws = emision.book.sheet_by_index(0)  # Primera hoja (índice 0)
 
     """
     Tenemos que verificar la celda B8 de la primera hoja del arcihivo para ver a que periodo pertenece
@@ -29,7 +31,7 @@ def estructurar_1emision(emision_path):
     
     # Leer la hoja 2 (Emision Mensual)
     # El encabezado de la hoja 2 esta en la fila 5 y para manejar mejor los datos tenemos que convertirlos a csv
-    ema = pd.read_excel(emision_path, sheet_name=1, header=4, engine='xlrd')
+    ema = emision.parse(1, header=4)
 
     # Eliminar filas con el valor 2 en "Tipo del Movimiento"
     ema = ema[ema['Tipo del Movimiento'] != 2]
@@ -85,7 +87,7 @@ def estructurar_1emision(emision_path):
         print(f"Mes par ({mes}) detectado, procesando también la hoja 3...")
         
         # Leer la hoja 3 (similar a la hoja 2)
-        eba = pd.read_excel(emision_path, sheet_name=2, header=4, engine='xlrd')
+        eba = emision.parse(2, header=4)
 
         # Eliminar filas con el valor 2 en "Tipo del Movimiento"
         eba = eba[eba['Tipo del Movimiento'] != 2]
@@ -142,6 +144,8 @@ def estructurar_1emision(emision_path):
         print(f"DataFrame eba creado con {len(eba)} filas")
     else:
         print(f"Mes impar ({mes}) detectado, solo se procesó la hoja 2")
+    
+    emision.close()
 
     # Crear archivo Excel con openpyxl
     # Crear el nombre del archivo
@@ -176,17 +180,7 @@ def estructurar_1emision(emision_path):
         cell.alignment = Alignment(horizontal='center', vertical='center')
     
     # Ajustar ancho de columnas para EMA
-    for column in ws_ema.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws_ema.column_dimensions[column_letter].width = adjusted_width
+    ajustar_anchos(ws_ema, ema)
     
     # Si existe hoja EBA, aplicar el mismo formato
     if mes % 2 == 0:
@@ -199,17 +193,7 @@ def estructurar_1emision(emision_path):
             cell.alignment = Alignment(horizontal='center', vertical='center')
         
         # Ajustar ancho de columnas para EBA
-        for column in ws_eba.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws_eba.column_dimensions[column_letter].width = adjusted_width
+        ajustar_anchos(ws_eba, eba)
     
     # Guardar el archivo con formato
     wb.save(output_path)
@@ -232,41 +216,17 @@ def estrucurar_varias_emisiones(folder_path):
         print(f"La carpeta {folder_path} no existe.")
         return None
     
-    def buscar_archivos_emision(directorio, nivel=0, max_nivel=5):
-        """Busca archivos .xls de emisión recursivamente hasta el nivel máximo especificado"""
-        archivos_emision = []
-        
-        if nivel > max_nivel:
-            return archivos_emision
-        
-        try:
-            for item in os.listdir(directorio):
-                item_path = os.path.join(directorio, item)
-                
-                if os.path.isfile(item_path) and item.endswith('.xls'):
-                    # Verificar que sea un archivo de emisión válido
-                    try:
-                        wb = xlrd.open_workbook(item_path)
-                        ws = wb.sheet_by_index(0)
-                        # Verificar si tiene el formato esperado (periodo en B8)
-                        periodo = ws.cell_value(7, 1)  # B8
-                        if isinstance(periodo, str) and '/' in periodo:
-                            archivos_emision.append(item_path)
-                    except Exception:
-                        # Si no puede leer el archivo o no tiene el formato esperado, lo omite
-                        continue
-                elif os.path.isdir(item_path) and nivel < max_nivel:
-                    archivos_emision.extend(buscar_archivos_emision(item_path, nivel + 1, max_nivel))
-        except PermissionError:
-            print(f"Sin permisos para acceder a: {directorio}")
-        except Exception as e:
-            print(f"Error accediendo a {directorio}: {e}")
-        
-        return archivos_emision
+    def es_emision_valida(archivo_path):
+        """Revisa que el .xls tenga el formato esperado de emisión (periodo en B8)"""
+        # Solo se analiza la primera hoja; si no puede leer el archivo, se omite
+        with abrir_emision(archivo_path) as emision:
+            periodo = emision.book.sheet_by_index(0).cell_value(7, 1)  # B8
+        return isinstance(periodo, str) and '/' in periodo
     
     # Buscar todos los archivos de emisión en la carpeta y subcarpetas
     print("Buscando archivos de emisión (.xls) en carpeta y subcarpetas (máximo 5 niveles)...")
-    archivos_emision_paths = buscar_archivos_emision(folder_path)
+    archivos_emision_paths = [archivo.ruta for archivo in
+                              buscar_archivos(folder_path, extensiones=('.xls',), filtro=es_emision_valida)]
     
     if not archivos_emision_paths:
         print("No se encontraron archivos de emisión válidos en la carpeta especificada ni en subcarpetas.")
@@ -290,10 +250,11 @@ def estrucurar_varias_emisiones(folder_path):
         archivo_nombre = os.path.basename(archivo_path)
         print(f"Procesando archivo: {archivo_nombre}")
         
+        emision = None
         try:
-            # Cargar el archivo de Excel (.xls) usando xlrd
-            wb = xlrd.open_workbook(archivo_path)
-            ws = wb.sheet_by_index(0)  # Primera hoja
+            # Cargar el archivo de Excel (.xls) una sola vez
+            emision = abrir_emision(archivo_path)
+            ws = emision.book.sheet_by_index(0)  # Primera hoja
             
             # Verificar el periodo en la celda B8
             periodo = ws.cell_value(7, 1)  # B8 = fila 7, columna 1
@@ -316,7 +277,7 @@ def estrucurar_varias_emisiones(folder_path):
             
             # Procesar hoja 2 (Emisión Mensual - EMA)
             try:
-                ema = pd.read_excel(archivo_path, sheet_name=1, header=4, engine='xlrd')
+                ema = emision.parse(1, header=4)
                 
                 # Aplicar las mismas transformaciones que en la función individual
                 ema = ema[ema['Tipo del Movimiento'] != 2]
@@ -367,7 +328,7 @@ def estrucurar_varias_emisiones(folder_path):
             # Procesar hoja 3 (Emisión Bimestral - EBA) solo si el mes es par
             if crear_hoja_eba:
                 try:
-                    eba = pd.read_excel(archivo_path, sheet_name=2, header=4, engine='xlrd')
+                    eba = emision.parse(2, header=4)
                     
                     # Aplicar las mismas transformaciones que en la función individual
                     eba = eba[eba['Tipo del Movimiento'] != 2]
@@ -420,6 +381,9 @@ def estrucurar_varias_emisiones(folder_path):
         except Exception as e:
             print(f"Error procesando archivo {archivo_nombre}: {e}")
             continue
+        finally:
+            if emision is not None:
+                emision.close()
     
     # Verificar que se encontraron registros
     if not todos_ema:
@@ -474,17 +438,7 @@ def estrucurar_varias_emisiones(folder_path):
             cell.alignment = Alignment(horizontal='center', vertical='center')
         
         # Ajustar ancho de columnas para EMA
-        for column in ws_ema.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws_ema.column_dimensions[column_letter].width = adjusted_width
+        ajustar_anchos(ws_ema, ema_combinado)
         
         # Si existe hoja EBA, aplicar el mismo formato
         if eba_combinado is not None:
@@ -497,17 +451,7 @@ def estrucurar_varias_emisiones(folder_path):
                 cell.alignment = Alignment(horizontal='center', vertical='center')
             
             # Ajustar ancho de columnas para EBA
-            for column in ws_eba.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws_eba.column_dimensions[column_letter].width = adjusted_width
+            ajustar_anchos(ws_eba, eba_combinado)
         
         # Guardar el archivo con formato
         wb.save(output_path)
@@ -1,57 +1,311 @@
 import os
+import io
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import xlrd
-from openpyxl import load_workbook
+import polars as pl
+from salida_excel import guardar_hojas_excel
+from salida_formatos import FORMATO_EXCEL, guardar_en_formatos, a_polars
 from openpyxl.styles import PatternFill, Font, Alignment
+from cache_estructurados import clave_archivo, leer_cache, guardar_cache
+from buscar_archivos import buscar_archivos
+from archivos_zip import dividir_ruta_zip, leer_bytes, abrir_archivo, carpeta_real
+from esquemas import aplicar_esquema
 
 
-def estrucurar_varias_emisiones_destino(folder_path, output_folder=None):
+# Archivos de emisión por proceso al repartir una carpeta; con menos archivos, arrancar
+# los procesos cuesta más que leerlos en el proceso actual
+ARCHIVOS_POR_PROCESO = 2
+
+# Primeros bytes de un .xls: contenedor OLE2 o, en libros muy antiguos, un registro BOF de BIFF
+FIRMA_OLE2 = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+FIRMAS_XLS = (FIRMA_OLE2, b'\x09\x00', b'\x09\x02', b'\x09\x04', b'\x09\x08')
+
+
+def abrir_libro_xls(archivo_path):
     """
-    Función modificada para procesar múltiples archivos de emisión en una carpeta y combinarlos 
-    en un solo archivo Excel con hojas EMA y EBA (si aplica), guardando en carpeta específica.
+    Abre un .xls con xlrd cargando las hojas bajo demanda; si está dentro de un .zip se lee
+    del .zip en memoria, sin extraerlo.
     
     Args:
-        folder_path (str): Ruta de la carpeta que contiene los archivos de emisión
-        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa folder_path.
+        archivo_path (str): Ruta del .xls (en disco o dentro de un .zip)
     
     Returns:
-        str: Ruta del archivo Excel creado, o None si ocurre un error
+        xlrd.book.Book: Libro abierto
     """
+    if dividir_ruta_zip(archivo_path)[0] is not None:
+        return xlrd.open_workbook(file_contents=leer_bytes(archivo_path), on_demand=True)
+    return xlrd.open_workbook(archivo_path, on_demand=True)
+
+
+def abrir_emision(archivo_path):
+    """
+    Abre el archivo de emisión (.xls) una sola vez. Cada hoja se analiza solo cuando se
+    pide y se reutiliza para las celdas B8/B9 (emision.book) y para las hojas EMA y EBA
+    (emision.parse).
     
-    if not os.path.exists(folder_path):
-        print(f"La carpeta {folder_path} no existe.")
-        return None
+    Args:
+        archivo_path (str): Ruta del archivo de emisión (.xls)
     
-    def buscar_archivos_emision(directorio, nivel=0, max_nivel=5):
-        """Busca archivos .xls de emisión recursivamente hasta el nivel máximo especificado"""
-        archivos_emision = []
+    Returns:
+        pd.ExcelFile: Libro abierto; se debe cerrar con close() o usarlo con `with`
+    """
+    libro = abrir_libro_xls(archivo_path)
+    return pd.ExcelFile(libro, engine='xlrd')
+
+
+def es_archivo_emision(archivo_path):
+    """
+    Revisa de forma ligera si un .xls puede ser un archivo de emisión: solo se leen los
+    primeros bytes para confirmar que es un libro de Excel 97-2003, sin abrirlo con xlrd.
+    El número de hojas se revisa al leerlo (leer_emision), con el libro ya abierto.
+    
+    Args:
+        archivo_path (str): Ruta del archivo .xls (en disco o dentro de un .zip)
+    
+    Returns:
+        bool: True si el archivo empieza como un libro .xls
+    """
+    with abrir_archivo(archivo_path) as archivo:
+        return archivo.read(len(FIRMA_OLE2)).startswith(FIRMAS_XLS)
+
+
+def leer_emision(archivo_path, resultado):
+    """
+    Lee y procesa las hojas EMA (y EBA en meses pares) de un archivo de emisión, usando la
+    caché en disco si el archivo no ha cambiado desde la última vez que se procesó.
+    
+    Args:
+        archivo_path (str): Ruta del archivo de emisión (.xls)
+        resultado (dict): Se llena conforme avanza con 'mes', 'anio', 'rp', 'ema' y 'eba';
+                          si ocurre un error conserva lo que se alcanzó a procesar
+    
+    Returns:
+        dict: El mismo resultado; 'mes' queda en None si la celda B8 no tiene un periodo
+    """
+    clave = clave_archivo(archivo_path, 'emision')
+    en_cache = leer_cache(clave)
+    if en_cache is not None:
+        tablas, metadatos = en_cache
+        resultado.update(metadatos)
+        resultado.update(tablas)
+        if resultado['mes'] is not None and resultado['mes'] % 2 == 0:
+            print(f"Mes par ({resultado['mes']}) detectado, procesando también la hoja 3...")
+        return resultado
+    
+    emision = None
+    try:
+        # Abrir archivo una sola vez para el período y las hojas EMA/EBA
+        emision = abrir_emision(archivo_path)
+        
+        # Un archivo de emisión tiene al menos 2 hojas; los demás .xls se omiten
+        if emision.book.nsheets < 2:
+            print(f"{os.path.basename(archivo_path)} no es un archivo de emisión (tiene menos de 2 hojas)")
+            return resultado
+        ws = emision.book.sheet_by_index(0)
         
-        if nivel > max_nivel:
-            return archivos_emision
+        # Verificar el periodo en la celda B8
+        periodo = ws.cell_value(7, 1)  # B8 = fila 7, columna 1
+        if isinstance(periodo, str):
+            mes, anio = periodo.split('/')
+            mes = int(mes)
+            anio = int(anio)
+        else:
+            return resultado
+        
+        # Guardar el periodo del archivo para el nombre del archivo
+        resultado['mes'] = mes
+        resultado['anio'] = anio
+        
+        # Obtener el valor de RP de la celda B9
+        rp_value = ws.cell_value(8, 1)
+        resultado['rp'] = rp_value
+        
+        # Leer la hoja 2 (Emision Mensual)
+        ema = emision.parse(1, header=4)
+        
+        # Procesar EMA
+        ema = ema[ema['Tipo del Movimiento'] != 2]
+        ema['Nombre'] = ema['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
+        ema = ema.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
+        ema['NSS'] = ema['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
+        ema['Fecha del Movimiento'] = ema['Fecha del Movimiento'].replace('-', pd.NaT)
+        ema['Fecha del Movimiento'] = pd.to_datetime(ema['Fecha del Movimiento'], errors='coerce')
+        # Eliminar filas completamente duplicadas
+        ema = ema.drop_duplicates()
+        ema = ema.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
+
+        ema = ema.groupby('NSS').agg({
+            'Nombre': 'first',
+            'Días': 'sum',
+            'Salario Diario': 'last',
+            'Cuota Fija': 'sum',
+            'Excedente Patronal': 'sum',
+            'Excedente Obrero': 'sum',
+            'Prestaciones en Dinero Patronal': 'sum',
+            'Prestaciones en Dinero Obrero': 'sum',
+            'Gastos Médicos y Pensionados Patronal': 'sum',
+            'Gastos Médicos y Pensionados Obrero': 'sum',
+            'Riesgos de Trabajo': 'sum',
+            'Invalidez y Vida Patronal': 'sum',
+            'Invalidez y Vida Obrero': 'sum',
+            'Guarderías y Prestaciones Sociales': 'sum',
+            'Total': 'sum'
+        }).reset_index()
+
+        # Agregar la columna RP como primera columna
+        ema.insert(0, 'RP', rp_value)
+
+        # Cambiar nombre a las columnas
+        ema.columns = [
+            'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'CF',
+            'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT',
+            'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS', 'TOTAL'
+        ]
+
+        # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
+        ema = ema.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
+        resultado['ema'] = aplicar_esquema(a_polars(ema))
         
+        # Si el mes es par, procesar también la hoja 3
+        if mes % 2 == 0:
+            print(f"Mes par ({mes}) detectado, procesando también la hoja 3...")
+            
+            # Leer la hoja 3
+            eba = emision.parse(2, header=4)
+            
+            # Procesar EBA
+            eba = eba[eba['Tipo del Movimiento'] != 2]
+            eba['Nombre'] = eba['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
+            eba = eba.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
+            eba['NSS'] = eba['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
+            eba['Número de Crédito'] = eba['Número de Crédito'].apply(
+                lambda x: str(x)[-10:] if pd.notna(x) else x
+            )
+            eba['Fecha del Movimiento'] = eba['Fecha del Movimiento'].replace('-', pd.NaT)
+            eba['Fecha del Movimiento'] = pd.to_datetime(eba['Fecha del Movimiento'], errors='coerce')
+            # Eliminar filas completamente duplicadas
+            eba = eba.drop_duplicates()
+            eba = eba.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
+
+            eba = eba.groupby('NSS').agg({
+                'Nombre': 'first',
+                'Días': 'sum',
+                'Salario Diario': 'last',
+                'Retiro': 'sum',
+                'Cesantía en Edad Avanzada y Vejez Patronal': 'sum',
+                'Cesantía en Edad Avanzada y Vejez Obrero': 'sum',
+                'Subtotal RCV': 'sum',
+                'Aportación Patronal': 'sum',
+                'Tipo de Descuento': 'last',
+                'Valor de Descuento': 'last',
+                'Número de Crédito': 'last',
+                'Amortización': 'sum',
+                'Subtotal Infonavit': 'sum',
+                'Total': 'sum'
+            }).reset_index()
+
+            # Agregar la columna RP como primera columna
+            eba.insert(0, 'RP', rp_value)
+
+            # Cambiar nombre a las columnas
+            eba.columns = [
+                'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'RETIRO',
+                'CEAV_PAT', 'CEAV_OBR', 'TOTAL_RCV', 'APORTACION_PAT', 'T_CREDITO',
+                'V_CREDITO', 'N_CREDITO', 'AMORTIZACION', 'TOTAL_INF', 'TOTAL'
+            ]
+
+            # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
+            eba = eba.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
+            resultado['eba'] = aplicar_esquema(a_polars(eba))
+    finally:
+        if emision is not None:
+            emision.close()
+    
+    guardar_cache(clave, {'ema': resultado['ema'], 'eba': resultado['eba']},
+                  {'mes': resultado['mes'], 'anio': resultado['anio'], 'rp': resultado['rp']})
+    return resultado
+
+
+def procesar_archivo_emision(archivo_path):
+    """
+    Lee y procesa un archivo de emisión para estrucurar_varias_emisiones_destino. Puede
+    ejecutarse en un proceso aparte: los mensajes se capturan y se regresan para
+    imprimirlos en orden.
+    
+    Args:
+        archivo_path (str): Ruta del archivo de emisión (.xls)
+    
+    Returns:
+        tuple: (resultado, mensajes); resultado es un dict con 'mes', 'anio', 'rp', 'ema' y 'eba',
+               que quedan en None si el archivo no llegó a esa etapa
+    """
+    archivo_nombre = os.path.basename(archivo_path)
+    resultado = {'mes': None, 'anio': None, 'rp': None, 'ema': None, 'eba': None}
+    mensajes = io.StringIO()
+    with contextlib.redirect_stdout(mensajes):
         try:
-            for item in os.listdir(directorio):
-                item_path = os.path.join(directorio, item)
-                if os.path.isfile(item_path) and item.lower().endswith('.xls'):
-                    # Verificar que es un archivo de emisión válido
-                    try:
-                        wb = xlrd.open_workbook(item_path)
-                        if wb.nsheets >= 2:  # Debe tener al menos 2 hojas
-                            archivos_emision.append(item_path)
-                    except:
-                        pass  # Ignorar archivos que no se pueden abrir
-                elif os.path.isdir(item_path):
-                    archivos_emision.extend(buscar_archivos_emision(item_path, nivel + 1, max_nivel))
-        except PermissionError:
-            print(f"Sin permisos para acceder a: {directorio}")
+            leer_emision(archivo_path, resultado)
         except Exception as e:
-            print(f"Error al buscar en {directorio}: {e}")
-        
-        return archivos_emision
+            print(f"Error procesando {archivo_nombre}: {e}")
     
-    # Buscar todos los archivos de emisión en la carpeta y subcarpetas
+    return resultado, mensajes.getvalue()
+
+
+def guardar_emision_excel(estructurado, base_path):
+    """
+    Guarda una emisión estructurada en Excel con encabezados de fondo #015d4d, fuente
+    blanca centrada y ancho de columnas ajustado.
+    
+    Args:
+        estructurado (dict): Resultado de estructurar_emision o estructurar_emisiones
+        base_path (str): Carpeta donde guardar el archivo
+    
+    Returns:
+        str: Ruta del archivo Excel creado
+    """
+    output_path = os.path.join(base_path, f"{estructurado['nombre']}.xlsx")
+    
+    # Crear el directorio si no existe
+    os.makedirs(base_path, exist_ok=True)
+    
+    # Crear el archivo Excel con las hojas EMA y, si existe, EBA, ya con formato
+    header_fill = PatternFill(start_color='015d4d', end_color='015d4d', fill_type='solid')
+    header_font = Font(color='FFFFFF', bold=True)
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    guardar_hojas_excel(output_path, estructurado['hojas'], header_fill, header_font, header_alignment)
+    
+    return output_path
+
+
+def estructurar_emisiones(folder_path, procesos=None):
+    """
+    Procesa múltiples archivos de emisión en una carpeta y combina en memoria sus hojas
+    EMA y EBA (si aplica), sin escribir ningún archivo.
+    
+    Args:
+        folder_path (str): Ruta de la carpeta que contiene los archivos de emisión (también
+            se buscan dentro de los .zip; puede ser un .zip)
+        procesos (int): Número de procesos para leer los archivos en paralelo. Si es None,
+                        usa hasta un proceso por núcleo, uno por cada ARCHIVOS_POR_PROCESO
+                        archivos; con 1 se procesan uno tras otro.
+    
+    Returns:
+        dict: 'mes', 'año', 'nombre' (para el archivo), 'archivos' y 'hojas'
+              (nombre de hoja -> pl.DataFrame), o None si ocurre un error
+    """
+    
+    if not os.path.exists(folder_path):
+        print(f"La carpeta {folder_path} no existe.")
+        return None
+    
+    # Buscar todos los archivos .xls en la carpeta y subcarpetas (los que no son de emisión se omiten al leerlos)
     print("Buscando archivos de emisión (.xls) en carpeta y subcarpetas (máximo 5 niveles)...")
-    archivos_emision_paths = buscar_archivos_emision(folder_path)
+    archivos_emision_paths = [archivo.ruta for archivo in
+                              buscar_archivos(folder_path, extensiones=('.xls',), filtro=es_archivo_emision,
+                                              en_zip=True)]
     
     if not archivos_emision_paths:
         print("No se encontraron archivos de emisión válidos en la carpeta especificada ni en subcarpetas.")
@@ -70,244 +324,118 @@ def estrucurar_varias_emisiones_destino(folder_path, output_folder=None):
     primer_anio = None
     crear_hoja_eba = False
     
-    # Procesar cada archivo de emisión
-    for archivo_path in archivos_emision_paths:
-        archivo_nombre = os.path.basename(archivo_path)
-        print(f"Procesando archivo: {archivo_nombre}")
-        
-        try:
-            # Abrir archivo para obtener información del período
-            wb = xlrd.open_workbook(archivo_path)
-            ws = wb.sheet_by_index(0)
+    # Procesar cada archivo de emisión, en paralelo si hay varios procesos disponibles
+    if procesos is None:
+        procesos = min(os.cpu_count() or 1, len(archivos_emision_paths) // ARCHIVOS_POR_PROCESO)
+    procesos = max(1, min(procesos, len(archivos_emision_paths)))
+    
+    if procesos > 1:
+        print(f"Procesando archivos con {procesos} procesos en paralelo...")
+        executor = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+        resultados = executor.map(procesar_archivo_emision, archivos_emision_paths)
+    else:
+        executor = None
+        resultados = map(procesar_archivo_emision, archivos_emision_paths)
+    
+    try:
+        for archivo_path, (resultado, mensajes) in zip(archivos_emision_paths, resultados):
+            print(f"Procesando archivo: {os.path.basename(archivo_path)}")
+            print(mensajes, end='')
             
-            # Verificar el periodo en la celda B8
-            periodo = ws.cell_value(7, 1)  # B8 = fila 7, columna 1
-            if isinstance(periodo, str):
-                mes, anio = periodo.split('/')
-                mes = int(mes)
-                anio = int(anio)
-            else:
+            if resultado['mes'] is None:
                 continue
             
             # Guardar primer mes/año encontrado para el nombre del archivo
             if primer_mes is None:
-                primer_mes = mes
-                primer_anio = anio
-            
-            # Obtener el valor de RP de la celda B9
-            rp_value = ws.cell_value(8, 1)
-            
-            # Leer la hoja 2 (Emision Mensual)
-            ema = pd.read_excel(archivo_path, sheet_name=1, header=4, engine='xlrd')
-            
-            # Procesar EMA
-            ema = ema[ema['Tipo del Movimiento'] != 2]
-            ema['Nombre'] = ema['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
-            ema = ema.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
-            ema['NSS'] = ema['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
-            ema['Fecha del Movimiento'] = ema['Fecha del Movimiento'].replace('-', pd.NaT)
-            ema['Fecha del Movimiento'] = pd.to_datetime(ema['Fecha del Movimiento'], errors='coerce')
-            # Eliminar filas completamente duplicadas
-            ema = ema.drop_duplicates()
-            ema = ema.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
-
-            ema = ema.groupby('NSS').agg({
-                'Nombre': 'first',
-                'Días': 'sum',
-                'Salario Diario': 'last',
-                'Cuota Fija': 'sum',
-                'Excedente Patronal': 'sum',
-                'Excedente Obrero': 'sum',
-                'Prestaciones en Dinero Patronal': 'sum',
-                'Prestaciones en Dinero Obrero': 'sum',
-                'Gastos Médicos y Pensionados Patronal': 'sum',
-                'Gastos Médicos y Pensionados Obrero': 'sum',
-                'Riesgos de Trabajo': 'sum',
-                'Invalidez y Vida Patronal': 'sum',
-                'Invalidez y Vida Obrero': 'sum',
-                'Guarderías y Prestaciones Sociales': 'sum',
-                'Total': 'sum'
-            }).reset_index()
-
-            # Agregar la columna RP como primera columna
-            ema.insert(0, 'RP', rp_value)
-
-            # Cambiar nombre a las columnas
-            ema.columns = [
-                'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'CF',
-                'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT',
-                'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS', 'TOTAL'
-            ]
-
-            # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
-            ema = ema.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-            todos_ema.append(ema)
+                primer_mes = resultado['mes']
+                primer_anio = resultado['anio']
             
-            # Si el mes es par, procesar también la hoja 3
-            if mes % 2 == 0:
-                crear_hoja_eba = True
-                print(f"Mes par ({mes}) detectado, procesando también la hoja 3...")
-                
-                # Leer la hoja 3
-                eba = pd.read_excel(archivo_path, sheet_name=2, header=4, engine='xlrd')
-                
-                # Procesar EBA
-                eba = eba[eba['Tipo del Movimiento'] != 2]
-                eba['Nombre'] = eba['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
-                eba = eba.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
-                eba['NSS'] = eba['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
-                eba['Número de Crédito'] = eba['Número de Crédito'].apply(
-                    lambda x: str(x)[-10:] if pd.notna(x) else x
-                )
-                eba['Fecha del Movimiento'] = eba['Fecha del Movimiento'].replace('-', pd.NaT)
-                eba['Fecha del Movimiento'] = pd.to_datetime(eba['Fecha del Movimiento'], errors='coerce')
-                # Eliminar filas completamente duplicadas
-                eba = eba.drop_duplicates()
-                eba = eba.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
-
-                eba = eba.groupby('NSS').agg({
-                    'Nombre': 'first',
-                    'Días': 'sum',
-                    'Salario Diario': 'last',
-                    'Retiro': 'sum',
-                    'Cesantía en Edad Avanzada y Vejez Patronal': 'sum',
-                    'Cesantía en Edad Avanzada y Vejez Obrero': 'sum',
-                    'Subtotal RCV': 'sum',
-                    'Aportación Patronal': 'sum',
-                    'Tipo de Descuento': 'last',
-                    'Valor de Descuento': 'last',
-                    'Número de Crédito': 'last',
-                    'Amortización': 'sum',
-                    'Subtotal Infonavit': 'sum',
-                    'Total': 'sum'
-                }).reset_index()
-
-                # Agregar la columna RP como primera columna
-                eba.insert(0, 'RP', rp_value)
-
-                # Cambiar nombre a las columnas
-                eba.columns = [
-                    'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'RETIRO',
-                    'CEAV_PAT', 'CEAV_OBR', 'TOTAL_RCV', 'APORTACION_PAT', 'T_CREDITO',
-                    'V_CREDITO', 'N_CREDITO', 'AMORTIZACION', 'TOTAL_INF', 'TOTAL'
-                ]
-
-                # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
-                eba = eba.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-                todos_eba.append(eba)
-                
-        except Exception as e:
-            print(f"Error procesando {archivo_nombre}: {e}")
-            continue
+            if resultado['ema'] is not None:
+                todos_ema.append(resultado['ema'])
+                if resultado['mes'] % 2 == 0:
+                    crear_hoja_eba = True
+            if resultado['eba'] is not None:
+                todos_eba.append(resultado['eba'])
+    finally:
+        if executor is not None:
+            executor.shutdown()
     
     # Verificar que se encontraron registros
     if not todos_ema:
         print("No se encontraron registros EMA válidos en ningún archivo.")
         return None
     
-    # Combinar todos los DataFrames EMA
-    ema_combinado = pd.concat(todos_ema, ignore_index=True)
+    # Combinar todos los DataFrames EMA (mismos tipos en todos los archivos, ver esquemas)
+    ema_combinado = pl.concat(todos_ema)
     
     # Ordenar por RP y después por NOMBRE ASEGURADO
-    ema_combinado = ema_combinado.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
+    ema_combinado = ema_combinado.sort(['RP', 'NOMBRE ASEGURADO'], maintain_order=True)
     
     print(f"Total registros EMA combinados: {len(ema_combinado)}")
+    hojas = {'EMA': ema_combinado}
     
     # Combinar todos los DataFrames EBA si existen
-    eba_combinado = None
     if crear_hoja_eba and todos_eba:
-        eba_combinado = pd.concat(todos_eba, ignore_index=True)
+        eba_combinado = pl.concat(todos_eba)
         
         # Ordenar por RP y después por NOMBRE ASEGURADO
-        eba_combinado = eba_combinado.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
+        eba_combinado = eba_combinado.sort(['RP', 'NOMBRE ASEGURADO'], maintain_order=True)
         
         print(f"Total registros EBA combinados: {len(eba_combinado)}")
+        hojas['EBA'] = eba_combinado
     
     # Generar nombre del archivo
     mes_formateado = str(primer_mes).zfill(2)
-    nombre_archivo = f"{mes_formateado}-{primer_anio}_MULTI_EMISION.xlsx"
+    return {
+        'mes': mes_formateado,
+        'año': str(primer_anio),
+        'nombre': f"{mes_formateado}-{primer_anio}_MULTI_EMISION",
+        'archivos': archivos_emision_paths,
+        'hojas': hojas
+    }
+
+
+def estrucurar_varias_emisiones_destino(folder_path, output_folder=None, procesos=None, formato=FORMATO_EXCEL):
+    """
+    Función modificada para procesar múltiples archivos de emisión en una carpeta y combinarlos 
+    en un solo archivo Excel con hojas EMA y EBA (si aplica), guardando en carpeta específica.
+    
+    Args:
+        folder_path (str): Ruta de la carpeta que contiene los archivos de emisión (también
+            se buscan dentro de los .zip; puede ser un .zip)
+        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa folder_path.
+        procesos (int): Número de procesos para leer los archivos en paralelo. Si es None,
+                        usa hasta un proceso por núcleo, uno por cada ARCHIVOS_POR_PROCESO
+                        archivos; con 1 se procesan uno tras otro.
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+    
+    Returns:
+        str: Ruta del archivo Excel creado (o del primer archivo Parquet/Arrow si no se pidió Excel),
+             o None si ocurre un error
+    """
+    estructurado = estructurar_emisiones(folder_path, procesos=procesos)
+    if estructurado is None:
+        return None
     
     # Usar carpeta de destino si se especifica, sino usar folder_path
     if output_folder:
         base_path = output_folder
     else:
-        base_path = folder_path
-        
-    output_path = os.path.join(base_path, nombre_archivo)
+        base_path = carpeta_real(folder_path)
     
     try:
-        # Crear el directorio si no existe
-        os.makedirs(base_path, exist_ok=True)
-        
-        # Crear el archivo Excel
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            # Escribir DataFrame ema_combinado en la hoja "EMA"
-            ema_combinado.to_excel(writer, sheet_name='EMA', index=False)
-            
-            # Si existe eba_combinado, escribirlo en la hoja "EBA"
-            if eba_combinado is not None:
-                eba_combinado.to_excel(writer, sheet_name='EBA', index=False)
-        
-        # Aplicar formato a las hojas
-        wb = load_workbook(output_path)
-        
-        # Formato para hoja EMA
-        ws_ema = wb['EMA']
-        header_fill = PatternFill(start_color='015d4d', end_color='015d4d', fill_type='solid')
-        header_font = Font(color='FFFFFF', bold=True)
-        
-        # Aplicar formato a los encabezados de EMA
-        for cell in ws_ema[1]:  # Primera fila (encabezados)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Ajustar ancho de columnas para EMA
-        for column in ws_ema.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws_ema.column_dimensions[column_letter].width = adjusted_width
-        
-        # Si existe hoja EBA, aplicar el mismo formato
-        if eba_combinado is not None:
-            ws_eba = wb['EBA']
-            
-            # Aplicar formato a los encabezados de EBA
-            for cell in ws_eba[1]:  # Primera fila (encabezados)
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Ajustar ancho de columnas para EBA
-            for column in ws_eba.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws_eba.column_dimensions[column_letter].width = adjusted_width
-        
-        # Guardar el archivo con formato
-        wb.save(output_path)
+        rutas = guardar_en_formatos(estructurado, base_path, formato, guardar_emision_excel)
+        output_path = rutas[0]
         
         print(f"\n=== RESUMEN ===")
-        print(f"Archivo Excel creado exitosamente: {output_path}")
-        print(f"Archivos de emisión procesados: {len(archivos_emision_paths)}")
-        print(f"Total registros EMA procesados: {len(ema_combinado)}")
-        if eba_combinado is not None:
-            print(f"Total registros EBA procesados: {len(eba_combinado)}")
-        print("Formato aplicado: fondo #015d4d, fuente blanca")
+        if output_path.endswith('.xlsx'):
+            print(f"Archivo Excel creado exitosamente: {output_path}")
+        print(f"Archivos de emisión procesados: {len(estructurado['archivos'])}")
+        print(f"Total registros EMA procesados: {len(estructurado['hojas']['EMA'])}")
+        if 'EBA' in estructurado['hojas']:
+            print(f"Total registros EBA procesados: {len(estructurado['hojas']['EBA'])}")
+        if output_path.endswith('.xlsx'):
+            print("Formato aplicado: fondo #015d4d, fuente blanca")
         
         return output_path
         
@@ -316,215 +444,67 @@ def estrucurar_varias_emisiones_destino(folder_path, output_folder=None):
         return None
 
 
-def estructurar_1emision(emision_path, output_folder=None):
+def estructurar_emision(emision_path):
     """
-    Función modificada para procesar un archivo de emisión individual.
+    Procesa un archivo de emisión individual y regresa sus hojas en memoria, sin escribir
+    ningún archivo, para confrontarlas directamente o guardarlas con guardar_emision_excel.
     
     Args:
         emision_path (str): Ruta del archivo de emisión (.xls)
-        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa la carpeta del archivo original.
     
     Returns:
-        str: Ruta del archivo Excel creado, o None si ocurre un error
+        dict: 'mes', 'año', 'nombre' (para el archivo), 'archivos' y 'hojas'
+              (nombre de hoja -> pl.DataFrame)
     """
     
-    # Cargar el archivo de Excel (.xls) usando xlrd
-    wb = xlrd.open_workbook(emision_path)
-    ws = wb.sheet_by_index(0)  # Primera hoja (índice 0)
-
-    # Verificar el periodo en la celda B8 (fila 7, columna 1 en xlrd - índices basados en 0)
-    periodo = ws.cell_value(7, 1)  # B8 = fila 7, columna 1
-    if isinstance(periodo, str):
-        mes, anio = periodo.split('/')
-        mes = int(mes)
-    else:
+    # Leer el periodo (B8), el RP (B9) y las hojas EMA/EBA, o tomarlos de la caché
+    resultado = leer_emision(emision_path, {'mes': None, 'anio': None, 'rp': None, 'ema': None, 'eba': None})
+    if resultado['mes'] is None:
         raise ValueError("El formato de la celda B8 no es válido.")
     
-    # Obtener el valor de RP de la celda B9 (fila 8, columna 1 en xlrd - índices basados en 0)
-    rp_value = ws.cell_value(8, 1)  # B9 = fila 8, columna 1
-    
-    # Leer la hoja 2 (Emision Mensual)
-    ema = pd.read_excel(emision_path, sheet_name=1, header=4, engine='xlrd')
-
-    # Eliminar filas con el valor 2 en "Tipo del Movimiento"
-    ema = ema[ema['Tipo del Movimiento'] != 2]
-    # Sustituir todos los "#" por "Ñ" y eliminar espacios extra al final en la columna "Nombre"
-    ema['Nombre'] = ema['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
-    # Eliminar las columnas "Origen del Movimiento" y "Tipo del Movimiento"
-    ema = ema.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
-    # Cambiar el NSS a string para respetar los que tienen ceros al inicio
-    ema['NSS'] = ema['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
-    # Limpiar y convertir "Fecha del Movimiento" a datetime
-    ema['Fecha del Movimiento'] = ema['Fecha del Movimiento'].replace('-', pd.NaT)
-    ema['Fecha del Movimiento'] = pd.to_datetime(ema['Fecha del Movimiento'], errors='coerce')
-    # Eliminar filas completamente duplicadas
-    ema = ema.drop_duplicates()
-    # Ordenar por NSS y Fecha del Movimiento
-    ema = ema.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
-
-    ema = ema.groupby('NSS').agg({
-        'Nombre': 'first',
-        'Días': 'sum',
-        'Salario Diario': 'last',
-        'Cuota Fija': 'sum',
-        'Excedente Patronal': 'sum',
-        'Excedente Obrero': 'sum',
-        'Prestaciones en Dinero Patronal': 'sum',
-        'Prestaciones en Dinero Obrero': 'sum',
-        'Gastos Médicos y Pensionados Patronal': 'sum',
-        'Gastos Médicos y Pensionados Obrero': 'sum',
-        'Riesgos de Trabajo': 'sum',
-        'Invalidez y Vida Patronal': 'sum',
-        'Invalidez y Vida Obrero': 'sum',
-        'Guarderías y Prestaciones Sociales': 'sum',
-        'Total': 'sum'
-    }).reset_index()
-
-    # Agregar la columna RP como primera columna
-    ema.insert(0, 'RP', rp_value)
-
-    # Cambiar nombre a las columnas
-    ema.columns = [
-        'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'CF',
-        'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT',
-        'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS', 'TOTAL'
-    ]
-
-    # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
-    ema = ema.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-
-    # Si el mes es par, procesar también la hoja 3
+    mes = resultado['mes']
+    hojas = {'EMA': resultado['ema']}
+    
     if mes % 2 == 0:
-        print(f"Mes par ({mes}) detectado, procesando también la hoja 3...")
-        
-        # Leer la hoja 3
-        eba = pd.read_excel(emision_path, sheet_name=2, header=4, engine='xlrd')
-
-        # Procesar EBA
-        eba = eba[eba['Tipo del Movimiento'] != 2]
-        eba['Nombre'] = eba['Nombre'].str.replace('#', 'Ñ', regex=False).str.rstrip()
-        eba = eba.drop(columns=['Origen del Movimiento', 'Tipo del Movimiento'], errors='ignore')
-        eba['NSS'] = eba['NSS'].apply(lambda x: str(int(x)).zfill(11) if pd.notna(x) else x)
-        # Normalizar "Número de Crédito" a 10 dígitos
-        eba['Número de Crédito'] = eba['Número de Crédito'].apply(
-            lambda x: str(x)[-10:] if pd.notna(x) else x
-        )
-        eba['Fecha del Movimiento'] = eba['Fecha del Movimiento'].replace('-', pd.NaT)
-        eba['Fecha del Movimiento'] = pd.to_datetime(eba['Fecha del Movimiento'], errors='coerce')
-        # Eliminar filas completamente duplicadas
-        eba = eba.drop_duplicates()
-        eba = eba.sort_values(['NSS', 'Fecha del Movimiento'], na_position='last')
-
-        eba = eba.groupby('NSS').agg({
-            'Nombre': 'first',
-            'Días': 'sum',
-            'Salario Diario': 'last',
-            'Retiro': 'sum',
-            'Cesantía en Edad Avanzada y Vejez Patronal': 'sum',
-            'Cesantía en Edad Avanzada y Vejez Obrero': 'sum',
-            'Subtotal RCV': 'sum',
-            'Aportación Patronal': 'sum',
-            'Tipo de Descuento': 'last',
-            'Valor de Descuento': 'last',
-            'Número de Crédito': 'last',
-            'Amortización': 'sum',
-            'Subtotal Infonavit': 'sum',
-            'Total': 'sum'
-        }).reset_index()
-
-        # Agregar la columna RP como primera columna
-        eba.insert(0, 'RP', rp_value)
-
-        # Cambiar nombre a las columnas
-        eba.columns = [
-            'RP', 'NSS', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'RETIRO',
-            'CEAV_PAT', 'CEAV_OBR', 'TOTAL_RCV', 'APORTACION_PAT', 'T_CREDITO',
-            'V_CREDITO', 'N_CREDITO', 'AMORTIZACION', 'TOTAL_INF', 'TOTAL'
-        ]
-
-        # Ordenar el DataFrame por RP y después por NOMBRE ASEGURADO
-        eba = eba.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-        
-        print(f"DataFrame eba creado con {len(eba)} filas")
+        hojas['EBA'] = resultado['eba']
+        print(f"DataFrame eba creado con {len(resultado['eba'])} filas")
     else:
         print(f"Mes impar ({mes}) detectado, solo se procesó la hoja 2")
 
     # Crear el nombre del archivo
     mes_formateado = str(mes).zfill(2)  # Agregar cero al inicio si es necesario
-    nombre_archivo = f"{mes_formateado}-{anio}_{rp_value}_EMISION.xlsx"
+    return {
+        'mes': mes_formateado,
+        'año': str(resultado['anio']),
+        'nombre': f"{mes_formateado}-{resultado['anio']}_{resultado['rp']}_EMISION",
+        'archivos': [emision_path],
+        'hojas': hojas
+    }
+
+
+def estructurar_1emision(emision_path, output_folder=None, formato=FORMATO_EXCEL):
+    """
+    Función modificada para procesar un archivo de emisión individual.
+    
+    Args:
+        emision_path (str): Ruta del archivo de emisión (.xls)
+        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa la carpeta del archivo original.
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+    
+    Returns:
+        str: Ruta del archivo Excel creado (o del primer archivo Parquet/Arrow si no se pidió Excel),
+             o None si ocurre un error
+    """
+    estructurado = estructurar_emision(emision_path)
     
     # Usar carpeta de destino si se especifica, sino usar carpeta original
     if output_folder:
         base_path = output_folder
     else:
-        base_path = os.path.dirname(emision_path)
-        
-    output_path = os.path.join(base_path, nombre_archivo)
+        base_path = carpeta_real(os.path.dirname(emision_path))
     
-    # Crear el directorio si no existe
-    os.makedirs(base_path, exist_ok=True)
-    
-    # Crear el archivo Excel
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # Escribir DataFrame ema en la hoja "EMA"
-        ema.to_excel(writer, sheet_name='EMA', index=False)
-        
-        # Si existe eba, escribirlo en la hoja "EBA"
-        if mes % 2 == 0:
-            eba.to_excel(writer, sheet_name='EBA', index=False)
-    
-    # Aplicar formato a las hojas
-    wb = load_workbook(output_path)
+    output_path = guardar_en_formatos(estructurado, base_path, formato, guardar_emision_excel)[0]
     
-    # Formato para hoja EMA
-    ws_ema = wb['EMA']
-    header_fill = PatternFill(start_color='015d4d', end_color='015d4d', fill_type='solid')
-    header_font = Font(color='FFFFFF', bold=True)
-    
-    # Aplicar formato a los encabezados de EMA
-    for cell in ws_ema[1]:  # Primera fila (encabezados)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Ajustar ancho de columnas para EMA
-    for column in ws_ema.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws_ema.column_dimensions[column_letter].width = adjusted_width
-    
-    # Si existe hoja EBA, aplicar el mismo formato
-    if mes % 2 == 0:
-        ws_eba = wb['EBA']
-        
-        # Aplicar formato a los encabezados de EBA
-        for cell in ws_eba[1]:  # Primera fila (encabezados)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Ajustar ancho de columnas para EBA
-        for column in ws_eba.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws_eba.column_dimensions[column_letter].width = adjusted_width
-    
-    # Guardar el archivo con formato
-    wb.save(output_path)
-    
-    print(f"Archivo Excel creado: {output_path}")
+    if output_path.endswith('.xlsx'):
+        print(f"Archivo Excel creado: {output_path}")
     return output_path
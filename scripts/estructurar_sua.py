@@ -1,40 +1,28 @@
 import os
 import pandas as pd
 from openpyxl import load_workbook
+from salida_excel import ajustar_anchos
+from buscar_archivos import buscar_archivos
 from openpyxl.styles import PatternFill, Font
-
-
-def decode_base62(encoded_str):
-    """Decodifica una cadena codificada en base62 a un número entero."""
-    base62_chars = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-    base = len(base62_chars)
-    decoded_value = 0
-    for i, char in enumerate(reversed(encoded_str)):
-        decoded_value += base62_chars.index(char) * (base ** i)
-    return decoded_value
+from estructurar_sua_mod import decode_base62, leer_archivo_sua
 
 
 def estructurar_1sua(sua_path):
 
     """
-    Funcion para darle forma al archivo .SUA del IMSS, el cual se convertira
-    en un archivo .txt para obtener los datos que necesitamos y pasarlos a un .xlsx.
+    Funcion para darle forma al archivo .SUA del IMSS, el cual se leera
+    directamente para obtener los datos que necesitamos y pasarlos a un .xlsx.
     
     El archivo .SUA es un archivo de texto plano compuesto de lineas de 295 caracteres.
     """
 
-    # Creamos una copia y cambiamos el nombre del archivo .SUA a .txt
-    if sua_path.endswith('.SUA'):
-        new_path = sua_path[:-4] + '.txt'
-        with open(sua_path, 'rb') as src, open(new_path, 'wb') as dst:
-            dst.write(src.read())
-    else:
+    # Leemos el archivo .SUA directamente
+    if not sua_path.endswith('.SUA'):
         raise ValueError("El archivo debe tener la extensión .SUA")
     
-    # Obtendremos algunos datos del archivo .txt
+    # Obtendremos algunos datos del archivo
     # Primero debemos obtener del caracter 3 al 5
-    with open(new_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = leer_archivo_sua(sua_path)
     
     valor = f"03{content[2:5]}"
     
@@ -85,7 +73,7 @@ def estructurar_1sua(sua_path):
      - Invalidez y vida obrero: 3 caracteres cifrados en base62 a partir del caracter 287 (descifrar y dividir entre 100 para obtener el valor real)
      - Guarderias y prestaciones sociales: 7 caracteres a partir del caracter 202 (dividir entre 100 para obtener el valor real)
      - Total: Suma desde cuota fija hasta guarderias y prestaciones sociales
-    """    # Iterar sobre el contenido del archivo .txt para extraer los datos
+    """    # Iterar sobre el contenido del archivo para extraer los datos
     registros = []
     try:
         start = 0
@@ -302,17 +290,7 @@ def estructurar_1sua(sua_path):
             cell.font = header_font_suam
         
         # Ajustar el ancho de las columnas en SUA_MENSUAL
-        for column in worksheet_suam.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet_suam.column_dimensions[column_letter].width = adjusted_width
+        ajustar_anchos(worksheet_suam, df)
         
         # Si existe la hoja SUA_BIMESTRAL, aplicar su formato
         if crear_hoja_adicional and 'SUA_BIMESTRAL' in workbook.sheetnames:
@@ -328,17 +306,7 @@ def estructurar_1sua(sua_path):
                 cell.font = header_font_suab
             
             # Ajustar el ancho de las columnas en SUA_BIMESTRAL
-            for column in worksheet_suab.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet_suab.column_dimensions[column_letter].width = adjusted_width
+            ajustar_anchos(worksheet_suab, df_suab)
         
         # Guardar los cambios
         workbook.save(excel_path)
@@ -370,31 +338,9 @@ def estructurar_varios_suas(folder_path):
         print(f"La carpeta {folder_path} no existe.")
         return None
     
-    def buscar_archivos_sua(directorio, nivel=0, max_nivel=5):
-        """Busca archivos .SUA recursivamente hasta el nivel máximo especificado"""
-        archivos_sua = []
-        
-        if nivel > max_nivel:
-            return archivos_sua
-        
-        try:
-            for item in os.listdir(directorio):
-                item_path = os.path.join(directorio, item)
-                
-                if os.path.isfile(item_path) and item.endswith('.SUA'):
-                    archivos_sua.append(item_path)
-                elif os.path.isdir(item_path) and nivel < max_nivel:
-                    archivos_sua.extend(buscar_archivos_sua(item_path, nivel + 1, max_nivel))
-        except PermissionError:
-            print(f"Sin permisos para acceder a: {directorio}")
-        except Exception as e:
-            print(f"Error accediendo a {directorio}: {e}")
-        
-        return archivos_sua
-    
     # Buscar todos los archivos .SUA en la carpeta y subcarpetas
     print("Buscando archivos .SUA en carpeta y subcarpetas (máximo 5 niveles)...")
-    sua_files_paths = buscar_archivos_sua(folder_path)
+    sua_files_paths = [archivo.ruta for archivo in buscar_archivos(folder_path, extensiones=('.SUA',))]
     
     if not sua_files_paths:
         print("No se encontraron archivos .SUA en la carpeta especificada ni en subcarpetas.")
@@ -419,14 +365,8 @@ def estructurar_varios_suas(folder_path):
         print(f"Procesando archivo: {sua_file}")
         
         try:
-            # Crear archivo .txt temporal
-            new_path = sua_path[:-4] + '.txt'
-            with open(sua_path, 'rb') as src, open(new_path, 'wb') as dst:
-                dst.write(src.read())
-            
             # Leer contenido del archivo
-            with open(new_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = leer_archivo_sua(sua_path)
             
             valor = f"03{content[2:5]}"
             
@@ -554,12 +494,6 @@ def estructurar_varios_suas(folder_path):
             if crear_hoja_bimestral:
                 print(f"Procesado {sua_file}: {len(registros_suab_archivo)} registros SUA_BIMESTRAL")
             
-            # Limpiar archivo temporal
-            try:
-                os.remove(new_path)
-            except:
-                pass
-                
         except Exception as e:
             print(f"Error procesando archivo {sua_file}: {e}")
             continue
@@ -634,17 +568,7 @@ def estructurar_varios_suas(folder_path):
             cell.font = header_font_suam
         
         # Ajustar ancho de columnas SUA_MENSUAL
-        for column in worksheet_suam.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet_suam.column_dimensions[column_letter].width = adjusted_width
+        ajustar_anchos(worksheet_suam, df)
         
         # Formatear hoja SUA_BIMESTRAL si existe
         if crear_hoja_bimestral and 'SUA_BIMESTRAL' in workbook.sheetnames:
@@ -657,17 +581,7 @@ def estructurar_varios_suas(folder_path):
                 cell.font = header_font_suab
             
             # Ajustar ancho de columnas SUA_BIMESTRAL
-            for column in worksheet_suab.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet_suab.column_dimensions[column_letter].width = adjusted_width
+            ajustar_anchos(worksheet_suab, df_suab)
         
         # Guardar cambios
         workbook.save(excel_path)
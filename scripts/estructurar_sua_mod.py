@@ -1,50 +1,541 @@
 import os
-import pandas as pd
-from openpyxl import load_workbook
+import io
+import mmap
+import codecs
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import repeat
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from salida_excel import guardar_hojas_excel
+from salida_formatos import FORMATO_EXCEL, guardar_en_formatos, contar_filas
+from historial_sua import (huella_archivo, huella_registrada, esta_ingerido, guardar_en_historial, consultar_historial,
+                           leer_ingeridos, guardar_ingeridos)
+from cache_estructurados import clave_archivo, leer_cache, guardar_cache
+from buscar_archivos import buscar_archivos
+from archivos_zip import dividir_ruta_zip, leer_bytes, abrir_archivo, carpeta_real
+from esquemas import ESQUEMAS, IMPORTE, aplicar_esquema
 from openpyxl.styles import PatternFill, Font
 
 
+# Longitud de cada registro de trabajador (tipo 03) dentro del archivo .SUA
+LONGITUD_REGISTRO = 295
+
+# Tamaño a partir del cual el .SUA se lee mediante un mapa de memoria
+UMBRAL_MMAP = 16 * 1024 * 1024
+
+# Bytes que se leen a la vez en el modo por bloques (un múltiplo de LONGITUD_REGISTRO, ~9.7 MB)
+BLOQUE_SUA = LONGITUD_REGISTRO * 32 * 1024
+
+# Archivos .SUA por proceso al repartir una carpeta; con menos archivos, arrancar los
+# procesos cuesta más que decodificarlos en el proceso actual
+ARCHIVOS_POR_PROCESO = 4
+
+# Tabla de campos del registro: (columna, inicio, fin, tipo)
+#  - texto: se eliminan espacios al inicio y al final
+#  - entero: número entero, 0 si viene vacío
+#  - importe: número en centavos (se divide entre 100), 0 si viene vacío
+#  - base62: 3 caracteres cifrados en base62 en centavos, 0 si viene vacío
+# Los tipos finales de cada columna son los de esquemas.ESQUEMAS
+CAMPOS_SUA = [
+    ('RP', 2, 13, 'texto'),
+    ('NSS', 33, 44, 'texto'),
+    ('RFC', 44, 57, 'texto'),
+    ('CURP', 57, 75, 'texto'),
+    ('N_CREDITO', 75, 85, 'texto'),
+    ('MOVIMIENTOS', 93, 95, 'texto'),
+    ('NOMBRE ASEGURADO', 95, 145, 'texto'),
+    ('SDI', 145, 152, 'importe'),
+    ('DIAS', 154, 156, 'entero'),
+    ('INCAPACIDAD', 156, 158, 'entero'),
+    ('AUSENTISMO', 158, 160, 'entero'),
+    ('CF', 160, 167, 'importe'),
+    ('EXC_PAT', 167, 174, 'importe'),
+    ('PD_PAT', 174, 181, 'importe'),
+    ('GMP_PAT', 181, 188, 'importe'),
+    ('RT', 188, 195, 'importe'),
+    ('IV_PAT', 195, 202, 'importe'),
+    ('GPS', 202, 209, 'importe'),
+    ('RETIRO', 209, 216, 'importe'),
+    ('CEAV_PAT', 216, 223, 'importe'),
+    ('CEAV_OBR', 223, 230, 'importe'),
+    ('APORTACION_PAT', 237, 244, 'importe'),
+    ('AMORTIZACION', 244, 251, 'importe'),
+    ('EXC_OBR', 278, 281, 'base62'),
+    ('PD_OBR', 281, 284, 'base62'),
+    ('GMP_OBR', 284, 287, 'base62'),
+    ('IV_OBR', 287, 290, 'base62'),
+]
+
+# Columnas (en orden) de cada hoja y los campos que se suman para obtener TOTAL
+COLUMNAS_SUA_MENSUAL = ESQUEMAS['SUA_MENSUAL'].names()
+TOTAL_SUA_MENSUAL = ['CF', 'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT', 'GMP_OBR',
+                     'RT', 'IV_PAT', 'IV_OBR', 'GPS']
+COLUMNAS_SUA_BIMESTRAL = ESQUEMAS['SUA_BIMESTRAL'].names()
+TOTAL_SUA_BIMESTRAL = ['RETIRO', 'CEAV_PAT', 'CEAV_OBR', 'APORTACION_PAT', 'AMORTIZACION']
+
+
+# Tabla de búsqueda base62: carácter -> valor del dígito
+BASE62_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+VALORES_BASE62 = {char: valor for valor, char in enumerate(BASE62_CHARS)}
+
+
+def decode_base62_columna(codigos, ancho=3):
+    """
+    Decodifica de una sola vez una columna de códigos base62 de ancho fijo a enteros.
+    
+    Cada posición del código se traduce con la tabla VALORES_BASE62 para toda la
+    columna a la vez y los dígitos se combinan con sus potencias de 62.
+    
+    Args:
+        codigos (pl.Expr | pl.Series): Columna de texto con los códigos base62
+        ancho (int): Número de caracteres de cada código
+    
+    Returns:
+        pl.Expr | pl.Series: Valores enteros (Int64); nulo si el código tiene caracteres inválidos
+    """
+    digitos = [
+        codigos.str.slice(posicion, 1).replace_strict(VALORES_BASE62, default=None, return_dtype=pl.Int64)
+        * (len(BASE62_CHARS) ** (ancho - 1 - posicion))
+        for posicion in range(ancho)
+    ]
+    return reduce(lambda a, b: a + b, digitos)
+
+
 def decode_base62(encoded_str):
     """Decodifica una cadena codificada en base62 a un número entero."""
-    base62_chars = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-    base = len(base62_chars)
+    base = len(BASE62_CHARS)
     decoded_value = 0
     for i, char in enumerate(reversed(encoded_str)):
-        decoded_value += base62_chars.index(char) * (base ** i)
+        if char not in VALORES_BASE62:
+            raise ValueError(f"Carácter inválido en base62: {char!r}")
+        decoded_value += VALORES_BASE62[char] * (base ** i)
     return decoded_value
 
 
-def estructurar_1sua_destino(sua_path, output_folder=None):
+def leer_archivo_sua(sua_path):
     """
-    Función modificada para darle forma al archivo .SUA del IMSS, 
-    guardando el resultado en la carpeta especificada.
+    Lee el contenido del .SUA directamente, sin crear copias temporales, por lo que
+    funciona también en carpetas de solo lectura. Los archivos grandes se decodifican
+    desde un mapa de memoria para no duplicar los bytes en memoria; los que están dentro
+    de un .zip se leen del .zip sin extraerlos.
     
     Args:
-        sua_path (str): Ruta del archivo .SUA
-        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa la carpeta del archivo original.
+        sua_path (str): Ruta del archivo .SUA (en disco o dentro de un .zip)
     
     Returns:
-        str: Ruta del archivo Excel creado, o None si hay error
+        str: Contenido completo del archivo
     """
+    if dividir_ruta_zip(sua_path)[0] is not None:
+        return leer_bytes(sua_path).decode('utf-8')
     
-    # Creamos una copia y cambiamos el nombre del archivo .SUA a .txt
-    if sua_path.endswith('.SUA'):
-        new_path = sua_path[:-4] + '.txt'
-        with open(sua_path, 'rb') as src, open(new_path, 'wb') as dst:
-            dst.write(src.read())
-    else:
-        raise ValueError("El archivo debe tener la extensión .SUA")
+    with open(sua_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < UMBRAL_MMAP:
+            return f.read().decode('utf-8')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            return str(datos, 'utf-8')
+
+
+def localizar_registros_sua(content):
+    """
+    Recorre el contenido del .SUA una sola vez y regresa la posición de inicio de cada
+    registro de trabajador. Un registro empieza con "03" seguido de los caracteres 3 al 5
+    del archivo y ocupa 295 caracteres.
     
-    # Obtendremos algunos datos del archivo .txt
-    with open(new_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    Args:
+        content (str): Contenido completo del archivo .SUA
     
+    Returns:
+        list: Posiciones de inicio de cada registro completo
+    """
     valor = f"03{content[2:5]}"
+    limite = len(content) - LONGITUD_REGISTRO
+    
+    inicios = []
+    start = content.find(valor)
+    while start != -1 and start <= limite:
+        inicios.append(start)
+        start = content.find(valor, start + LONGITUD_REGISTRO)
+    return inicios
+
+
+def leer_bloques_sua(sua_path, tamaño_bloque=BLOQUE_SUA):
+    """
+    Recorre el .SUA por bloques, sin cargarlo completo en memoria, y regresa los registros
+    de trabajador de cada bloque. Los registros se localizan igual que en
+    localizar_registros_sua; el que queda partido entre dos bloques se completa con el
+    siguiente, y las posiciones son las mismas que en el archivo completo.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA (en disco o dentro de un .zip)
+        tamaño_bloque (int): Bytes que se leen a la vez
+    
+    Yields:
+        tuple: (posiciones, textos) de los registros completos de cada bloque
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    pendiente = ''
+    desplazamiento = 0  # Posición en el archivo del primer carácter de pendiente
+    valor = None
+    
+    with abrir_archivo(sua_path) as f:
+        while True:
+            datos = f.read(tamaño_bloque)
+            final = not datos
+            texto = pendiente + decodificador.decode(datos, final=final)
+            
+            # El valor que identifica a los registros sale de los primeros caracteres del archivo
+            if valor is None:
+                if len(texto) < 5 and not final:
+                    pendiente = texto
+                    continue
+                valor = f"03{texto[2:5]}"
+            
+            posiciones = []
+            textos = []
+            limite = len(texto) - LONGITUD_REGISTRO
+            siguiente = 0
+            start = texto.find(valor)
+            while start != -1 and start <= limite:
+                posiciones.append(desplazamiento + start)
+                textos.append(texto[start:start + LONGITUD_REGISTRO])
+                siguiente = start + LONGITUD_REGISTRO
+                start = texto.find(valor, siguiente)
+            
+            if posiciones:
+                yield posiciones, textos
+            if final:
+                return
+            
+            # Conservar el registro incompleto, o el final del bloque donde puede empezar uno
+            if start == -1:
+                start = max(siguiente, len(texto) - len(valor) + 1)
+            pendiente = texto[start:]
+            desplazamiento += start
+
+
+def centavos_a_pesos(centavos):
+    """
+    Convierte una expresión entera de centavos a pesos (decimal exacto, IMPORTE).
+    
+    Se arma el texto "pesos.centavos" y se convierte directo al decimal, sin pasar por
+    un float que pueda diferir en el último decimal.
+    
+    Args:
+        centavos (pl.Expr): Expresión entera con el importe en centavos
+    
+    Returns:
+        pl.Expr: Importe en pesos
+    """
+    absoluto = centavos.abs()
+    return pl.concat_str([
+        pl.when(centavos < 0).then(pl.lit('-')).otherwise(pl.lit('')),
+        (absoluto // 100).cast(pl.Utf8),
+        pl.lit('.'),
+        (absoluto % 100).cast(pl.Utf8).str.zfill(2)
+    ]).cast(IMPORTE)
+
+
+def decodificar_registros_sua(content, incluir_bimestral=True, nombre_archivo=None):
+    """
+    Decodifica todos los registros de trabajador de un .SUA en columnas.
+    
+    El archivo se recorre una sola vez; cada campo de la tabla CAMPOS_SUA se extrae
+    para todos los registros a la vez y con esas columnas se arman las hojas
+    SUA_MENSUAL y SUA_BIMESTRAL. Los registros con algún campo numérico inválido
+    se reportan y se omiten de la hoja correspondiente.
+    
+    Args:
+        content (str): Contenido completo del archivo .SUA
+        incluir_bimestral (bool): Si se debe armar también la hoja SUA_BIMESTRAL
+        nombre_archivo (str): Nombre del archivo para los mensajes de error
+    
+    Returns:
+        tuple: (pl.DataFrame SUA_MENSUAL, pl.DataFrame SUA_BIMESTRAL o None), sin filtrar DIAS = 0
+    """
+    inicios = localizar_registros_sua(content)
+    return decodificar_bloque_sua(
+        inicios, [content[i:i + LONGITUD_REGISTRO] for i in inicios],
+        incluir_bimestral=incluir_bimestral, nombre_archivo=nombre_archivo
+    )
+
+
+def decodificar_bloque_sua(posiciones, textos, incluir_bimestral=True, nombre_archivo=None):
+    """
+    Decodifica un grupo de registros de trabajador ya separados (todo el archivo o un
+    bloque de él) en las hojas SUA_MENSUAL y SUA_BIMESTRAL.
+    
+    Args:
+        posiciones (list): Posición de cada registro en el archivo, para los mensajes de error
+        textos (list): Texto de cada registro (295 caracteres)
+        incluir_bimestral (bool): Si se debe armar también la hoja SUA_BIMESTRAL
+        nombre_archivo (str): Nombre del archivo para los mensajes de error
+    
+    Returns:
+        tuple: (pl.DataFrame SUA_MENSUAL, pl.DataFrame SUA_BIMESTRAL o None), sin filtrar DIAS = 0
+    """
+    registros = pl.DataFrame({
+        'POSICION': pl.Series(posiciones, dtype=pl.Int64),
+        'REGISTRO': pl.Series(textos, dtype=pl.Utf8)
+    })
+    
+    # Extraer todos los campos de la tabla en una sola pasada columnar
+    crudos = registros.select(
+        [pl.col('POSICION')]
+        + [pl.col('REGISTRO').str.slice(inicio, fin - inicio).alias(columna)
+           for columna, inicio, fin, _ in CAMPOS_SUA]
+    )
+    
+    columnas = [pl.col('POSICION')]
+    invalidos = {}
+    for columna, _, _, tipo in CAMPOS_SUA:
+        crudo = pl.col(columna)
+        limpio = crudo.str.strip_chars()
+        if tipo == 'texto':
+            columnas.append(limpio.alias(columna))
+            continue
+        
+        if tipo == 'entero':
+            convertido = limpio.cast(pl.Int64, strict=False)
+        elif tipo == 'importe':
+            entero = limpio.cast(pl.Int64, strict=False)
+            convertido = (
+                pl.when(entero.is_not_null())
+                .then(centavos_a_pesos(entero))
+                .otherwise((limpio.cast(pl.Float64, strict=False) / 100).cast(IMPORTE))
+            )
+        else:
+            convertido = centavos_a_pesos(decode_base62_columna(crudo))
+        
+        vacio = limpio == ''
+        invalidos[columna] = ~vacio & convertido.is_null()
+        columnas.append(pl.when(vacio).then(0).otherwise(convertido).alias(columna))
+    
+    columnas.extend(expr.alias(f'_INVALIDO_{columna}') for columna, expr in invalidos.items())
+    decodificados = crudos.select(columnas)
+    
+    def armar_hoja(nombres_columnas, campos_total, etiqueta):
+        campos_numericos = [c for c in nombres_columnas if c in invalidos]
+        invalido = pl.any_horizontal([pl.col(f'_INVALIDO_{c}') for c in campos_numericos])
+        
+        for posicion, campo in decodificados.filter(invalido).select(
+            'POSICION',
+            pl.concat_str(
+                [pl.when(pl.col(f'_INVALIDO_{c}')).then(pl.lit(c)) for c in campos_numericos],
+                separator=', ', ignore_nulls=True
+            )
+        ).iter_rows():
+            origen = f" en {nombre_archivo}," if nombre_archivo else " en"
+            print(f"Error procesando registro{etiqueta}{origen} posición {posicion}: valor inválido en {campo}")
+        
+        total = reduce(lambda a, b: a + b, [pl.col(c) for c in campos_total])
+        return aplicar_esquema(decodificados.filter(~invalido).select(
+            [total.alias('TOTAL') if c == 'TOTAL' else pl.col(c) for c in nombres_columnas]
+        ))
+    
+    df_mensual = armar_hoja(COLUMNAS_SUA_MENSUAL, TOTAL_SUA_MENSUAL, '')
+    df_bimestral = None
+    if incluir_bimestral:
+        df_bimestral = armar_hoja(COLUMNAS_SUA_BIMESTRAL, TOTAL_SUA_BIMESTRAL, ' SUA_BIMESTRAL')
+    
+    return df_mensual, df_bimestral
+
+
+def lotes_sua(sua_path, incluir_bimestral=True, nombre_archivo=None, tamaño_bloque=BLOQUE_SUA):
+    """
+    Decodifica el .SUA bloque por bloque (leer_bloques_sua), de modo que la memoria usada
+    no depende del tamaño del archivo.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        incluir_bimestral (bool): Si se deben decodificar también los registros SUA_BIMESTRAL
+        nombre_archivo (str): Nombre a incluir en los mensajes de error
+        tamaño_bloque (int): Bytes que se leen a la vez
+    
+    Yields:
+        tuple: (pa.RecordBatch SUA_MENSUAL, pa.RecordBatch SUA_BIMESTRAL o None) de cada
+               bloque, sin filtrar DIAS = 0
+    """
+    def a_lote(df):
+        tabla = df.to_arrow()
+        return pa.RecordBatch.from_arrays([columna.combine_chunks() for columna in tabla.columns],
+                                          schema=tabla.schema)
+    
+    for posiciones, textos in leer_bloques_sua(sua_path, tamaño_bloque):
+        df_mensual, df_bimestral = decodificar_bloque_sua(
+            posiciones, textos, incluir_bimestral=incluir_bimestral, nombre_archivo=nombre_archivo
+        )
+        yield a_lote(df_mensual), (a_lote(df_bimestral) if df_bimestral is not None else None)
+
+
+def preparar_hoja_sua(registros):
+    """
+    Deja los registros filtrados de una hoja tal como se guardan en la cédula: con los
+    tipos de esquemas.ESQUEMAS (N_CREDITO vacío como "-"), sin filas duplicadas y
+    ordenados por RP y nombre. Una consulta (modo por bloques) se prepara igual, pero
+    sigue siendo una consulta.
+    
+    Args:
+        registros (pl.DataFrame | pl.LazyFrame): Registros de SUA_MENSUAL o SUA_BIMESTRAL con días
+    
+    Returns:
+        pl.DataFrame | pl.LazyFrame: Hoja lista para confrontar o escribir en Excel
+    """
+    return (
+        aplicar_esquema(registros)
+        .unique(keep='first', maintain_order=True)
+        .sort(['RP', 'NOMBRE ASEGURADO'], maintain_order=True)
+    )
+
+
+def guardar_sua_excel(estructurado, base_path):
+    """
+    Guarda un SUA estructurado en Excel con el formato de la cédula (encabezado #611232
+    con fuente #B3945A y ancho de columnas ajustado).
+    
+    Args:
+        estructurado (dict): Resultado de estructurar_1sua o estructurar_suas
+        base_path (str): Carpeta donde guardar el archivo
+    
+    Returns:
+        str: Ruta del archivo Excel creado
+    """
+    excel_path = os.path.join(base_path, f"{estructurado['nombre']}.xlsx")
+    
+    # Crear el directorio si no existe
+    os.makedirs(base_path, exist_ok=True)
+    
+    # Guardar cada hoja (SUA_MENSUAL y, si existe, SUA_BIMESTRAL) con formato en una sola pasada
+    header_fill = PatternFill(start_color='611232', end_color='611232', fill_type='solid')
+    header_font = Font(color='B3945A', bold=True)
+    guardar_hojas_excel(excel_path, estructurado['hojas'], header_fill, header_font)
+    
+    if 'SUA_BIMESTRAL' in estructurado['hojas']:
+        print("Formato SUA_BIMESTRAL aplicado: fondo #611232, fuente #B3945A")
+    
+    return excel_path
+
+
+def agregar_sua_al_historial(sua_path, registros, registros_suab=None, ingeridos=None):
+    """
+    Agrega un archivo .SUA al historial de SUA, salvo que ya se haya agregado antes
+    (se reconoce por su contenido, aunque se haya copiado o renombrado). Si corrige a un
+    archivo ya guardado (mismo periodo, registro patronal y nombre), lo reemplaza; los demás
+    del mismo periodo y registro patronal, como un SUA complementario, se conservan.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        registros (pl.DataFrame | pl.LazyFrame): Registros SUA_MENSUAL del archivo, ya sin DIAS = 0
+        registros_suab (pl.DataFrame | pl.LazyFrame): Registros SUA_BIMESTRAL sin DIAS = 0, o None
+        ingeridos (dict): Registro del historial ya leído (leer_ingeridos) cuando se agregan
+            varios archivos; se actualiza en memoria y quien lo pasa lo guarda con
+            guardar_ingeridos. Si es None se lee y se guarda aquí.
+    
+    Returns:
+        bool: True si se agregó, False si ya estaba o hubo un error
+    """
+    sua_file = os.path.basename(sua_path)
+    try:
+        guardar = ingeridos is None
+        if guardar:
+            ingeridos = leer_ingeridos()
+        
+        # Un archivo ya registrado que no ha cambiado no se vuelve a leer para su huella
+        huella = huella_registrada(sua_path, ingeridos) or huella_archivo(sua_path)
+        if esta_ingerido(huella, ingeridos):
+            print(f"{sua_file} ya está en el historial")
+            return False
+        
+        mes, año, registro_patronal = leer_encabezado_sua(sua_path)
+        hojas = {'SUA_MENSUAL': preparar_hoja_sua(registros)}
+        if registros_suab is not None and contar_filas(registros_suab):
+            hojas['SUA_BIMESTRAL'] = preparar_hoja_sua(registros_suab)
+        
+        guardar_en_historial(huella, sua_path, mes, año, registro_patronal, hojas, ingeridos=ingeridos)
+        if guardar:
+            guardar_ingeridos(ingeridos)
+        print(f"{sua_file} agregado al historial ({mes}-{año}, {registro_patronal})")
+        return True
+        
+    except Exception as e:
+        print(f"No se pudo agregar {sua_file} al historial: {e}")
+        return False
+
+
+def cargar_sua_historial(mes, año, registros_patronales=None):
+    """
+    Arma las hojas de un periodo a partir del historial de SUA, sin volver a leer los
+    archivos .SUA; el resultado es el mismo que el de estructurar_suas y se puede
+    confrontar directamente con sua_vs_emision.
+    
+    Args:
+        mes (str): Mes del periodo (MM)
+        año (str): Año del periodo (AAAA)
+        registros_patronales (list): Registros patronales a incluir (None = todos)
+    
+    Returns:
+        dict: 'mes', 'año', 'nombre', 'archivos' y 'hojas' (nombre de hoja -> pl.DataFrame),
+              o None si el periodo no está en el historial
+    """
+    mes = f"{int(mes):02d}"
+    año = str(año)
+    
+    hojas = {}
+    for nombre_hoja in ('SUA_MENSUAL', 'SUA_BIMESTRAL'):
+        consulta = consultar_historial(nombre_hoja)
+        if consulta is None:
+            continue
+        consulta = consulta.filter(pl.col('periodo') == f"{año}-{mes}")
+        if registros_patronales is not None:
+            consulta = consulta.filter(pl.col('registro_patronal').is_in(list(registros_patronales)))
+        registros = consulta.drop('periodo', 'registro_patronal').collect()
+        if not registros.is_empty():
+            hojas[nombre_hoja] = preparar_hoja_sua(registros)
+    
+    if 'SUA_MENSUAL' not in hojas:
+        print(f"El periodo {mes}-{año} no está en el historial de SUA")
+        return None
+    
+    archivos = [
+        datos['archivo'] for datos in leer_ingeridos().values()
+        if datos['periodo'] == f"{año}-{mes}" and 'reemplazado_por' not in datos
+        and (registros_patronales is None or datos['registro_patronal'] in registros_patronales)
+    ]
+    
+    return {
+        'mes': mes,
+        'año': año,
+        'nombre': f"{mes}-{año}_HISTORIAL_CEDULA",
+        'archivos': archivos,
+        'hojas': hojas
+    }
+
+
+def estructurar_1sua(sua_path, historial=False):
+    """
+    Le da forma al archivo .SUA del IMSS y regresa sus hojas en memoria, sin escribir
+    ningún archivo, para confrontarlas directamente o guardarlas con guardar_sua_excel.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        historial (bool): Si se agrega el periodo al historial de SUA (si no estaba ya)
+    
+    Returns:
+        dict: 'mes', 'año', 'nombre' (para el archivo), 'archivos' y 'hojas'
+              (nombre de hoja -> pl.DataFrame), o None si hay error
+    """
+    
+    # Leemos el archivo .SUA directamente
+    if not sua_path.endswith('.SUA'):
+        raise ValueError("El archivo debe tener la extensión .SUA")
     
     # Extraer datos para el nombre personalizado del archivo
-    mes = content[30:32]  # Caracteres 31 y 32 (índice 30:32)
-    año = content[26:30]  # Caracteres 27 al 30 (índice 26:30)
-    registro_patronal = content[2:13].strip()  # Número de registro patronal
+    mes, año, registro_patronal = leer_encabezado_sua(sua_path)
     
     # Generar nombre personalizado: "mes-año_registro_patronal"
     nombre_personalizado = f"{mes}-{año}_{registro_patronal}_CEDULA"
@@ -55,287 +546,227 @@ def estructurar_1sua_destino(sua_path, output_folder=None):
     crear_hoja_adicional = (mes_numero % 2 == 0)
     print(f"Mes: {mes_numero}, ¿Es par?: {crear_hoja_adicional}")
 
-    # Iterar sobre el contenido del archivo .txt para extraer los datos
-    registros = []
+    # Decodificar en una sola pasada los registros de SUA_MENSUAL y SUA_BIMESTRAL
     try:
-        start = 0
-        while True:
-            start = content.find(valor, start)
-            if start == -1:
-                break
-            
-            # Verificar que hay suficientes caracteres para extraer el registro completo
-            if start + 295 > len(content):
-                break
-            
-            try:
-                # Extraer datos del registro
-                rp = content[start+2:start+13].strip()
-                nss = content[start+33:start+44].strip()
-                rfc = content[start+44:start+57].strip()
-                curp = content[start+57:start+75].strip()
-                n_credito = content[start+75:start+85].strip()
-                if not n_credito:
-                    n_credito = None
-                movimientos = content[start+93:start+95].strip()
-                nombre = content[start+95:start+145].strip()
-                dias = int(content[start+154:start+156].strip()) if content[start+154:start+156].strip() else 0
-                sdi = float(content[start+145:start+152].strip()) / 100 if content[start+145:start+152].strip() else 0
-                incapacidad = int(content[start+156:start+158].strip()) if content[start+156:start+158].strip() else 0
-                ausentismo = int(content[start+158:start+160].strip()) if content[start+158:start+160].strip() else 0
-                cf = float(content[start+160:start+167].strip()) / 100 if content[start+160:start+167].strip() else 0
-                exc_pat = float(content[start+167:start+174].strip()) / 100 if content[start+167:start+174].strip() else 0
-                exc_obr = decode_base62(content[start+278:start+281]) / 100 if content[start+278:start+281].strip() else 0
-                pd_pat = float(content[start+174:start+181].strip()) / 100 if content[start+174:start+181].strip() else 0
-                pd_obr = decode_base62(content[start+281:start+284]) / 100 if content[start+281:start+284].strip() else 0
-                gmp_pat = float(content[start+181:start+188].strip()) / 100 if content[start+181:start+188].strip() else 0
-                gmp_obr = decode_base62(content[start+284:start+287]) / 100 if content[start+284:start+287].strip() else 0
-                rt = float(content[start+188:start+195].strip()) / 100 if content[start+188:start+195].strip() else 0
-                iv_pat = float(content[start+195:start+202].strip()) / 100 if content[start+195:start+202].strip() else 0
-                iv_obr = decode_base62(content[start+287:start+290]) / 100 if content[start+287:start+290].strip() else 0
-                gps = float(content[start+202:start+209].strip()) / 100 if content[start+202:start+209].strip() else 0
-                
-                total = cf + exc_pat + exc_obr + pd_pat + pd_obr + gmp_pat + gmp_obr + rt + iv_pat + iv_obr + gps
-                
-                registro = {
-                    'RP': rp,
-                    'NSS': nss,
-                    'NOMBRE ASEGURADO': nombre,
-                    'DIAS': dias,
-                    'SDI': sdi,
-                    'RFC': rfc,
-                    'CURP': curp,
-                    'N_CREDITO': n_credito,
-                    'MOVIMIENTOS': movimientos,
-                    'INCAPACIDAD': incapacidad,
-                    'AUSENTISMO': ausentismo,
-                    'CF': cf,
-                    'EXC_PAT': exc_pat,
-                    'EXC_OBR': exc_obr,
-                    'PD_PAT': pd_pat,
-                    'PD_OBR': pd_obr,
-                    'GMP_PAT': gmp_pat,
-                    'GMP_OBR': gmp_obr,
-                    'RT': rt,
-                    'IV_PAT': iv_pat,
-                    'IV_OBR': iv_obr,
-                    'GPS': gps,
-                    'TOTAL': total
-                }
-                
-                registros.append(registro)
-                
-            except (ValueError, IndexError) as e:
-                print(f"Error procesando registro en posición {start}: {e}")
-                continue
-            
-            start += 295  # Avanzar al siguiente registro
-            
+        registros, registros_suab = cargar_sua(sua_path, incluir_bimestral=crear_hoja_adicional)
     except Exception as e:
         print(f"Error procesando el archivo: {e}")
         return None
     
-    # Procesar registros para SUA_BIMESTRAL (solo si el mes es par)
-    registros_suab = []
-    if crear_hoja_adicional:
-        try:
-            start = 0
-            while True:
-                start = content.find(valor, start)
-                if start == -1:
-                    break
-                
-                if start + 295 > len(content):
-                    break
-                
-                try:
-                    # Solo agregar campos específicos para SUA_BIMESTRAL
-                    rp = content[start+2:start+13].strip()
-                    nss = content[start+33:start+44].strip()
-                    nombre = content[start+95:start+145].strip()
-                    dias = int(content[start+154:start+156].strip()) if content[start+154:start+156].strip() else 0
-                    sdi = float(content[start+145:start+152].strip()) / 100 if content[start+145:start+152].strip() else 0
-                    n_credito = content[start+75:start+85].strip()
-                    if not n_credito:
-                        n_credito = None
-                    
-                    # Campos específicos bimestrales (ejemplo)
-                    retiro = float(content[start+209:start+216].strip()) / 100 if content[start+209:start+216].strip() else 0
-                    ceav_pat = float(content[start+216:start+223].strip()) / 100 if content[start+216:start+223].strip() else 0
-                    ceav_obr = float(content[start+223:start+230].strip()) / 100 if content[start+223:start+230].strip() else 0
-                    aportacion_pat = float(content[start+237:start+244].strip()) / 100 if content[start+237:start+244].strip() else 0
-                    amortizacion = float(content[start+244:start+251].strip()) / 100 if content[start+244:start+251].strip() else 0
-                    
-                    registro_suab = {
-                        'RP': rp,
-                        'NSS': nss,
-                        'NOMBRE ASEGURADO': nombre,
-                        'DIAS': dias,
-                        'SDI': sdi,
-                        'N_CREDITO': n_credito,
-                        'RETIRO': retiro,
-                        'CEAV_PAT': ceav_pat,
-                        'CEAV_OBR': ceav_obr,
-                        'APORTACION_PAT': aportacion_pat,
-                        'AMORTIZACION': amortizacion,
-                        'TOTAL': retiro + ceav_pat + ceav_obr + aportacion_pat + amortizacion
-                    }
-
-                    registros_suab.append(registro_suab)
-                except (ValueError, IndexError) as e:
-                    print(f"Error procesando registro SUA_BIMESTRAL en posición {start}: {e}")
-                    continue
-                
-                start += 295  # Avanzar al siguiente registro
-        except Exception as e:
-            print(f"Error procesando registros SUA_BIMESTRAL: {e}")
-            registros_suab = []  # Si hay error, no crear la hoja SUA_BIMESTRAL
-    
     # Verificar que se encontraron registros
-    if not registros:
+    if registros.is_empty():
         print("No se encontraron registros en el archivo.")
         return None
     
     # Filtrar registros para eliminar aquellos con DIAS = 0
-    registros_filtrados = [registro for registro in registros if registro['DIAS'] != 0]
+    registros_filtrados = registros.filter(pl.col('DIAS') != 0)
     print(f"Registros antes del filtro: {len(registros)}")
     print(f"Registros después del filtro (eliminando DIAS = 0): {len(registros_filtrados)}")
     
     # Verificar que quedan registros después del filtro
-    if not registros_filtrados:
+    if registros_filtrados.is_empty():
         print("No quedan registros después de filtrar aquellos con DIAS = 0.")
         return None
     
-    # Crear un archivo Excel con los datos extraídos
-    try:
-        df = pd.DataFrame(registros_filtrados)
-        
-        # Eliminar filas completamente duplicadas
-        df = df.drop_duplicates()
-        
-        # Rellenar valores nulos de N_CREDITO con "-"
-        if 'N_CREDITO' in df.columns:
-            df['N_CREDITO'] = df['N_CREDITO'].fillna('-').replace('', '-')
-        
-        # Ordenar por RP y después por NOMBRE ASEGURADO
-        df = df.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
+    hojas = {'SUA_MENSUAL': preparar_hoja_sua(registros_filtrados)}
+    
+    # Si el mes es par, crear la hoja SUA_BIMESTRAL con sus propios registros
+    if crear_hoja_adicional and registros_suab is not None and not registros_suab.is_empty():
+        registros_suab_filtrados = registros_suab.filter(pl.col('DIAS') != 0)
+        print(f"Registros SUA_BIMESTRAL antes del filtro: {len(registros_suab)}")
+        print(f"Registros SUA_BIMESTRAL después del filtro (eliminando DIAS = 0): {len(registros_suab_filtrados)}")
         
-        # Usar carpeta de destino si se especifica, sino usar carpeta original
-        if output_folder:
-            base_path = output_folder
+        if not registros_suab_filtrados.is_empty():
+            hojas['SUA_BIMESTRAL'] = preparar_hoja_sua(registros_suab_filtrados)
+            print("Hoja SUA_BIMESTRAL creada (mes par detectado)")
         else:
-            base_path = os.path.dirname(sua_path)
-            
-        excel_path = os.path.join(base_path, f"{nombre_personalizado}.xlsx")
+            print("No hay registros SUA_BIMESTRAL válidos para crear la hoja")
+    elif crear_hoja_adicional:
+        print("No se pudieron procesar registros SUA_BIMESTRAL")
+    
+    if historial:
+        agregar_sua_al_historial(sua_path, registros_filtrados,
+                                 registros_suab_filtrados if 'SUA_BIMESTRAL' in hojas else None)
+    
+    return {
+        'mes': mes,
+        'año': año,
+        'nombre': nombre_personalizado,
+        'archivos': [sua_path],
+        'hojas': hojas
+    }
+
+
+def estructurar_1sua_por_bloques(sua_path, carpeta_temporal, historial=False, tamaño_bloque=BLOQUE_SUA):
+    """
+    Igual que estructurar_1sua, pero para archivos muy grandes: el .SUA se decodifica por
+    bloques (lotes_sua) y cada bloque, ya sin DIAS = 0, se escribe en un Parquet dentro de
+    carpeta_temporal. Las hojas que regresa son consultas sobre esos Parquet, ya sin
+    duplicados y ordenadas, que se guardan por lotes con guardar_en_formatos; solo son
+    válidas mientras exista carpeta_temporal.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        carpeta_temporal (str): Carpeta donde se guardan los registros decodificados
+        historial (bool): Si se agrega el periodo al historial de SUA (si no estaba ya)
+        tamaño_bloque (int): Bytes del .SUA que se leen a la vez
+    
+    Returns:
+        dict: 'mes', 'año', 'nombre' (para el archivo), 'archivos' y 'hojas'
+              (nombre de hoja -> pl.LazyFrame), o None si hay error
+    """
+    
+    if not sua_path.endswith('.SUA'):
+        raise ValueError("El archivo debe tener la extensión .SUA")
+    
+    # Extraer datos para el nombre personalizado del archivo
+    mes, año, registro_patronal = leer_encabezado_sua(sua_path)
+    
+    nombre_personalizado = f"{mes}-{año}_{registro_patronal}_CEDULA"
+    print(f"Nombre personalizado del archivo: {nombre_personalizado}")
+    
+    # Verificar si el mes es par para crear hoja adicional
+    mes_numero = int(mes)
+    crear_hoja_adicional = (mes_numero % 2 == 0)
+    print(f"Mes: {mes_numero}, ¿Es par?: {crear_hoja_adicional}")
+    
+    # Decodificar bloque por bloque; cada hoja se va escribiendo en su Parquet (sin DIAS = 0)
+    nombres_hojas = ('SUA_MENSUAL', 'SUA_BIMESTRAL')
+    rutas = {nombre_hoja: os.path.join(carpeta_temporal, f"{nombre_hoja}_bloques.parquet")
+             for nombre_hoja in nombres_hojas}
+    escritores = {}
+    antes = dict.fromkeys(nombres_hojas, 0)
+    despues = dict.fromkeys(nombres_hojas, 0)
+    try:
+        for lotes in lotes_sua(sua_path, incluir_bimestral=crear_hoja_adicional, tamaño_bloque=tamaño_bloque):
+            for nombre_hoja, lote in zip(nombres_hojas, lotes):
+                if lote is None:
+                    continue
+                antes[nombre_hoja] += lote.num_rows
+                lote = lote.filter(pc.not_equal(lote.column('DIAS'), 0))
+                despues[nombre_hoja] += lote.num_rows
+                if nombre_hoja not in escritores:
+                    escritores[nombre_hoja] = pq.ParquetWriter(rutas[nombre_hoja], lote.schema)
+                escritores[nombre_hoja].write_batch(lote)
+    except Exception as e:
+        print(f"Error procesando el archivo: {e}")
+        return None
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+    
+    # Verificar que se encontraron registros
+    if antes['SUA_MENSUAL'] == 0:
+        print("No se encontraron registros en el archivo.")
+        return None
+    
+    print(f"Registros antes del filtro: {antes['SUA_MENSUAL']}")
+    print(f"Registros después del filtro (eliminando DIAS = 0): {despues['SUA_MENSUAL']}")
+    
+    if despues['SUA_MENSUAL'] == 0:
+        print("No quedan registros después de filtrar aquellos con DIAS = 0.")
+        return None
+    
+    def ordenar(nombre_hoja):
+        # Quitar duplicados y ordenar una sola vez; las hojas se leen después por tramos
+        ruta = os.path.join(carpeta_temporal, f"{nombre_hoja}.parquet")
+        preparar_hoja_sua(pl.scan_parquet(rutas[nombre_hoja])).sink_parquet(ruta)
+        return pl.scan_parquet(ruta)
+    
+    hojas = {'SUA_MENSUAL': ordenar('SUA_MENSUAL')}
+    
+    if crear_hoja_adicional and antes['SUA_BIMESTRAL']:
+        print(f"Registros SUA_BIMESTRAL antes del filtro: {antes['SUA_BIMESTRAL']}")
+        print(f"Registros SUA_BIMESTRAL después del filtro (eliminando DIAS = 0): {despues['SUA_BIMESTRAL']}")
         
-        # Crear el directorio si no existe
+        if despues['SUA_BIMESTRAL']:
+            hojas['SUA_BIMESTRAL'] = ordenar('SUA_BIMESTRAL')
+            print("Hoja SUA_BIMESTRAL creada (mes par detectado)")
+        else:
+            print("No hay registros SUA_BIMESTRAL válidos para crear la hoja")
+    elif crear_hoja_adicional:
+        print("No se pudieron procesar registros SUA_BIMESTRAL")
+    
+    if historial:
+        agregar_sua_al_historial(sua_path, pl.scan_parquet(rutas['SUA_MENSUAL']),
+                                 pl.scan_parquet(rutas['SUA_BIMESTRAL']) if 'SUA_BIMESTRAL' in hojas else None)
+    
+    return {
+        'mes': mes,
+        'año': año,
+        'nombre': nombre_personalizado,
+        'archivos': [sua_path],
+        'hojas': hojas
+    }
+
+
+def estructurar_1sua_destino(sua_path, output_folder=None, formato=FORMATO_EXCEL, historial=False,
+                             por_bloques=False):
+    """
+    Función modificada para darle forma al archivo .SUA del IMSS, 
+    guardando el resultado en la carpeta especificada.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa la carpeta del archivo original.
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+        historial (bool): Si se agrega el periodo al historial de SUA (si no estaba ya)
+        por_bloques (bool): Leer y escribir el archivo por bloques (estructurar_1sua_por_bloques)
+            para que la memoria usada no dependa de su tamaño
+    
+    Returns:
+        str: Ruta del archivo Excel creado (o del primer archivo Parquet/Arrow si no se pidió Excel),
+             o None si hay error
+    """
+    # Usar carpeta de destino si se especifica, sino usar carpeta original
+    if output_folder:
+        base_path = output_folder
+    else:
+        base_path = carpeta_real(os.path.dirname(sua_path))
+    
+    if por_bloques:
         os.makedirs(base_path, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix='.sua_bloques_', dir=base_path) as carpeta_temporal:
+            estructurado = estructurar_1sua_por_bloques(sua_path, carpeta_temporal, historial=historial)
+            return guardar_sua_destino(estructurado, base_path, formato)
+    
+    estructurado = estructurar_1sua(sua_path, historial=historial)
+    return guardar_sua_destino(estructurado, base_path, formato)
+
+
+def guardar_sua_destino(estructurado, base_path, formato=FORMATO_EXCEL):
+    """
+    Guarda el resultado de estructurar_1sua (o estructurar_1sua_por_bloques) en los
+    formatos pedidos, para estructurar_1sua_destino.
+    
+    Args:
+        estructurado (dict): Resultado a guardar, o None si no se pudo estructurar
+        base_path (str): Carpeta donde guardar el resultado
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+    
+    Returns:
+        str: Ruta del archivo Excel creado (o del primer archivo Parquet/Arrow si no se pidió Excel),
+             o None si hay error
+    """
+    if estructurado is None:
+        return None
+    
+    # Crear un archivo Excel (y/o Parquet/Arrow) con los datos extraídos
+    try:
+        rutas = guardar_en_formatos(estructurado, base_path, formato, guardar_sua_excel)
+        excel_path = rutas[0]
         
-        # Guardar el DataFrame en Excel con la hoja SUA_MENSUAL
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='SUA_MENSUAL')
-            
-            # Si el mes es par, crear la hoja SUA_BIMESTRAL con sus propios registros
-            if crear_hoja_adicional and registros_suab:
-                registros_suab_filtrados = [registro for registro in registros_suab if registro['DIAS'] != 0]
-                print(f"Registros SUA_BIMESTRAL antes del filtro: {len(registros_suab)}")
-                print(f"Registros SUA_BIMESTRAL después del filtro (eliminando DIAS = 0): {len(registros_suab_filtrados)}")
-                
-                if registros_suab_filtrados:
-                    df_suab = pd.DataFrame(registros_suab_filtrados)
-                    
-                    # Eliminar filas completamente duplicadas
-                    df_suab = df_suab.drop_duplicates()
-                    
-                    # Rellenar valores nulos de N_CREDITO con "-"
-                    if 'N_CREDITO' in df_suab.columns:
-                        df_suab['N_CREDITO'] = df_suab['N_CREDITO'].fillna('-').replace('', '-')
-                    
-                    # Ordenar por RP y después por NOMBRE ASEGURADO
-                    df_suab = df_suab.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-                    
-                    df_suab.to_excel(writer, index=False, sheet_name='SUA_BIMESTRAL')
-                    print("Hoja SUA_BIMESTRAL creada (mes par detectado)")
-                else:
-                    print("No hay registros SUA_BIMESTRAL válidos para crear la hoja")
-            elif crear_hoja_adicional:
-                print("No se pudieron procesar registros SUA_BIMESTRAL")
-        
-        # Aplicar formato usando openpyxl
-        workbook = load_workbook(excel_path)
-        
-        # Formatear hoja SUA_MENSUAL
-        worksheet_suam = workbook['SUA_MENSUAL']
-        
-        # Definir los estilos para el encabezado SUA_MENSUAL
-        header_fill_suam = PatternFill(start_color='611232', end_color='611232', fill_type='solid')
-        header_font_suam = Font(color='B3945A', bold=True)
-        
-        # Aplicar formato a la primera fila de SUA_MENSUAL
-        for cell in worksheet_suam[1]:
-            cell.fill = header_fill_suam
-            cell.font = header_font_suam
-        
-        # Ajustar el ancho de las columnas en SUA_MENSUAL
-        for column in worksheet_suam.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet_suam.column_dimensions[column_letter].width = adjusted_width
-        
-        # Si existe la hoja SUA_BIMESTRAL, aplicar su formato
-        if crear_hoja_adicional and 'SUA_BIMESTRAL' in workbook.sheetnames:
-            worksheet_suab = workbook['SUA_BIMESTRAL']
-            
-            # Definir los estilos para el encabezado SUA_BIMESTRAL
-            header_fill_suab = PatternFill(start_color='611232', end_color='611232', fill_type='solid')
-            header_font_suab = Font(color='B3945A', bold=True)
-
-            # Aplicar formato a la primera fila de SUA_BIMESTRAL
-            for cell in worksheet_suab[1]:
-                cell.fill = header_fill_suab
-                cell.font = header_font_suab
-            
-            # Ajustar ancho de columnas para SUA_BIMESTRAL
-            for column in worksheet_suab.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet_suab.column_dimensions[column_letter].width = adjusted_width
-            
-            print("Formato SUA_BIMESTRAL aplicado: fondo #611232, fuente #B3945A")
-        
-        # Guardar los cambios
-        workbook.save(excel_path)
-        workbook.close()
-        
-        print(f"Archivo Excel creado exitosamente: {excel_path}")
-        print(f"Se procesaron {len(registros_filtrados)} registros válidos (excluyendo DIAS = 0)")
-        print("Formato SUA_MENSUAL aplicado: fondo #611232, fuente #B3945A")
-        if crear_hoja_adicional:
-            if 'SUA_BIMESTRAL' in workbook.sheetnames:
+        if excel_path.endswith('.xlsx'):
+            print(f"Archivo Excel creado exitosamente: {excel_path}")
+        print(f"Se procesaron {contar_filas(estructurado['hojas']['SUA_MENSUAL'])} registros válidos (excluyendo DIAS = 0)")
+        if excel_path.endswith('.xlsx'):
+            print("Formato SUA_MENSUAL aplicado: fondo #611232, fuente #B3945A")
+        if int(estructurado['mes']) % 2 == 0:
+            if 'SUA_BIMESTRAL' in estructurado['hojas']:
                 print("Hoja SUA_BIMESTRAL incluida (mes par detectado)")
             else:
                 print("Mes par detectado pero no se creó hoja SUA_BIMESTRAL")
         
-        # Limpiar archivo temporal
-        try:
-            os.remove(new_path)
-        except:
-            pass
-            
         return excel_path
         
     except Exception as e:
@@ -343,47 +774,118 @@ def estructurar_1sua_destino(sua_path, output_folder=None):
         return None
 
 
-def estructurar_varios_suas(folder_path, output_folder=None):
+def leer_encabezado_sua(sua_path):
     """
-    Función modificada para procesar múltiples archivos .SUA en una carpeta y combinarlos 
-    en un solo archivo Excel con hojas SUA_MENSUAL y SUA_BIMESTRAL (si aplica).
+    Lee solo el encabezado del .SUA para obtener el periodo que reporta y el registro patronal.
     
     Args:
-        folder_path (str): Ruta de la carpeta que contiene los archivos .SUA
-        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa folder_path.
+        sua_path (str): Ruta del archivo .SUA
     
     Returns:
-        str: Ruta del archivo Excel creado, o None si ocurre un error
+        tuple: (mes, año, registro_patronal) como texto, p. ej. ('02', '2024', 'A1234567890')
+    """
+    with abrir_archivo(sua_path) as f:
+        encabezado = f.read(32).decode('utf-8')
+    return encabezado[30:32], encabezado[26:30], encabezado[2:13].strip()
+
+
+def cargar_sua(sua_path, incluir_bimestral=True, nombre_archivo=None):
     """
+    Obtiene los registros decodificados de un .SUA, usando la caché en disco si el archivo
+    no ha cambiado desde la última vez que se procesó. Los mensajes de la decodificación
+    original se vuelven a imprimir al leer de la caché.
     
-    if not os.path.exists(folder_path):
-        print(f"La carpeta {folder_path} no existe.")
-        return None
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        incluir_bimestral (bool): Si se deben decodificar también los registros SUA_BIMESTRAL
+        nombre_archivo (str): Nombre a incluir en los mensajes de error
     
-    def buscar_archivos_sua(directorio, nivel=0, max_nivel=5):
-        """Busca archivos .SUA recursivamente hasta el nivel máximo especificado"""
-        archivos_sua = []
-        
-        if nivel > max_nivel:
-            return archivos_sua
-        
+    Returns:
+        tuple: (pl.DataFrame SUA_MENSUAL, pl.DataFrame SUA_BIMESTRAL o None), sin filtrar
+    """
+    clave = clave_archivo(sua_path, 'sua', incluir_bimestral, nombre_archivo)
+    en_cache = leer_cache(clave)
+    if en_cache is not None:
+        tablas, metadatos = en_cache
+        print(metadatos['mensajes'], end='')
+        return tablas['mensual'], tablas['bimestral']
+    
+    content = leer_archivo_sua(sua_path)
+    mensajes = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(mensajes):
+            df_mensual, df_bimestral = decodificar_registros_sua(
+                content, incluir_bimestral=incluir_bimestral, nombre_archivo=nombre_archivo
+            )
+    finally:
+        print(mensajes.getvalue(), end='')
+    
+    guardar_cache(clave, {'mensual': df_mensual, 'bimestral': df_bimestral},
+                  {'mensajes': mensajes.getvalue()})
+    return df_mensual, df_bimestral
+
+
+def procesar_archivo_sua(sua_path, incluir_bimestral):
+    """
+    Lee y decodifica un archivo .SUA para estructurar_varios_suas. Puede ejecutarse en
+    un proceso aparte: los mensajes se capturan y se regresan para imprimirlos en orden.
+    
+    Args:
+        sua_path (str): Ruta del archivo .SUA
+        incluir_bimestral (bool): Si se deben decodificar también los registros SUA_BIMESTRAL
+    
+    Returns:
+        tuple: (pl.DataFrame SUA_MENSUAL, pl.DataFrame SUA_BIMESTRAL o None, mensajes);
+               los DataFrames son None si el archivo no se pudo procesar
+    """
+    sua_file = os.path.basename(sua_path)
+    mensajes = io.StringIO()
+    with contextlib.redirect_stdout(mensajes):
         try:
-            for item in os.listdir(directorio):
-                item_path = os.path.join(directorio, item)
-                if os.path.isfile(item_path) and item.upper().endswith('.SUA'):
-                    archivos_sua.append(item_path)
-                elif os.path.isdir(item_path):
-                    archivos_sua.extend(buscar_archivos_sua(item_path, nivel + 1, max_nivel))
-        except PermissionError:
-            print(f"Sin permisos para acceder a: {directorio}")
+            # Decodificar (o tomar de la caché) los registros SUA_MENSUAL y SUA_BIMESTRAL (solo con días)
+            registros_archivo, registros_suab_archivo = cargar_sua(
+                sua_path, incluir_bimestral=incluir_bimestral, nombre_archivo=sua_file
+            )
+            registros_archivo = registros_archivo.filter(pl.col('DIAS') > 0)
+            
+            if incluir_bimestral:
+                registros_suab_archivo = registros_suab_archivo.filter(pl.col('DIAS') > 0)
+                print(f"Procesado {sua_file}: {len(registros_suab_archivo)} registros SUA_BIMESTRAL")
+            
+            print(f"Procesado {sua_file}: {len(registros_archivo)} registros SUA_MENSUAL")
+            
         except Exception as e:
-            print(f"Error accediendo a {directorio}: {e}")
-        
-        return archivos_sua
+            print(f"Error procesando archivo {sua_file}: {e}")
+            registros_archivo = registros_suab_archivo = None
+    
+    return registros_archivo, registros_suab_archivo, mensajes.getvalue()
+
+
+def estructurar_suas(folder_path, procesos=None, historial=False):
+    """
+    Procesa múltiples archivos .SUA en una carpeta y combina sus registros en memoria en
+    las hojas SUA_MENSUAL y SUA_BIMESTRAL (si aplica), sin escribir ningún archivo.
+    
+    Args:
+        folder_path (str): Ruta de la carpeta que contiene los archivos .SUA (también se
+            buscan dentro de los .zip; puede ser un .zip)
+        procesos (int): Número de procesos para leer los archivos en paralelo. Si es None,
+                        usa hasta un proceso por núcleo, uno por cada ARCHIVOS_POR_PROCESO
+                        archivos; con 1 se procesan uno tras otro.
+        historial (bool): Si se agrega cada archivo al historial de SUA (los que no estaban ya)
+    
+    Returns:
+        dict: 'mes', 'año', 'nombre' (para el archivo), 'archivos' y 'hojas'
+              (nombre de hoja -> pl.DataFrame), o None si ocurre un error
+    """
+    
+    if not os.path.exists(folder_path):
+        print(f"La carpeta {folder_path} no existe.")
+        return None
     
     # Buscar todos los archivos .SUA en la carpeta y subcarpetas
     print("Buscando archivos .SUA en carpeta y subcarpetas (máximo 5 niveles)...")
-    sua_files_paths = buscar_archivos_sua(folder_path)
+    sua_files_paths = [archivo.ruta for archivo in buscar_archivos(folder_path, extensiones=('.sua',), en_zip=True)]
     
     if not sua_files_paths:
         print("No se encontraron archivos .SUA en la carpeta especificada ni en subcarpetas.")
@@ -402,308 +904,138 @@ def estructurar_varios_suas(folder_path, output_folder=None):
     primer_año = None
     crear_hoja_bimestral = False
     
-    # Procesar cada archivo .SUA
+    # El periodo (y si se crea la hoja SUA_BIMESTRAL) lo determina el primer archivo legible
     for sua_path in sua_files_paths:
-        sua_file = os.path.basename(sua_path)
-        print(f"Procesando archivo: {sua_file}")
-        
         try:
-            # Crear archivo .txt temporal
-            new_path = sua_path[:-4] + '.txt'
-            with open(sua_path, 'rb') as src, open(new_path, 'wb') as dst:
-                dst.write(src.read())
-            
-            # Leer contenido del archivo
-            with open(new_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            valor = f"03{content[2:5]}"
-            
-            # Extraer datos para el nombre del archivo (usar el primer archivo)
-            if primer_mes is None:
-                primer_mes = content[30:32]
-                primer_año = content[26:30]
-                crear_hoja_bimestral = (int(primer_mes) % 2 == 0)
-            
-            # Procesar registros SUA_MENSUAL
-            registros_archivo = []
-            start = 0
-            while True:
-                start = content.find(valor, start)
-                if start == -1:
-                    break
-                
-                if start + 295 > len(content):
-                    break
-                
-                try:
-                    # [Mismo código de extracción que en estructurar_1sua_destino]
-                    rp = content[start+2:start+13].strip()
-                    nss = content[start+33:start+44].strip()
-                    nombre = content[start+95:start+145].strip()
-                    dias = int(content[start+154:start+156].strip()) if content[start+154:start+156].strip() else 0
-                    
-                    # Solo procesar si tiene días
-                    if dias > 0:
-                        sdi = float(content[start+145:start+152].strip()) / 100 if content[start+145:start+152].strip() else 0
-                        rfc = content[start+44:start+57].strip()
-                        curp = content[start+57:start+75].strip()
-                        n_credito = content[start+75:start+85].strip()
-                        if not n_credito:
-                            n_credito = None
-                        movimientos = content[start+93:start+95].strip()
-                        incapacidad = int(content[start+156:start+158].strip()) if content[start+156:start+158].strip() else 0
-                        ausentismo = int(content[start+158:start+160].strip()) if content[start+158:start+160].strip() else 0
-                        cf = float(content[start+160:start+167].strip()) / 100 if content[start+160:start+167].strip() else 0
-                        exc_pat = float(content[start+167:start+174].strip()) / 100 if content[start+167:start+174].strip() else 0
-                        exc_obr = decode_base62(content[start+278:start+281]) / 100 if content[start+278:start+281].strip() else 0
-                        pd_pat = float(content[start+174:start+181].strip()) / 100 if content[start+174:start+181].strip() else 0
-                        pd_obr = decode_base62(content[start+281:start+284]) / 100 if content[start+281:start+284].strip() else 0
-                        gmp_pat = float(content[start+181:start+188].strip()) / 100 if content[start+181:start+188].strip() else 0
-                        gmp_obr = decode_base62(content[start+284:start+287]) / 100 if content[start+284:start+287].strip() else 0
-                        rt = float(content[start+188:start+195].strip()) / 100 if content[start+188:start+195].strip() else 0
-                        iv_pat = float(content[start+195:start+202].strip()) / 100 if content[start+195:start+202].strip() else 0
-                        iv_obr = decode_base62(content[start+287:start+290]) / 100 if content[start+287:start+290].strip() else 0
-                        gps = float(content[start+202:start+209].strip()) / 100 if content[start+202:start+209].strip() else 0
-                        
-                        total = cf + exc_pat + exc_obr + pd_pat + pd_obr + gmp_pat + gmp_obr + rt + iv_pat + iv_obr + gps
-                        
-                        registro = {
-                            'RP': rp,
-                            'NSS': nss,
-                            'NOMBRE ASEGURADO': nombre,
-                            'DIAS': dias,
-                            'SDI': sdi,
-                            'RFC': rfc,
-                            'CURP': curp,
-                            'N_CREDITO': n_credito,
-                            'MOVIMIENTOS': movimientos,
-                            'INCAPACIDAD': incapacidad,
-                            'AUSENTISMO': ausentismo,
-                            'CF': cf,
-                            'EXC_PAT': exc_pat,
-                            'EXC_OBR': exc_obr,
-                            'PD_PAT': pd_pat,
-                            'PD_OBR': pd_obr,
-                            'GMP_PAT': gmp_pat,
-                            'GMP_OBR': gmp_obr,
-                            'RT': rt,
-                            'IV_PAT': iv_pat,
-                            'IV_OBR': iv_obr,
-                            'GPS': gps,
-                            'TOTAL': total
-                        }
-                        
-                        registros_archivo.append(registro)
-                        
-                except (ValueError, IndexError) as e:
-                    print(f"Error procesando registro en {sua_file}, posición {start}: {e}")
-                    continue
-                
-                start += 295
-            
-            # Agregar registros del archivo actual a la lista total
-            todos_registros.extend(registros_archivo)
+            primer_mes, primer_año, _ = leer_encabezado_sua(sua_path)
+            crear_hoja_bimestral = (int(primer_mes) % 2 == 0)
+            break
+        except Exception:
+            primer_mes = None
+            primer_año = None
+    
+    # Procesar cada archivo .SUA, en paralelo si hay varios procesos disponibles
+    if procesos is None:
+        procesos = min(os.cpu_count() or 1, len(sua_files_paths) // ARCHIVOS_POR_PROCESO)
+    procesos = max(1, min(procesos, len(sua_files_paths)))
+    
+    if procesos > 1:
+        print(f"Procesando archivos con {procesos} procesos en paralelo...")
+        executor = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+        resultados = executor.map(procesar_archivo_sua, sua_files_paths, repeat(crear_hoja_bimestral))
+    else:
+        executor = None
+        resultados = map(procesar_archivo_sua, sua_files_paths, repeat(crear_hoja_bimestral))
+    
+    # El registro del historial se lee una vez y se guarda al final
+    ingeridos = leer_ingeridos() if historial else None
+    agregados = 0
+    
+    try:
+        for sua_path, (registros_archivo, registros_suab_archivo, mensajes) in zip(sua_files_paths, resultados):
+            print(f"Procesando archivo: {os.path.basename(sua_path)}")
+            print(mensajes, end='')
             
-            # Procesar registros SUA_BIMESTRAL si es necesario
+            if registros_archivo is None:
+                continue
+            todos_registros.append(registros_archivo)
             if crear_hoja_bimestral:
-                registros_suab_archivo = []
-                start = 0
-                while True:
-                    start = content.find(valor, start)
-                    if start == -1:
-                        break
-                    
-                    if start + 295 > len(content):
-                        break
-                    
-                    try:
-                        dias = int(content[start+154:start+156].strip()) if content[start+154:start+156].strip() else 0
-                        
-                        if dias > 0:
-                            rp = content[start+2:start+13].strip()
-                            nss = content[start+33:start+44].strip()
-                            nombre = content[start+95:start+145].strip()
-                            sdi = float(content[start+145:start+152].strip()) / 100 if content[start+145:start+152].strip() else 0
-                            n_credito = content[start+75:start+85].strip()
-                            if not n_credito:
-                                n_credito = None
-                            
-                            retiro = float(content[start+209:start+216].strip()) / 100 if content[start+209:start+216].strip() else 0
-                            ceav_pat = float(content[start+216:start+223].strip()) / 100 if content[start+216:start+223].strip() else 0
-                            ceav_obr = float(content[start+223:start+230].strip()) / 100 if content[start+223:start+230].strip() else 0
-                            aportacion_pat = float(content[start+237:start+244].strip()) / 100 if content[start+237:start+244].strip() else 0
-                            amortizacion = float(content[start+244:start+251].strip()) / 100 if content[start+244:start+251].strip() else 0
-                            
-                            registro_suab = {
-                                'RP': rp,
-                                'NSS': nss,
-                                'NOMBRE ASEGURADO': nombre,
-                                'DIAS': dias,
-                                'SDI': sdi,
-                                'N_CREDITO': n_credito,
-                                'RETIRO': retiro,
-                                'CEAV_PAT': ceav_pat,
-                                'CEAV_OBR': ceav_obr,
-                                'APORTACION_PAT': aportacion_pat,
-                                'AMORTIZACION': amortizacion,
-                                'TOTAL': retiro + ceav_pat + ceav_obr + aportacion_pat + amortizacion
-                            }
-                            
-                            registros_suab_archivo.append(registro_suab)
-                            
-                    except (ValueError, IndexError) as e:
-                        print(f"Error procesando registro SUA_BIMESTRAL en {sua_file}, posición {start}: {e}")
-                        continue
-                    
-                    start += 295
-                
-                todos_registros_suab.extend(registros_suab_archivo)
-                print(f"Procesado {sua_file}: {len(registros_suab_archivo)} registros SUA_BIMESTRAL")
-            
-            print(f"Procesado {sua_file}: {len(registros_archivo)} registros SUA_MENSUAL")
+                todos_registros_suab.append(registros_suab_archivo)
             
-            # Limpiar archivo temporal
-            try:
-                os.remove(new_path)
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"Error procesando archivo {sua_file}: {e}")
-            continue
+            if historial and not registros_archivo.is_empty():
+                agregados += agregar_sua_al_historial(sua_path, registros_archivo, registros_suab_archivo,
+                                                      ingeridos=ingeridos)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if agregados:
+            guardar_ingeridos(ingeridos)
+    
+    # Unir los registros de todos los archivos
+    todos_registros = pl.concat(todos_registros) if todos_registros else pl.DataFrame()
+    todos_registros_suab = pl.concat(todos_registros_suab) if todos_registros_suab else pl.DataFrame()
     
     # Verificar que se encontraron registros
-    if not todos_registros:
+    if todos_registros.is_empty():
         print("No se encontraron registros válidos en ningún archivo.")
         return None
     
     # Filtrar registros para eliminar aquellos con DIAS = 0
-    registros_filtrados = [registro for registro in todos_registros if registro['DIAS'] != 0]
+    registros_filtrados = todos_registros.filter(pl.col('DIAS') != 0)
     print(f"Total registros antes del filtro: {len(todos_registros)}")
     print(f"Total registros después del filtro (eliminando DIAS = 0): {len(registros_filtrados)}")
     
-    if not registros_filtrados:
+    if registros_filtrados.is_empty():
         print("No quedan registros después de filtrar aquellos con DIAS = 0.")
         return None
     
-    # Usar carpeta de destino si se especifica, sino usar folder_path
+    hojas = {'SUA_MENSUAL': preparar_hoja_sua(registros_filtrados)}
+    
+    # Crear hoja SUA_BIMESTRAL si es necesario
+    if crear_hoja_bimestral and not todos_registros_suab.is_empty():
+        registros_suab_filtrados = todos_registros_suab.filter(pl.col('DIAS') != 0)
+        print(f"Total registros SUA_BIMESTRAL antes del filtro: {len(todos_registros_suab)}")
+        print(f"Total registros SUA_BIMESTRAL después del filtro: {len(registros_suab_filtrados)}")
+        
+        if not registros_suab_filtrados.is_empty():
+            hojas['SUA_BIMESTRAL'] = preparar_hoja_sua(registros_suab_filtrados)
+            print("Hoja SUA_BIMESTRAL creada")
+        else:
+            print("No hay registros SUA_BIMESTRAL válidos para crear la hoja")
+    elif crear_hoja_bimestral:
+        print("No se pudieron procesar registros SUA_BIMESTRAL")
+    
+    return {
+        'mes': primer_mes,
+        'año': primer_año,
+        'nombre': f"{primer_mes}-{primer_año}_MULTI_CEDULA",
+        'archivos': sua_files_paths,
+        'hojas': hojas
+    }
+
+
+def estructurar_varios_suas(folder_path, output_folder=None, procesos=None, formato=FORMATO_EXCEL, historial=False):
+    """
+    Función modificada para procesar múltiples archivos .SUA en una carpeta y combinarlos 
+    en un solo archivo Excel con hojas SUA_MENSUAL y SUA_BIMESTRAL (si aplica).
+    
+    Args:
+        folder_path (str): Ruta de la carpeta que contiene los archivos .SUA (también se
+            buscan dentro de los .zip; puede ser un .zip)
+        output_folder (str): Carpeta donde guardar el resultado. Si es None, usa folder_path.
+        procesos (int): Número de procesos para leer los archivos en paralelo. Si es None,
+                        usa hasta un proceso por núcleo, uno por cada ARCHIVOS_POR_PROCESO
+                        archivos; con 1 se procesan uno tras otro.
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+        historial (bool): Si se agrega cada archivo al historial de SUA (los que no estaban ya)
+    
+    Returns:
+        str: Ruta del archivo Excel creado (o del primer archivo Parquet/Arrow si no se pidió Excel),
+             o None si ocurre un error
+    """
+    estructurado = estructurar_suas(folder_path, procesos=procesos, historial=historial)
+    if estructurado is None:
+        return None
+    
+    # Usar carpeta de destino si se especifica, sino usar folder_path (o la carpeta del .zip)
     if output_folder:
         base_path = output_folder
     else:
-        base_path = folder_path
-    
-    # Generar nombre del archivo
-    nombre_personalizado = f"{primer_mes}-{primer_año}_MULTI_CEDULA"
-    excel_path = os.path.join(base_path, f"{nombre_personalizado}.xlsx")
-    
-    # Crear el directorio si no existe
-    os.makedirs(base_path, exist_ok=True)
+        base_path = carpeta_real(folder_path)
     
     try:
-        # Crear DataFrame principal
-        df = pd.DataFrame(registros_filtrados)
-        
-        # Eliminar filas completamente duplicadas
-        df = df.drop_duplicates()
-        
-        # Rellenar valores nulos de N_CREDITO con "-"
-        if 'N_CREDITO' in df.columns:
-            df['N_CREDITO'] = df['N_CREDITO'].fillna('-').replace('', '-')
-        
-        # Ordenar por RP y después por NOMBRE ASEGURADO
-        df = df.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-        
-        # Guardar el archivo Excel
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='SUA_MENSUAL')
-            
-            # Crear hoja SUA_BIMESTRAL si es necesario
-            if crear_hoja_bimestral and todos_registros_suab:
-                registros_suab_filtrados = [registro for registro in todos_registros_suab if registro['DIAS'] != 0]
-                print(f"Total registros SUA_BIMESTRAL antes del filtro: {len(todos_registros_suab)}")
-                print(f"Total registros SUA_BIMESTRAL después del filtro: {len(registros_suab_filtrados)}")
-                
-                if registros_suab_filtrados:
-                    df_suab = pd.DataFrame(registros_suab_filtrados)
-                    
-                    # Eliminar filas completamente duplicadas
-                    df_suab = df_suab.drop_duplicates()
-                    
-                    # Rellenar valores nulos de N_CREDITO con "-"
-                    if 'N_CREDITO' in df_suab.columns:
-                        df_suab['N_CREDITO'] = df_suab['N_CREDITO'].fillna('-').replace('', '-')
-                    
-                    # Ordenar por RP y después por NOMBRE ASEGURADO
-                    df_suab = df_suab.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
-                    df_suab.to_excel(writer, index=False, sheet_name='SUA_BIMESTRAL')
-                    print("Hoja SUA_BIMESTRAL creada")
-                else:
-                    print("No hay registros SUA_BIMESTRAL válidos para crear la hoja")
-            elif crear_hoja_bimestral:
-                print("No se pudieron procesar registros SUA_BIMESTRAL")
-        
-        # Aplicar formato usando openpyxl
-        workbook = load_workbook(excel_path)
-        
-        # Formatear hoja SUA_MENSUAL
-        worksheet_suam = workbook['SUA_MENSUAL']
-        header_fill_suam = PatternFill(start_color='611232', end_color='611232', fill_type='solid')
-        header_font_suam = Font(color='B3945A', bold=True)
-        
-        for cell in worksheet_suam[1]:
-            cell.fill = header_fill_suam
-            cell.font = header_font_suam
-        
-        # Ajustar ancho de columnas SUA_MENSUAL
-        for column in worksheet_suam.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet_suam.column_dimensions[column_letter].width = adjusted_width
-        
-        # Formatear hoja SUA_BIMESTRAL si existe
-        if crear_hoja_bimestral and 'SUA_BIMESTRAL' in workbook.sheetnames:
-            worksheet_suab = workbook['SUA_BIMESTRAL']
-            header_fill_suab = PatternFill(start_color='611232', end_color='611232', fill_type='solid')
-            header_font_suab = Font(color='B3945A', bold=True)
-            
-            for cell in worksheet_suab[1]:
-                cell.fill = header_fill_suab
-                cell.font = header_font_suab
-            
-            # Ajustar ancho de columnas para SUA_BIMESTRAL
-            for column in worksheet_suab.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet_suab.column_dimensions[column_letter].width = adjusted_width
-            
-            print("Formato SUA_BIMESTRAL aplicado: fondo #611232, fuente #B3945A")
-        
-        # Guardar cambios
-        workbook.save(excel_path)
-        workbook.close()
+        rutas = guardar_en_formatos(estructurado, base_path, formato, guardar_sua_excel)
+        excel_path = rutas[0]
         
         print(f"\n=== RESUMEN ===")
-        print(f"Archivo Excel creado exitosamente: {excel_path}")
-        print(f"Archivos .SUA procesados: {len(sua_files_paths)}")
-        print(f"Total registros válidos procesados: {len(registros_filtrados)}")
-        print("Formato aplicado: fondo #611232, fuente #B3945A")
-        if crear_hoja_bimestral:
-            if 'SUA_BIMESTRAL' in workbook.sheetnames:
+        if excel_path.endswith('.xlsx'):
+            print(f"Archivo Excel creado exitosamente: {excel_path}")
+        print(f"Archivos .SUA procesados: {len(estructurado['archivos'])}")
+        print(f"Total registros válidos procesados: {len(estructurado['hojas']['SUA_MENSUAL'])}")
+        if excel_path.endswith('.xlsx'):
+            print("Formato aplicado: fondo #611232, fuente #B3945A")
+        if estructurado['mes'] is not None and int(estructurado['mes']) % 2 == 0:
+            if 'SUA_BIMESTRAL' in estructurado['hojas']:
                 print("Hoja SUA_BIMESTRAL incluida (mes par detectado)")
             else:
                 print("Mes par detectado pero no se creó hoja SUA_BIMESTRAL")
@@ -1,164 +1,277 @@
 import os
+import io
+import contextlib
+import numpy as np
 import pandas as pd
+import polars as pl
 from datetime import datetime
-import glob
+from openpyxl.styles import PatternFill, Font
+from cache_estructurados import clave_archivo, leer_cache, guardar_cache
+from buscar_archivos import buscar_archivos
+from archivos_zip import abrir_archivo, carpeta_real
+from salida_excel import guardar_hojas_excel
+from salida_formatos import FORMATO_EXCEL, guardar_en_formatos, a_polars
+from esquemas import aplicar_esquema
 
-def estructurar_visor(visor_path):
+
+# Diseño de registro de cada archivo del visor: (columna, inicio, fin, tipo de campo).
+# Tipos: 'texto' (sin espacios), 'nombre' (texto con '$' como espacio), 'entero',
+# 'centavos' (entero con signo dividido entre 100), 'decimal' (número con punto) y
+# 'tipo_credito' (clave 0-3 del tipo de descuento INFONAVIT).
+# 'longitud_minima' descarta las líneas más cortas, medidas sin espacios a los lados salvo
+# en CDEMAS99, donde se mide la línea completa. 'totales' se calculan al final, en orden.
+DISEÑOS_VISOR = {
+    'cdemmo99': {
+        'longitud_minima': 142,
+        'medir_sin_espacios': True,
+        'campos': [
+            ('RP', 0, 11, 'texto'),
+            ('NSS', 23, 34, 'texto'),
+            ('TIP_MOV', 35, 36, 'entero'),
+            ('FECHA_MOV', 36, 46, 'texto'),
+            ('DIAS', 46, 48, 'entero'),
+            ('SDI', 48, 54, 'centavos'),
+            ('CF', 56, 62, 'centavos'),
+            ('EXC_PAT', 64, 70, 'centavos'),
+            ('EXC_OBR', 72, 78, 'centavos'),
+            ('PD_PAT', 80, 86, 'centavos'),
+            ('PD_OBR', 88, 94, 'centavos'),
+            ('GMP_PAT', 96, 102, 'centavos'),
+            ('GMP_OBR', 104, 110, 'centavos'),
+            ('RT', 112, 118, 'centavos'),
+            ('IV_PAT', 120, 126, 'centavos'),
+            ('IV_OBR', 128, 134, 'centavos'),
+            ('GPS', 136, 142, 'centavos'),
+        ],
+        'totales': [
+            ('TOTAL', ['CF', 'EXC_PAT', 'EXC_OBR', 'PD_PAT', 'PD_OBR', 'GMP_PAT',
+                       'GMP_OBR', 'RT', 'IV_PAT', 'IV_OBR', 'GPS']),
+        ],
+    },
+    'cdemas99': {
+        'longitud_minima': 109,
+        'medir_sin_espacios': False,
+        'campos': [
+            ('RP', 0, 11, 'texto'),
+            ('NSS', 23, 34, 'texto'),
+            ('NOMBRE ASEGURADO', 35, 85, 'nombre'),
+            ('CURP', 88, 106, 'texto'),
+        ],
+        'totales': [],
+    },
+    'cdebmo99': {
+        'longitud_minima': 100,
+        'medir_sin_espacios': True,
+        'campos': [
+            ('RP', 0, 11, 'texto'),
+            ('NSS', 21, 32, 'texto'),
+            ('TIP_MOV', 33, 34, 'entero'),
+            ('FECHA_MOV', 34, 44, 'texto'),
+            ('DIAS', 44, 46, 'entero'),
+            ('SDI', 46, 52, 'centavos'),
+            ('RETIRO', 54, 60, 'centavos'),
+            ('CEAV_PAT', 62, 68, 'centavos'),
+            ('CEAV_OBR', 70, 76, 'centavos'),
+            ('APORTACION_PAT', 85, 92, 'decimal'),
+            ('AMORTIZACION', 92, 100, 'decimal'),
+        ],
+        'totales': [
+            ('TOTAL_RCV', ['RETIRO', 'CEAV_PAT', 'CEAV_OBR']),
+        ],
+    },
+    'cdebas99': {
+        'longitud_minima': 150,
+        'medir_sin_espacios': True,
+        'campos': [
+            ('RP', 0, 11, 'texto'),
+            ('NSS', 21, 32, 'texto'),
+            ('NOMBRE ASEGURADO', 33, 83, 'nombre'),
+            ('CURP', 86, 104, 'texto'),
+            ('T_CREDITO', 119, 120, 'tipo_credito'),
+            ('V_CREDITO', 120, 129, 'decimal'),
+            ('N_CREDITO', 109, 119, 'texto'),
+            ('APORTACION_PAT', 85, 92, 'decimal'),
+            ('AMORTIZACION', 92, 100, 'decimal'),
+        ],
+        'totales': [
+            ('TOTAL_INF', ['APORTACION_PAT', 'AMORTIZACION']),
+        ],
+    },
+}
+
+# Archivos que forman un visor de emisión
+ARCHIVOS_VISOR = ('CDEMMO99.txt', 'CDEMAS99.txt', 'CDEBMO99.txt', 'CDEBAS99.txt', 'CDEMPA99.txt')
+
+# Claves del tipo de crédito INFONAVIT en CDEBAS99
+TIPOS_CREDITO = {'0': '-', '1': '%', '2': 'CF', '3': 'VSM'}
+
+
+def _expresion_campo(inicio, fin, tipo):
+    """Expresión de polars que extrae un campo de la columna 'linea' según su tipo"""
+    texto = pl.col('linea').str.slice(inicio, fin - inicio).str.strip_chars()
+    
+    if tipo == 'texto':
+        return texto
+    if tipo == 'nombre':
+        return texto.str.replace_all('$', ' ', literal=True)
+    if tipo == 'tipo_credito':
+        return texto.replace(TIPOS_CREDITO)
+    if tipo == 'entero':
+        return pl.when(texto.str.contains(r'^[0-9]+$')).then(texto.cast(pl.Int64, strict=False)).otherwise(0)
+    
+    # Números: válidos si sin signos (y sin punto en 'decimal') solo quedan dígitos
+    caracteres_ignorados = '[-.]' if tipo == 'decimal' else '-'
+    valido = texto.str.replace_all(caracteres_ignorados, '').str.contains(r'^[0-9]+$')
+    if tipo == 'centavos':
+        # La división se hace en decimal para obtener el mismo float que float(texto) / 100
+        numero = (texto.cast(pl.Decimal(20, 2), strict=False) / 100).cast(pl.Float64)
+    else:
+        numero = texto.cast(pl.Float64, strict=False)
+    return pl.when(valido).then(numero).otherwise(0.0).fill_null(0.0)
+
+
+def leer_archivo_visor(archivo_path, tipo):
     """
-    Procesa archivos CDEMMO99.txt y CDEBMO99.txt con sus respectivos archivos complementarios
-    para generar un archivo Excel con las hojas EMA y EBA.
+    Lee un archivo de texto del visor de emisión (CDEMMO99, CDEMAS99, CDEBMO99 o CDEBAS99)
+    de forma columnar: todas las líneas se cortan a la vez según su diseño de registro
+    (DISEÑOS_VISOR), sin armar un diccionario por línea.
     
     Args:
-        visor_path (str): Ruta de la carpeta donde buscar los archivos
+        archivo_path (str): Ruta del archivo (en disco o dentro de un .zip)
+        tipo (str): 'cdemmo99', 'cdemas99', 'cdebmo99' o 'cdebas99'
     
     Returns:
-        str: Ruta del archivo Excel generado
+        pd.DataFrame: Un registro por línea válida (vacío si hubo un error)
     """
+    diseño = DISEÑOS_VISOR[tipo]
+    try:
+        with abrir_archivo(archivo_path, 'r', encoding='UTF-8') as file:
+            lineas = pl.DataFrame({'linea': file.read().split('\n')})
+        
+        longitud = pl.col('linea')
+        if diseño['medir_sin_espacios']:
+            longitud = longitud.str.strip_chars()
+        lineas = lineas.filter(longitud.str.len_chars() >= diseño['longitud_minima'])
+        
+        datos = lineas.select([
+            _expresion_campo(inicio, fin, tipo_campo).alias(columna)
+            for columna, inicio, fin, tipo_campo in diseño['campos']
+        ])
+        for columna, sumandos in diseño['totales']:
+            total = pl.col(sumandos[0])
+            for sumando in sumandos[1:]:
+                total = total + pl.col(sumando)
+            datos = datos.with_columns(total.alias(columna))
+        
+        return datos.to_pandas()
+    except Exception as e:
+        print(f"Error procesando {archivo_path}: {e}")
+        return pd.DataFrame()
+
+
+def buscar_archivos_visor(directorio, max_depth=5):
+    """
+    Busca los archivos del visor (ARCHIVOS_VISOR) hasta una profundidad máxima en un solo
+    recorrido, nivel por nivel, en el mismo orden en que los devolvería glob. Los .zip se
+    revisan como carpetas, así que las descargas del IDSE se leen sin descomprimirlas.
     
-    def buscar_archivos(directorio, patron, max_depth=5):
-        """Busca archivos con patrón específico hasta una profundidad máxima"""
-        archivos = []
-        for nivel in range(max_depth + 1):
-            patron_busqueda = os.path.join(directorio, *(['*'] * nivel), patron)
-            archivos.extend(glob.glob(patron_busqueda))
-        return archivos
-    
-    def procesar_cdemmo99(archivo_path):
-        """Procesa un archivo CDEMMO99.txt"""
-        datos = []
-        try:
-            with open(archivo_path, 'r', encoding='UTF-8') as file:
-                for linea in file:
-                    if len(linea.strip()) >= 142:
-                        registro = {
-                            'RP': linea[0:11].strip(),
-                            'NSS': linea[23:34].strip(),
-                            'TIP_MOV': int(linea[35:36]) if linea[35:36].isdigit() else 0,
-                            'FECHA_MOV': linea[36:46].strip(),
-                            'DIAS': int(linea[46:48]) if linea[46:48].strip().isdigit() else 0,
-                            'SDI': float(linea[48:54]) / 100 if linea[48:54].strip().replace('-', '').isdigit() else 0.0,
-                            'CF': float(linea[56:62]) / 100 if linea[56:62].strip().replace('-', '').isdigit() else 0.0,
-                            'EXC_PAT': float(linea[64:70]) / 100 if linea[64:70].strip().replace('-', '').isdigit() else 0.0,
-                            'EXC_OBR': float(linea[72:78]) / 100 if linea[72:78].strip().replace('-', '').isdigit() else 0.0,
-                            'PD_PAT': float(linea[80:86]) / 100 if linea[80:86].strip().replace('-', '').isdigit() else 0.0,
-                            'PD_OBR': float(linea[88:94]) / 100 if linea[88:94].strip().replace('-', '').isdigit() else 0.0,
-                            'GMP_PAT': float(linea[96:102]) / 100 if linea[96:102].strip().replace('-', '').isdigit() else 0.0,
-                            'GMP_OBR': float(linea[104:110]) / 100 if linea[104:110].strip().replace('-', '').isdigit() else 0.0,
-                            'RT': float(linea[112:118]) / 100 if linea[112:118].strip().replace('-', '').isdigit() else 0.0,
-                            'IV_PAT': float(linea[120:126]) / 100 if linea[120:126].strip().replace('-', '').isdigit() else 0.0,
-                            'IV_OBR': float(linea[128:134]) / 100 if linea[128:134].strip().replace('-', '').isdigit() else 0.0,
-                            'GPS': float(linea[136:142]) / 100 if linea[136:142].strip().replace('-', '').isdigit() else 0.0
-                        }
-                        # Calcular TOTAL
-                        registro['TOTAL'] = (registro['CF'] + registro['EXC_PAT'] + registro['EXC_OBR'] + 
-                                           registro['PD_PAT'] + registro['PD_OBR'] + registro['GMP_PAT'] + 
-                                           registro['GMP_OBR'] + registro['RT'] + registro['IV_PAT'] + 
-                                           registro['IV_OBR'] + registro['GPS'])
-                        datos.append(registro)
-        except Exception as e:
-            print(f"Error procesando {archivo_path}: {e}")
-        return datos
+    Args:
+        directorio (str): Carpeta del visor o archivo .zip
+        max_depth (int): Niveles de subcarpetas a revisar
     
-    def procesar_cdemas99(archivo_path):
-        """Procesa un archivo CDEMAS99.txt"""
-        datos = []
-        try:
-            with open(archivo_path, 'r', encoding='UTF-8') as file:
-                for linea in file:
-                    # Usar longitud real conservando espacios, solo quitando \n si existe
-                    linea_sin_salto = linea[:-1] if linea.endswith('\n') else linea
-                    if len(linea_sin_salto) >= 109:
-                        registro = {
-                            'RP': linea[0:11].strip(),
-                            'NSS': linea[23:34].strip(),  # 11 caracteres a partir del carácter 24
-                            'NOMBRE ASEGURADO': linea[35:85].strip().replace('$', ' '),  # 50 caracteres corregido
-                            'CURP': linea[88:106].strip()  # 18 caracteres a partir del carácter 89
-                        }
-                        datos.append(registro)
-                            
-        except Exception as e:
-            print(f"Error procesando {archivo_path}: {e}")
-        
-        return datos
+    Returns:
+        dict: Carpeta -> {nombre del archivo (como en ARCHIVOS_VISOR): ruta}, solo carpetas con
+            archivos del visor
+    """
+    # Los nombres se comparan sin distinguir mayúsculas (como glob en Windows) y se
+    # guardan como en ARCHIVOS_VISOR
+    nombres_visor = {nombre.lower(): nombre for nombre in ARCHIVOS_VISOR}
+    carpetas = {}
+    for archivo in buscar_archivos(directorio, nombres=ARCHIVOS_VISOR, max_nivel=max_depth,
+                                   por_nivel=True, en_zip=True):
+        nombre = nombres_visor[archivo.nombre.lower()]
+        carpetas.setdefault(archivo.carpeta, {}).setdefault(nombre, archivo.ruta)
+    return carpetas
+
+
+def indice_complemento(df_complemento, columnas):
+    """
+    Índice de los archivos complementarios (CDEMAS99/CDEBAS99) con una sola fila por carpeta,
+    registro patronal y NSS, para unir cada archivo de movimientos con el complemento de su
+    propia carpeta sin multiplicar filas.
     
-    def procesar_cdebmo99(archivo_path):
-        """Procesa un archivo CDEBMO99.txt"""
-        datos = []
-        try:
-            with open(archivo_path, 'r', encoding='UTF-8') as file:
-                for linea in file:
-                    if len(linea.strip()) >= 100:
-                        registro = {
-                            'RP': linea[0:11].strip(),
-                            'NSS': linea[21:32].strip(),
-                            'TIP_MOV': int(linea[33:34]) if linea[33:34].isdigit() else 0,
-                            'FECHA_MOV': linea[34:44].strip(),
-                            'DIAS': int(linea[44:46]) if linea[44:46].strip().isdigit() else 0,
-                            'SDI': float(linea[46:52]) / 100 if linea[46:52].strip().replace('-', '').isdigit() else 0.0,
-                            'RETIRO': float(linea[54:60]) / 100 if linea[54:60].strip().replace('-', '').isdigit() else 0.0,
-                            'CEAV_PAT': float(linea[62:68]) / 100 if linea[62:68].strip().replace('-', '').isdigit() else 0.0,
-                            'CEAV_OBR': float(linea[70:76]) / 100 if linea[70:76].strip().replace('-', '').isdigit() else 0.0,
-                            'APORTACION_PAT': float(linea[85:92]) if linea[85:92].strip().replace('.', '').replace('-', '').isdigit() else 0.0,
-                            'AMORTIZACION': float(linea[92:100]) if linea[92:100].strip().replace('.', '').replace('-', '').isdigit() else 0.0
-                        }
-                        # Calcular TOTAL_RCV
-                        registro['TOTAL_RCV'] = registro['RETIRO'] + registro['CEAV_PAT'] + registro['CEAV_OBR']
-                        datos.append(registro)
-        except Exception as e:
-            print(f"Error procesando {archivo_path}: {e}")
-        return datos
+    Args:
+        df_complemento (pd.DataFrame): Registros de todos los archivos complementarios,
+            con la columna CARPETA
+        columnas (list): Columnas del complemento que se agregan a los movimientos
     
-    def procesar_cdebas99(archivo_path):
-        """Procesa un archivo CDEBAS99.txt"""
-        datos = []
-        try:
-            with open(archivo_path, 'r', encoding='UTF-8') as file:
-                for linea in file:
-                    if len(linea.strip()) >= 150:
-                        t_credito = linea[119:120].strip()
-                        # Mapear T_CREDITO según especificaciones
-                        if t_credito == '0':
-                            t_credito = '-'
-                        elif t_credito == '1':
-                            t_credito = '%'
-                        elif t_credito == '2':
-                            t_credito = 'CF'
-                        elif t_credito == '3':
-                            t_credito = 'VSM'
-                        
-                        registro = {
-                            'RP': linea[0:11].strip(),
-                            'NSS': linea[21:32].strip(),
-                            'NOMBRE ASEGURADO': linea[33:83].strip().replace('$', ' '),
-                            'CURP': linea[86:104].strip(),
-                            'T_CREDITO': t_credito,
-                            'V_CREDITO': float(linea[120:129]) if linea[120:129].strip().replace('.', '').replace('-', '').isdigit() else 0.0,
-                            'N_CREDITO': linea[109:119].strip(),
-                            'APORTACION_PAT': float(linea[85:92]) if linea[85:92].strip().replace('.', '').replace('-', '').isdigit() else 0.0,
-                            'AMORTIZACION': float(linea[92:100]) if linea[92:100].strip().replace('.', '').replace('-', '').isdigit() else 0.0
-                        }
-                        # Calcular TOTAL_INF como suma de APORTACION_PAT + AMORTIZACION
-                        registro['TOTAL_INF'] = registro['APORTACION_PAT'] + registro['AMORTIZACION']
-                        datos.append(registro)
-        except Exception as e:
-            print(f"Error procesando {archivo_path}: {e}")
-        return datos
+    Returns:
+        pd.DataFrame: Columnas pedidas, indexadas por (CARPETA, RP, NSS); se conserva la
+            primera aparición
+    """
+    return (df_complemento.drop_duplicates(subset=['CARPETA', 'RP', 'NSS'])
+            .set_index(['CARPETA', 'RP', 'NSS'])[columnas])
+
+
+def orden_fecha_reciente(fechas):
+    """
+    Posición de cada movimiento al ordenarlos por fecha, de modo que el máximo de cada grupo
+    (idxmax en el mismo groupby) sea su movimiento más reciente: el primero con la fecha más
+    alta o, si el grupo no tiene fechas válidas, el último.
+    
+    Args:
+        fechas (pd.Series): FECHA_MOV ya convertida a datetime (NaT si no es válida)
+    
+    Returns:
+        np.ndarray: Posición de cada fila en el orden por fecha
+    """
+    valida = fechas.notna().to_numpy()
+    posicion = np.arange(len(fechas))
+    # Con la misma fecha gana la primera fila; entre fechas no válidas, la última
+    desempate = np.where(valida, -posicion, posicion)
+    orden = np.lexsort((desempate, fechas.to_numpy(dtype='datetime64[ns]').view('int64'), valida))
+    
+    orden_fecha = np.empty(len(fechas), dtype=np.int64)
+    orden_fecha[orden] = posicion
+    return orden_fecha
+
+
+def estructurar_visor_datos(visor_path):
+    """
+    Procesa archivos CDEMMO99.txt y CDEBMO99.txt con sus respectivos archivos complementarios
+    y regresa en memoria las hojas EMA y EBA, sin escribir ningún archivo.
     
-    # Buscar archivos CDEMMO99.txt y sus complementarios
-    archivos_cdemmo99 = buscar_archivos(visor_path, "CDEMMO99.txt")
-    archivos_cdemas99 = buscar_archivos(visor_path, "CDEMAS99.txt")
+    Args:
+        visor_path (str): Ruta de la carpeta (o .zip, o carpeta con .zip) donde buscar los archivos
+    
+    Returns:
+        dict: 'mes', 'año' (None si no hay CDEMPA99.txt), 'nombre' (para el archivo),
+              'archivos' y 'hojas' (nombre de hoja -> pl.DataFrame con los tipos de esquemas),
+              o None si no hay datos
+    """
+    
+    # Buscar todos los archivos del visor en un solo recorrido, agrupados por carpeta
+    carpetas_visor = buscar_archivos_visor(visor_path)
+    
+    def archivos_de(nombre):
+        """Rutas del archivo con ese nombre en cada carpeta que lo contiene"""
+        return [archivos[nombre] for archivos in carpetas_visor.values() if nombre in archivos]
+    
+    # Archivos CDEMMO99.txt y sus complementarios
+    archivos_cdemmo99 = archivos_de("CDEMMO99.txt")
+    archivos_cdemas99 = archivos_de("CDEMAS99.txt")
     
-    # Buscar archivos CDEBMO99.txt y sus complementarios
-    archivos_cdebmo99 = buscar_archivos(visor_path, "CDEBMO99.txt")
-    archivos_cdebas99 = buscar_archivos(visor_path, "CDEBAS99.txt")
+    # Archivos CDEBMO99.txt y sus complementarios
+    archivos_cdebmo99 = archivos_de("CDEBMO99.txt")
+    archivos_cdebas99 = archivos_de("CDEBAS99.txt")
     
-    # Buscar archivo CDEMPA99.txt para obtener el periodo
-    archivos_cdempa99 = buscar_archivos(visor_path, "CDEMPA99.txt")
+    # Archivo CDEMPA99.txt para obtener el periodo
+    archivos_cdempa99 = archivos_de("CDEMPA99.txt")
     
     def obtener_periodo_archivo(archivo_path):
         """Extrae el periodo del archivo CDEMPA99.txt"""
         try:
-            with open(archivo_path, 'r', encoding='UTF-8') as file:
+            with abrir_archivo(archivo_path, 'r', encoding='UTF-8') as file:
                 primera_linea = file.readline()
                 if len(primera_linea) >= 103:  # Asegurar que tiene al menos 103 caracteres (99+4)
                     mes = primera_linea[95:97].strip()  # 2 caracteres a partir del 97 (índice 96)
@@ -169,6 +282,31 @@ def estructurar_visor(visor_path):
             print(f"Error obteniendo periodo de {archivo_path}: {e}")
         return None
     
+    def procesar_con_cache(archivo_path, tipo):
+        """Procesa un archivo de texto del visor, usando la caché en disco si no ha cambiado"""
+        clave = clave_archivo(archivo_path, tipo)
+        en_cache = leer_cache(clave)
+        if en_cache is not None:
+            tablas, _ = en_cache
+            return tablas['datos']
+        
+        mensajes = io.StringIO()
+        with contextlib.redirect_stdout(mensajes):
+            datos = leer_archivo_visor(archivo_path, tipo)
+        print(mensajes.getvalue(), end='')
+        
+        # Solo se guardan los archivos que se procesaron sin errores
+        if not mensajes.getvalue():
+            guardar_cache(clave, {'datos': datos})
+        return datos
+    
+    def procesar_archivos(archivos, tipo):
+        """Procesa y une los archivos de un mismo tipo, anotando la carpeta de cada registro"""
+        tablas = [procesar_con_cache(archivo, tipo).assign(CARPETA=os.path.dirname(archivo))
+                  for archivo in archivos]
+        tablas = [tabla for tabla in tablas if not tabla.empty]
+        return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame()
+    
     excel_sheets = {}
     
     # Procesar archivos EMA (CDEMMO99 + CDEMAS99)
@@ -176,29 +314,23 @@ def estructurar_visor(visor_path):
         print(f"Procesando {len(archivos_cdemmo99)} archivos CDEMMO99...")
         
         # Procesar todos los archivos CDEMMO99
-        datos_ema = []
-        for archivo in archivos_cdemmo99:
-            datos_ema.extend(procesar_cdemmo99(archivo))
+        df_ema = procesar_archivos(archivos_cdemmo99, 'cdemmo99')
         
-        if datos_ema:
-            df_ema = pd.DataFrame(datos_ema)
+        if not df_ema.empty:
             print(f"DataFrame EMA inicial: {len(df_ema)} registros")
             
             # Procesar archivos complementarios CDEMAS99
-            datos_complemento = []
-            for archivo in archivos_cdemas99:
-                datos_complemento.extend(procesar_cdemas99(archivo))
+            df_complemento = procesar_archivos(archivos_cdemas99, 'cdemas99')
             
-            if datos_complemento:
-                df_complemento = pd.DataFrame(datos_complemento)
+            if not df_complemento.empty:
                 print(f"DataFrame complemento CDEMAS99: {len(df_complemento)} registros")
                 print(f"Muestra de NSS en EMA: {df_ema['NSS'].head()}")
                 print(f"Muestra de NSS en complemento: {df_complemento['NSS'].head()}")
                 
-                # Hacer merge con NSS
+                # Unir con el índice (carpeta, RP, NSS) del complemento, sin multiplicar filas
                 df_ema_before_merge = len(df_ema)
-                df_ema = df_ema.merge(df_complemento[['NSS', 'NOMBRE ASEGURADO', 'CURP']], 
-                                    on='NSS', how='left')
+                indice_ema = indice_complemento(df_complemento, ['NOMBRE ASEGURADO', 'CURP'])
+                df_ema = df_ema.join(indice_ema, on=['CARPETA', 'RP', 'NSS'])
                 print(f"Merge completado: {df_ema_before_merge} -> {len(df_ema)} registros")
                 print(f"Registros con CURP no vacío: {df_ema['CURP'].notna().sum()}")
                 print(f"Registros con NOMBRE ASEGURADO no vacío: {df_ema['NOMBRE ASEGURADO'].notna().sum()}")
@@ -207,6 +339,7 @@ def estructurar_visor(visor_path):
                 # Si no hay archivos complementarios, agregar columnas vacías
                 df_ema['NOMBRE ASEGURADO'] = ''
                 df_ema['CURP'] = ''
+            df_ema = df_ema.drop(columns='CARPETA')
             
             # Eliminar filas con TIP_MOV = 2
             df_ema = df_ema[df_ema['TIP_MOV'] != 2]
@@ -217,15 +350,11 @@ def estructurar_visor(visor_path):
             # Convertir FECHA_MOV a datetime para poder ordenar
             df_ema['FECHA_MOV'] = pd.to_datetime(df_ema['FECHA_MOV'], format='%d-%m-%Y', errors='coerce')
             
-            # Agrupar por RP y NSS con manejo mejorado de SDI
-            def get_latest_value(group, value_col, date_col):
-                """Obtiene el valor más reciente basado en la fecha"""
-                if group[date_col].isna().all():
-                    return group[value_col].iloc[-1]
-                latest_idx = group[date_col].idxmax()
-                return group.loc[latest_idx, value_col]
+            # Agrupar por RP y NSS; el SDI se toma del movimiento más reciente
+            df_ema['ORDEN_FECHA'] = orden_fecha_reciente(df_ema['FECHA_MOV'])
             
             agg_functions = {
+                'ORDEN_FECHA': 'idxmax',
                 'CURP': 'first',
                 'NOMBRE ASEGURADO': 'first',
                 'DIAS': 'sum',
@@ -245,13 +374,8 @@ def estructurar_visor(visor_path):
             
             df_ema_grouped = df_ema.groupby(['RP', 'NSS']).agg(agg_functions).reset_index()
             
-            # Obtener SDI más reciente por grupo
-            sdi_latest = df_ema.groupby(['RP', 'NSS']).apply(
-                lambda x: get_latest_value(x, 'SDI', 'FECHA_MOV')
-            ).reset_index(name='SDI')
-            
-            # Merge con SDI
-            df_ema_grouped = df_ema_grouped.merge(sdi_latest, on=['RP', 'NSS'])
+            # SDI de la fila más reciente de cada grupo
+            df_ema_grouped['SDI'] = df_ema.loc[df_ema_grouped['ORDEN_FECHA'], 'SDI'].to_numpy()
             
             # Reordenar columnas
             columnas_ema = ['RP', 'NSS', 'CURP', 'NOMBRE ASEGURADO', 'DIAS', 'SDI', 'CF', 'EXC_PAT', 
@@ -262,7 +386,7 @@ def estructurar_visor(visor_path):
             # Ordenar por RP y NOMBRE ASEGURADO
             df_ema_grouped = df_ema_grouped.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
 
-            excel_sheets['EMA'] = df_ema_grouped
+            excel_sheets['EMA'] = aplicar_esquema(a_polars(df_ema_grouped))
             print(f"Hoja EMA creada con {len(df_ema_grouped)} registros")
     
     # Procesar archivos EBA (CDEBMO99 + CDEBAS99)
@@ -270,24 +394,18 @@ def estructurar_visor(visor_path):
         print(f"Procesando {len(archivos_cdebmo99)} archivos CDEBMO99...")
         
         # Procesar todos los archivos CDEBMO99
-        datos_eba = []
-        for archivo in archivos_cdebmo99:
-            datos_eba.extend(procesar_cdebmo99(archivo))
+        df_eba = procesar_archivos(archivos_cdebmo99, 'cdebmo99')
         
-        if datos_eba:
-            df_eba = pd.DataFrame(datos_eba)
+        if not df_eba.empty:
 
-            # Procesar archivos complementarios CDEBAS99                                                                                                                                                                                                                                                                                    
-            datos_complemento_eba = []                                                                                                                                                                                                                                                                                  
-            for archivo in archivos_cdebas99:                                                                                                                                                                                                                                                                                   
-                datos_complemento_eba.extend(procesar_cdebas99(archivo))
+            # Procesar archivos complementarios CDEBAS99
+            df_complemento_eba = procesar_archivos(archivos_cdebas99, 'cdebas99')
             
-            if datos_complemento_eba:
-                df_complemento_eba = pd.DataFrame(datos_complemento_eba)
-                # Hacer merge con NSS - incluir TOTAL_INF
-                df_eba = df_eba.merge(df_complemento_eba[['NSS', 'NOMBRE ASEGURADO', 'CURP', 
-                                                        'T_CREDITO', 'V_CREDITO', 'N_CREDITO']], 
-                                    on='NSS', how='left')
+            if not df_complemento_eba.empty:
+                # Unir con el índice (carpeta, RP, NSS) del complemento, sin multiplicar filas
+                indice_eba = indice_complemento(df_complemento_eba, ['NOMBRE ASEGURADO', 'CURP', 
+                                                                     'T_CREDITO', 'V_CREDITO', 'N_CREDITO'])
+                df_eba = df_eba.join(indice_eba, on=['CARPETA', 'RP', 'NSS'])
             else:
                 # Si no hay archivos complementarios, agregar columnas vacías
                 df_eba['NOMBRE ASEGURADO'] = ''
@@ -295,6 +413,7 @@ def estructurar_visor(visor_path):
                 df_eba['T_CREDITO'] = ''
                 df_eba['V_CREDITO'] = 0.0
                 df_eba['N_CREDITO'] = ''
+            df_eba = df_eba.drop(columns='CARPETA')
             
             # Eliminar filas con TIP_MOV = 2
             df_eba = df_eba[df_eba['TIP_MOV'] != 2]
@@ -316,8 +435,11 @@ def estructurar_visor(visor_path):
             # Calcular TOTAL para EBA
             df_eba['TOTAL'] = df_eba['TOTAL_RCV'] + df_eba['TOTAL_INF']
             
-            # Agrupar por RP y NSS
+            # Agrupar por RP y NSS; SDI, T_CREDITO y V_CREDITO se toman del movimiento más reciente
+            df_eba['ORDEN_FECHA'] = orden_fecha_reciente(df_eba['FECHA_MOV'])
+            
             agg_functions_eba = {
+                'ORDEN_FECHA': 'idxmax',
                 'CURP': 'first',
                 'NOMBRE ASEGURADO': 'first',
                 'DIAS': 'sum',
@@ -334,17 +456,9 @@ def estructurar_visor(visor_path):
             
             df_eba_grouped = df_eba.groupby(['RP', 'NSS']).agg(agg_functions_eba).reset_index()
             
-            # Obtener valores más recientes por grupo para SDI, T_CREDITO y V_CREDITO
-            latest_values = df_eba.groupby(['RP', 'NSS']).apply(
-                lambda x: pd.Series({
-                    'SDI': get_latest_value(x, 'SDI', 'FECHA_MOV'),
-                    'T_CREDITO': get_latest_value(x, 'T_CREDITO', 'FECHA_MOV'),
-                    'V_CREDITO': get_latest_value(x, 'V_CREDITO', 'FECHA_MOV')
-                })
-            ).reset_index()
-            
-            # Merge con valores más recientes
-            df_eba_grouped = df_eba_grouped.merge(latest_values, on=['RP', 'NSS'])
+            # SDI, T_CREDITO y V_CREDITO de la fila más reciente de cada grupo
+            for columna in ['SDI', 'T_CREDITO', 'V_CREDITO']:
+                df_eba_grouped[columna] = df_eba.loc[df_eba_grouped['ORDEN_FECHA'], columna].to_numpy()
             
             # Cambiar valores 0 por "-" en T_CREDITO, V_CREDITO y N_CREDITO
             df_eba_grouped['T_CREDITO'] = df_eba_grouped['T_CREDITO'].replace(0, '-')
@@ -360,45 +474,76 @@ def estructurar_visor(visor_path):
             # Ordenar por RP y NOMBRE ASEGURADO
             df_eba_grouped = df_eba_grouped.sort_values(['RP', 'NOMBRE ASEGURADO']).reset_index(drop=True)
 
-            excel_sheets['EBA'] = df_eba_grouped
+            excel_sheets['EBA'] = aplicar_esquema(a_polars(df_eba_grouped))
             print(f"Hoja EBA creada con {len(df_eba_grouped)} registros")
     
-    # Generar archivo Excel
-    if excel_sheets:
-        # Obtener periodo del archivo CDEMPA99.txt
-        periodo_str = None
-        if archivos_cdempa99:
-            periodo_str = obtener_periodo_archivo(archivos_cdempa99[0])
-        
-        # Formar nombre del archivo
-        if periodo_str:
-            nombre_archivo = f"{periodo_str}_VISOR_EMISION.xlsx"
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            nombre_archivo = f"reporte_visor_{timestamp}.xlsx"
-        
-        output_path = os.path.join(visor_path, nombre_archivo)
-        
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            for sheet_name, df in excel_sheets.items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Formatear encabezados (fondo negro, texto blanco)
-                workbook = writer.book
-                worksheet = writer.sheets[sheet_name]
-                
-                # Crear estilo para encabezados
-                from openpyxl.styles import PatternFill, Font
-                header_fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid")
-                header_font = Font(color="FFFFFF", bold=True)
-                
-                # Aplicar formato a la primera fila (encabezados)
-                for cell in worksheet[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-        
-        print(f"Archivo Excel generado: {output_path}")
-        return output_path
-    else:
+    if not excel_sheets:
         print("No se encontraron archivos para procesar")
-        return None
\ No newline at end of file
+        return None
+    
+    # Obtener periodo del archivo CDEMPA99.txt
+    periodo_str = None
+    if archivos_cdempa99:
+        periodo_str = obtener_periodo_archivo(archivos_cdempa99[0])
+    
+    # Formar nombre del archivo
+    if periodo_str:
+        mes, año = periodo_str.split('-')
+        nombre_archivo = f"{periodo_str}_VISOR_EMISION"
+    else:
+        mes = año = None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        nombre_archivo = f"reporte_visor_{timestamp}"
+    
+    return {
+        'mes': mes,
+        'año': año,
+        'nombre': nombre_archivo,
+        'archivos': archivos_cdemmo99 + archivos_cdebmo99,
+        'hojas': excel_sheets
+    }
+
+
+def guardar_visor_excel(estructurado, base_path):
+    """
+    Guarda las hojas del visor en Excel con encabezados de fondo negro y texto blanco.
+    
+    Args:
+        estructurado (dict): Resultado de estructurar_visor_datos
+        base_path (str): Carpeta donde guardar el archivo
+    
+    Returns:
+        str: Ruta del archivo Excel generado
+    """
+    output_path = os.path.join(base_path, f"{estructurado['nombre']}.xlsx")
+    
+    # Crear estilo para encabezados (fondo negro, texto blanco)
+    header_fill = PatternFill(start_color="000000", end_color="000000", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    
+    guardar_hojas_excel(output_path, estructurado['hojas'], header_fill, header_font, ajustar_ancho=False)
+    
+    return output_path
+
+
+def estructurar_visor(visor_path, formato=FORMATO_EXCEL):
+    """
+    Procesa archivos CDEMMO99.txt y CDEBMO99.txt con sus respectivos archivos complementarios
+    para generar un archivo Excel con las hojas EMA y EBA.
+    
+    Args:
+        visor_path (str): Ruta de la carpeta donde buscar los archivos (o de un .zip; el
+            resultado se guarda junto al .zip)
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos
+    
+    Returns:
+        str: Ruta del archivo Excel generado (o del primer archivo Parquet/Arrow si no se pidió Excel)
+    """
+    estructurado = estructurar_visor_datos(visor_path)
+    if estructurado is None:
+        return None
+    
+    output_path = guardar_en_formatos(estructurado, carpeta_real(visor_path), formato, guardar_visor_excel)[0]
+    if output_path.endswith('.xlsx'):
+        print(f"Archivo Excel generado: {output_path}")
+    return output_path
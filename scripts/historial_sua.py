@@ -0,0 +1,214 @@
+import os
+import json
+import glob
+import hashlib
+from datetime import datetime
+import pandas as pd
+import polars as pl
+from archivos_zip import abrir_archivo, estado_archivo
+from salida_formatos import contar_filas
+from esquemas import aplicar_esquema
+
+
+# Carpeta del historial de SUA estructurados (se puede cambiar con IMSS_HISTORIAL_DIR)
+CARPETA_HISTORIAL = os.environ.get('IMSS_HISTORIAL_DIR') or os.path.join(
+    os.path.expanduser('~'), 'web_app_imss', 'historial_sua'
+)
+
+# Hojas que se guardan; cada una es un conjunto Parquet particionado por periodo y registro patronal:
+# {CARPETA_HISTORIAL}/{hoja}/periodo=AAAA-MM/registro_patronal={RP}/{huella}.parquet
+HOJAS_HISTORIAL = ('SUA_MENSUAL', 'SUA_BIMESTRAL')
+
+# Tipos de las columnas de partición (texto, aunque parezcan fecha o número)
+ESQUEMA_PARTICION = {'periodo': pl.Utf8, 'registro_patronal': pl.Utf8}
+
+
+def huella_archivo(ruta):
+    """
+    Calcula la huella (SHA-1 del contenido) de un archivo .SUA; identifica el archivo
+    aunque se copie o se renombre.
+
+    Args:
+        ruta (str): Ruta del archivo (en disco o dentro de un .zip)
+
+    Returns:
+        str: Huella hexadecimal
+    """
+    sha1 = hashlib.sha1()
+    with abrir_archivo(ruta) as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(bloque)
+    return sha1.hexdigest()
+
+
+def _ruta_ingeridos():
+    return os.path.join(CARPETA_HISTORIAL, 'ingeridos.json')
+
+
+def leer_ingeridos():
+    """
+    Lee el registro de archivos ya agregados al historial. Para procesar varios archivos se
+    lee una sola vez y se pasa a esta_ingerido y guardar_en_historial, que lo actualizan en
+    memoria; al terminar se guarda con guardar_ingeridos.
+
+    Returns:
+        dict: Huella -> datos del archivo (archivo, estado, periodo, registro_patronal, registros,
+              ingresado y, si otro archivo lo reemplazó, reemplazado_por)
+    """
+    try:
+        with open(_ruta_ingeridos(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_ingeridos(ingeridos):
+    """
+    Guarda el registro de archivos agregados al historial.
+
+    Args:
+        ingeridos (dict): Registro leído con leer_ingeridos y actualizado con guardar_en_historial
+    """
+    os.makedirs(CARPETA_HISTORIAL, exist_ok=True)
+    temporal = _ruta_ingeridos() + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(ingeridos, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, _ruta_ingeridos())
+
+
+def huella_registrada(ruta, ingeridos=None):
+    """
+    Huella de un archivo ya registrado con la misma ruta, tamaño y fecha de modificación,
+    para no volver a leerlo completo con huella_archivo.
+
+    Args:
+        ruta (str): Ruta del archivo (en disco o dentro de un .zip)
+        ingeridos (dict): Registro ya leído (leer_ingeridos); si es None se lee
+
+    Returns:
+        str: Huella del archivo, o None si no está registrado o cambió
+    """
+    if ingeridos is None:
+        ingeridos = leer_ingeridos()
+    archivo = os.path.abspath(ruta)
+    estado = list(estado_archivo(ruta))
+    for huella, datos in ingeridos.items():
+        if datos['archivo'] == archivo and datos.get('estado') == estado:
+            return huella
+    return None
+
+
+def esta_ingerido(huella, ingeridos=None):
+    """Indica si el archivo con esa huella ya está en el historial (o lo reemplazó otro más reciente)"""
+    if ingeridos is None:
+        ingeridos = leer_ingeridos()
+    return huella in ingeridos
+
+
+def es_correccion(datos, sua_path, periodo, registro_patronal):
+    """
+    Indica si el archivo sua_path corrige al registrado con esos datos: mismo periodo,
+    registro patronal y nombre de archivo (el SUA corregido se vuelve a generar con el mismo
+    nombre). Un SUA complementario del mismo periodo tiene otro nombre y se conserva aparte.
+    """
+    return (datos['periodo'] == periodo and datos['registro_patronal'] == registro_patronal
+            and 'reemplazado_por' not in datos
+            and os.path.basename(datos['archivo']).lower() == os.path.basename(sua_path).lower())
+
+
+def guardar_en_historial(huella, sua_path, mes, año, registro_patronal, hojas, ingeridos=None):
+    """
+    Agrega al historial las hojas de un archivo .SUA, una partición por periodo y registro
+    patronal con un Parquet por archivo, y lo anota como ingerido. Los demás archivos de la
+    partición (p. ej. un SUA normal y su complementario) se conservan; solo si el nuevo es
+    una corrección de uno ya guardado (es_correccion) lo reemplaza. El anterior se queda en
+    el registro, marcado como reemplazado, para no volver a agregarlo.
+
+    Args:
+        huella (str): Huella del archivo (huella_archivo)
+        sua_path (str): Ruta del archivo de origen
+        mes (str): Mes del periodo (MM)
+        año (str): Año del periodo (AAAA)
+        registro_patronal (str): Registro patronal del encabezado
+        hojas (dict): 'SUA_MENSUAL' y, si existe, 'SUA_BIMESTRAL' -> DataFrame (pandas o polars)
+            o consulta de polars, que se escribe por lotes; se guardan con los tipos de esquemas
+        ingeridos (dict): Registro ya leído (leer_ingeridos); se actualiza en memoria y quien lo
+            pasa lo guarda con guardar_ingeridos. Si es None se lee y se guarda aquí.
+    """
+    periodo = f"{año}-{mes}"
+    guardar = ingeridos is None
+    if guardar:
+        ingeridos = leer_ingeridos()
+
+    for nombre_hoja, df in hojas.items():
+        carpeta = os.path.join(CARPETA_HISTORIAL, nombre_hoja, f"periodo={periodo}",
+                               f"registro_patronal={registro_patronal}")
+        os.makedirs(carpeta, exist_ok=True)
+        if isinstance(df, pd.DataFrame):
+            df = pl.from_pandas(df)
+        df = aplicar_esquema(df)
+        temporal = os.path.join(carpeta, f"{huella}.parquet.tmp")
+        if isinstance(df, pl.LazyFrame):
+            df.sink_parquet(temporal)
+        else:
+            df.write_parquet(temporal)
+        os.replace(temporal, os.path.join(carpeta, f"{huella}.parquet"))
+
+    # Quitar de la partición (en todas las hojas) los archivos que el nuevo corrige
+    reemplazados = [huella_anterior for huella_anterior, datos in ingeridos.items()
+                    if huella_anterior != huella and es_correccion(datos, sua_path, periodo, registro_patronal)]
+    for huella_anterior in reemplazados:
+        for nombre_hoja in HOJAS_HISTORIAL:
+            anterior = os.path.join(CARPETA_HISTORIAL, nombre_hoja, f"periodo={periodo}",
+                                    f"registro_patronal={registro_patronal}", f"{huella_anterior}.parquet")
+            if os.path.exists(anterior):
+                os.remove(anterior)
+
+    # El registro se actualiza al final: un archivo sin registro se vuelve a agregar la próxima vez
+    for huella_anterior in reemplazados:
+        ingeridos[huella_anterior]['reemplazado_por'] = huella
+    ingeridos[huella] = {
+        'archivo': os.path.abspath(sua_path),
+        'estado': list(estado_archivo(sua_path)),
+        'periodo': periodo,
+        'registro_patronal': registro_patronal,
+        'registros': contar_filas(hojas['SUA_MENSUAL']),
+        'ingresado': datetime.now().isoformat(timespec='seconds')
+    }
+    if guardar:
+        guardar_ingeridos(ingeridos)
+
+
+def consultar_historial(hoja='SUA_MENSUAL'):
+    """
+    Abre una hoja del historial para consultarla sin cargarla completa (p. ej. comparaciones
+    año contra año). Incluye las columnas 'periodo' (AAAA-MM) y 'registro_patronal'.
+
+    Args:
+        hoja (str): 'SUA_MENSUAL' o 'SUA_BIMESTRAL'
+
+    Returns:
+        pl.LazyFrame: Consulta sobre todos los periodos, o None si la hoja no tiene datos
+    """
+    patron = os.path.join(CARPETA_HISTORIAL, hoja, '**', '*.parquet')
+    if next(glob.iglob(patron, recursive=True), None) is None:
+        return None
+    return pl.scan_parquet(patron, hive_partitioning=True, hive_schema=ESQUEMA_PARTICION)
+
+
+def periodos_en_historial():
+    """
+    Lista los periodos y registros patronales guardados en el historial.
+
+    Returns:
+        pl.DataFrame: Columnas periodo, registro_patronal y archivos, ordenado por periodo
+    """
+    vigentes = [datos for datos in leer_ingeridos().values() if 'reemplazado_por' not in datos]
+    if not vigentes:
+        return pl.DataFrame(schema={'periodo': pl.Utf8, 'registro_patronal': pl.Utf8, 'archivos': pl.UInt32})
+    return (
+        pl.DataFrame(vigentes).select('periodo', 'registro_patronal')
+        .group_by('periodo', 'registro_patronal')
+        .agg(pl.len().alias('archivos'))
+        .sort('periodo', 'registro_patronal')
+    )
@@ -0,0 +1,207 @@
+import pandas as pd
+import polars as pl
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from esquemas import VACIOS_EXCEL
+
+
+# Ancho máximo que se le da a una columna al ajustarla a su contenido
+ANCHO_MAXIMO_COLUMNA = 50
+
+
+# Filas a partir de las cuales el ancho se estima con una muestra de la hoja
+FILAS_MUESTRA_ANCHO = 100_000
+
+# Decimales con que se miden los float (quita el ruido de sumas como 1234.5000000000002)
+DECIMALES_ANCHO = 10
+
+# Filas que se leen a la vez de una hoja dada como consulta (pl.LazyFrame)
+FILAS_LOTE = 50_000
+
+
+def columnas_hoja(df):
+    """Nombres de las columnas de una hoja (pandas, polars o consulta de polars)"""
+    if isinstance(df, pl.LazyFrame):
+        return df.collect_schema().names()
+    return list(df.columns)
+
+
+def lotes_consulta(consulta, filas=FILAS_LOTE):
+    """
+    Recorre el resultado de una consulta de polars por tramos de filas, sin cargarlo
+    completo. La consulta se ejecuta una sola vez con el motor de streaming y los tramos
+    se entregan en orden conforme se producen.
+
+    Args:
+        consulta (pl.LazyFrame): Consulta a recorrer
+        filas (int): Filas por tramo (aproximadas)
+
+    Yields:
+        pl.DataFrame: Cada tramo, en orden
+    """
+    for lote in consulta.collect_batches(chunk_size=filas, lazy=True):
+        if lote.height:
+            yield lote
+
+
+def _longitud_maxima(serie):
+    """Longitud del texto más largo de una columna, calculada de forma vectorizada"""
+    serie = serie.dropna()
+    if serie.empty:
+        return 0
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.round(DECIMALES_ANCHO)
+    return int(serie.astype(str).str.len().max())
+
+
+def _longitudes_maximas_polars(df):
+    """Longitud del texto más largo de cada columna de un DataFrame o consulta de polars, en una sola consulta"""
+    esquema = df.collect_schema()
+    if not esquema:
+        return {}
+    expresiones = []
+    for columna, tipo in esquema.items():
+        expr = pl.col(columna).fill_nan(None).round(DECIMALES_ANCHO) if tipo.is_float() else pl.col(columna)
+        expresiones.append(expr.cast(pl.Utf8).str.len_chars().max().alias(columna))
+    longitudes = df.select(expresiones)
+    if isinstance(longitudes, pl.LazyFrame):
+        longitudes = longitudes.collect()
+    return {columna: longitud or 0 for columna, longitud in longitudes.row(0, named=True).items()}
+
+
+def anchos_columnas(df, muestra=FILAS_MUESTRA_ANCHO):
+    """
+    Calcula el ancho de cada columna una sola vez a partir del DataFrame (encabezado y
+    longitud máxima de sus valores), sin recorrer las celdas de la hoja.
+
+    Args:
+        df (pd.DataFrame | pl.DataFrame | pl.LazyFrame): Datos de la hoja; una consulta se
+            mide completa, sin cargarla en memoria
+        muestra (int): Si la hoja tiene más filas, se mide sobre una muestra de ese tamaño
+            (None para medir siempre todas las filas)
+
+    Returns:
+        dict: Letra de columna -> ancho
+    """
+    es_polars = isinstance(df, (pl.DataFrame, pl.LazyFrame))
+    if muestra is not None and not isinstance(df, pl.LazyFrame) and len(df) > muestra:
+        df = df.sample(n=muestra, seed=0) if es_polars else df.sample(n=muestra, random_state=0)
+
+    if es_polars:
+        longitudes = _longitudes_maximas_polars(df)
+    else:
+        longitudes = {columna: _longitud_maxima(df[columna]) for columna in df.columns}
+
+    anchos = {}
+    for col_num, columna in enumerate(columnas_hoja(df), 1):
+        max_length = max(len(str(columna)), longitudes[columna])
+        anchos[get_column_letter(col_num)] = min(max_length + 2, ANCHO_MAXIMO_COLUMNA)
+    return anchos
+
+
+def ajustar_anchos(worksheet, df, muestra=FILAS_MUESTRA_ANCHO):
+    """
+    Asigna a la hoja los anchos calculados con anchos_columnas. En modo write_only debe
+    llamarse antes de escribir la primera fila.
+
+    Args:
+        worksheet: Hoja de openpyxl donde se escribió (o se escribirá) el DataFrame
+        df (pd.DataFrame | pl.DataFrame | pl.LazyFrame): Datos de la hoja
+        muestra (int): Filas máximas a medir (ver anchos_columnas)
+    """
+    for column_letter, ancho in anchos_columnas(df, muestra).items():
+        worksheet.column_dimensions[column_letter].width = ancho
+
+
+def filas_dataframe(df):
+    """
+    Recorre las filas del DataFrame como tuplas de valores de Python, con las celdas
+    vacías (NaN/None) como None para que queden en blanco igual que con to_excel, salvo
+    en las columnas de esquemas.VACIOS_EXCEL, que muestran su texto (p. ej. '-').
+
+    Los DataFrames de polars se leen por columnas completas desde sus buffers de Arrow
+    (sin convertirlos a pandas) y las filas se arman con zip; las consultas se recorren
+    por tramos (lotes_consulta).
+
+    Args:
+        df (pd.DataFrame | pl.DataFrame | pl.LazyFrame): Datos de la hoja
+
+    Returns:
+        iterator: Tuplas con los valores de cada fila
+    """
+    if isinstance(df, pl.LazyFrame):
+        return (fila for lote in lotes_consulta(df) for fila in filas_dataframe(lote))
+
+    if isinstance(df, pl.DataFrame):
+        columnas = df.with_columns(pl.col(pl.Float32, pl.Float64).fill_nan(None)).get_columns()
+        valores = []
+        for serie in columnas:
+            lista = serie.to_list()
+            vacio = VACIOS_EXCEL.get(serie.name)
+            if vacio is not None and serie.null_count():
+                lista = [vacio if valor is None else valor for valor in lista]
+            valores.append(lista)
+        return zip(*valores)
+
+    valores = df.astype(object).where(df.notna(), None)
+    for columna, vacio in VACIOS_EXCEL.items():
+        if columna in valores.columns:
+            valores[columna] = valores[columna].where(valores[columna].notna(), vacio)
+    return valores.itertuples(index=False, name=None)
+
+
+def escribir_hoja(worksheet, df, header_fill, header_font, header_alignment=None, ajustar_ancho=True):
+    """
+    Escribe un DataFrame en una hoja en modo write_only: anchos calculados de antemano,
+    encabezados con formato y filas agregadas completas, sin crear una celda por valor
+    ni volver a abrir el archivo para darle formato.
+
+    Args:
+        worksheet: Hoja creada con Workbook(write_only=True).create_sheet
+        df (pd.DataFrame | pl.DataFrame | pl.LazyFrame): Datos de la hoja
+        header_fill (PatternFill): Relleno de los encabezados
+        header_font (Font): Fuente de los encabezados
+        header_alignment (Alignment): Alineación de los encabezados (opcional)
+        ajustar_ancho (bool): Si se ajusta el ancho de las columnas a su contenido
+    """
+    # Los anchos deben asignarse antes de la primera fila
+    if ajustar_ancho:
+        ajustar_anchos(worksheet, df)
+
+    encabezados = []
+    for columna in columnas_hoja(df):
+        cell = WriteOnlyCell(worksheet, value=columna)
+        cell.fill = header_fill
+        cell.font = header_font
+        if header_alignment is not None:
+            cell.alignment = header_alignment
+        encabezados.append(cell)
+    worksheet.append(encabezados)
+
+    for fila in filas_dataframe(df):
+        worksheet.append(fila)
+
+
+def guardar_hojas_excel(output_path, hojas, header_fill, header_font, header_alignment=None, ajustar_ancho=True):
+    """
+    Guarda varios DataFrames en un archivo Excel, una hoja por DataFrame, en una sola pasada.
+
+    Args:
+        output_path (str): Ruta del archivo Excel
+        hojas (dict): Nombre de la hoja -> DataFrame (pandas o polars) o consulta de polars
+        header_fill (PatternFill): Relleno de los encabezados
+        header_font (Font): Fuente de los encabezados
+        header_alignment (Alignment): Alineación de los encabezados (opcional)
+        ajustar_ancho (bool): Si se ajusta el ancho de las columnas a su contenido
+
+    Returns:
+        str: Ruta del archivo Excel creado
+    """
+    workbook = Workbook(write_only=True)
+    for nombre_hoja, df in hojas.items():
+        worksheet = workbook.create_sheet(nombre_hoja)
+        escribir_hoja(worksheet, df, header_fill, header_font, header_alignment, ajustar_ancho)
+
+    workbook.save(output_path)
+    return output_path
@@ -0,0 +1,130 @@
+import os
+import pandas as pd
+import polars as pl
+
+
+# Formatos en que se pueden guardar los estructurados y la confronta
+FORMATO_EXCEL = 'xlsx'
+EXTENSIONES_COLUMNARES = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',  # Arrow IPC (Feather v2)
+}
+FORMATOS_SALIDA = (FORMATO_EXCEL,) + tuple(EXTENSIONES_COLUMNARES)
+
+
+def normalizar_formatos(formato):
+    """
+    Valida el formato de salida pedido.
+
+    Args:
+        formato (str | list): 'xlsx', 'parquet', 'arrow' o una lista de ellos para guardar
+            en varios formatos a la vez
+
+    Returns:
+        tuple: Formatos pedidos, sin repetir y en el orden recibido
+    """
+    formatos = (formato,) if isinstance(formato, str) else tuple(formato)
+    invalidos = [f for f in formatos if f not in FORMATOS_SALIDA]
+    if invalidos or not formatos:
+        raise ValueError(f"Formato de salida no válido: {formato}. Opciones: {', '.join(FORMATOS_SALIDA)}")
+    return tuple(dict.fromkeys(formatos))
+
+
+def contar_filas(df):
+    """Número de filas de una hoja (pandas, polars o consulta de polars)"""
+    if isinstance(df, pl.LazyFrame):
+        return df.select(pl.len()).collect().item()
+    return len(df)
+
+
+def _texto_celda(valor):
+    """Texto de un valor como lo muestra Excel (los números enteros sin '.0')"""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def a_polars(df):
+    """
+    Convierte una hoja a polars. Las columnas de pandas que mezclan texto y números (p. ej.
+    '-' y 20.0) quedan como texto, con los números como los muestra Excel ('20').
+
+    Args:
+        df (pd.DataFrame | pl.DataFrame | pl.LazyFrame): Hoja; las de polars se regresan igual
+
+    Returns:
+        pl.DataFrame | pl.LazyFrame: Hoja en polars
+    """
+    if isinstance(df, (pl.DataFrame, pl.LazyFrame)):
+        return df
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        valores = df[col][df[col].notna()]
+        if len({type(valor) for valor in valores}) > 1:
+            df[col] = df[col].map(_texto_celda, na_action='ignore')
+    return pl.from_pandas(df)
+
+
+def guardar_hojas_columnar(base_path, nombre, hojas, formato):
+    """
+    Guarda cada hoja en un archivo Parquet o Arrow IPC ({nombre}_{hoja}.parquet / .arrow),
+    conservando los tipos de las columnas para volver a cargarlas en milisegundos. Las
+    hojas dadas como consulta (pl.LazyFrame) se escriben por lotes, sin cargarlas completas.
+
+    Args:
+        base_path (str): Carpeta donde guardar los archivos
+        nombre (str): Nombre base de los archivos (el mismo que tendría el Excel)
+        hojas (dict): Nombre de la hoja -> DataFrame (pandas o polars) o consulta de polars
+        formato (str): 'parquet' o 'arrow'
+
+    Returns:
+        list: Rutas de los archivos creados, en el orden de las hojas
+    """
+    os.makedirs(base_path, exist_ok=True)
+
+    rutas = []
+    for nombre_hoja, df in hojas.items():
+        ruta = os.path.join(base_path, f"{nombre}_{nombre_hoja}{EXTENSIONES_COLUMNARES[formato]}")
+        df = a_polars(df)
+        if isinstance(df, pl.LazyFrame):
+            if formato == 'parquet':
+                df.sink_parquet(ruta)
+            else:
+                df.sink_ipc(ruta)
+        elif formato == 'parquet':
+            df.write_parquet(ruta)
+        else:
+            df.write_ipc(ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def guardar_en_formatos(estructurado, base_path, formato, guardar_excel):
+    """
+    Guarda un resultado estructurado en los formatos pedidos.
+
+    Args:
+        estructurado (dict): Resultado con 'nombre' y 'hojas' (DataFrames o consultas de polars)
+        base_path (str): Carpeta donde guardar los archivos
+        formato (str | list): Formato o formatos de salida (ver normalizar_formatos)
+        guardar_excel (callable): Función que guarda el Excel con su formato,
+            guardar_excel(estructurado, base_path) -> ruta
+
+    Returns:
+        list: Rutas de los archivos creados; si se pidió Excel, su ruta va primero
+    """
+    formatos = normalizar_formatos(formato)
+
+    rutas = []
+    if FORMATO_EXCEL in formatos:
+        rutas.append(guardar_excel(estructurado, base_path))
+    for f in formatos:
+        if f != FORMATO_EXCEL:
+            rutas_columnares = guardar_hojas_columnar(base_path, estructurado['nombre'], estructurado['hojas'], f)
+            for ruta in rutas_columnares:
+                print(f"Archivo {f} creado: {ruta}")
+            rutas.extend(rutas_columnares)
+    return rutas
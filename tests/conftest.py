@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+
+# Los módulos de scripts/ se importan entre sí por nombre (igual que desde main.py y pages/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+
+@pytest.fixture(autouse=True)
+def carpetas_temporales(tmp_path, monkeypatch):
+    """Caché e historial en carpetas temporales, para no tocar los del usuario"""
+    import cache_estructurados
+    import historial_sua
+
+    monkeypatch.setattr(cache_estructurados, 'CARPETA_CACHE', str(tmp_path / 'cache'))
+    monkeypatch.setattr(historial_sua, 'CARPETA_HISTORIAL', str(tmp_path / 'historial'))
@@ -0,0 +1,51 @@
+"""Archivos de emisión (.xls) de prueba con las hojas y encabezados que lee estructurar_emision_mod"""
+
+import xlwt
+
+RP = 'A1234567890'
+
+COLUMNAS_EMA = [
+    'NSS', 'Nombre', 'Origen del Movimiento', 'Tipo del Movimiento', 'Fecha del Movimiento', 'Días',
+    'Salario Diario', 'Cuota Fija', 'Excedente Patronal', 'Excedente Obrero', 'Prestaciones en Dinero Patronal',
+    'Prestaciones en Dinero Obrero', 'Gastos Médicos y Pensionados Patronal', 'Gastos Médicos y Pensionados Obrero',
+    'Riesgos de Trabajo', 'Invalidez y Vida Patronal', 'Invalidez y Vida Obrero', 'Guarderías y Prestaciones Sociales',
+    'Total',
+]
+COLUMNAS_EBA = [
+    'NSS', 'Nombre', 'Origen del Movimiento', 'Tipo del Movimiento', 'Fecha del Movimiento', 'Días',
+    'Salario Diario', 'Retiro', 'Cesantía en Edad Avanzada y Vejez Patronal',
+    'Cesantía en Edad Avanzada y Vejez Obrero', 'Subtotal RCV', 'Aportación Patronal', 'Tipo de Descuento',
+    'Valor de Descuento', 'Número de Crédito', 'Amortización', 'Subtotal Infonavit', 'Total',
+]
+
+
+def fila(columnas, nss, nombre, dias, importe=10.0, **valores):
+    """
+    Fila de la hoja EMA o EBA: los importes que no se dan valen `importe`; el resto de
+    los valores se dan con el nombre de la columna sin espacios ni acentos (p. ej. tipo=2,
+    fecha='01/02/2024', t_credito='-', v_credito=20.5, n_credito=1234567890)
+    """
+    especiales = {
+        'NSS': float(nss), 'Nombre': nombre, 'Origen del Movimiento': 'A',
+        'Tipo del Movimiento': valores.get('tipo', 1), 'Fecha del Movimiento': valores.get('fecha', '-'),
+        'Días': dias, 'Salario Diario': valores.get('sdi', 500.0),
+        'Tipo de Descuento': valores.get('t_credito', '-'), 'Valor de Descuento': valores.get('v_credito', '-'),
+        'Número de Crédito': valores.get('n_credito', '-'),
+    }
+    return [especiales.get(columna, importe) for columna in columnas]
+
+
+def escribir_emision(ruta, filas_ema, filas_eba=(), periodo='02/2024', rp=RP):
+    libro = xlwt.Workbook()
+    datos = libro.add_sheet('Datos')
+    datos.write(7, 1, periodo)
+    datos.write(8, 1, rp)
+    for nombre, columnas, filas in (('EMA', COLUMNAS_EMA, filas_ema), ('EBA', COLUMNAS_EBA, filas_eba)):
+        hoja = libro.add_sheet(nombre)
+        for j, columna in enumerate(columnas):
+            hoja.write(4, j, columna)
+        for i, valores in enumerate(filas):
+            for j, valor in enumerate(valores):
+                hoja.write(5 + i, j, valor)
+    libro.save(str(ruta))
+    return str(ruta)
@@ -0,0 +1,58 @@
+"""Archivos .SUA de prueba con el diseño de registro de estructurar_sua_mod.CAMPOS_SUA"""
+
+RP = 'A1234567890'
+
+# Posición de inicio y ancho de los campos numéricos del registro de trabajador (tipo 03)
+CAMPOS_NUMERICOS = {
+    'SDI': (145, 7), 'DIAS': (154, 2), 'INCAPACIDAD': (156, 2), 'AUSENTISMO': (158, 2),
+    'CF': (160, 7), 'EXC_PAT': (167, 7), 'PD_PAT': (174, 7), 'GMP_PAT': (181, 7), 'RT': (188, 7),
+    'IV_PAT': (195, 7), 'GPS': (202, 7), 'RETIRO': (209, 7), 'CEAV_PAT': (216, 7), 'CEAV_OBR': (223, 7),
+    'APORTACION_PAT': (237, 7), 'AMORTIZACION': (244, 7),
+    'EXC_OBR': (278, 3), 'PD_OBR': (281, 3), 'GMP_OBR': (284, 3), 'IV_OBR': (287, 3),
+}
+
+
+def _poner(linea, inicio, texto):
+    linea[inicio:inicio + len(texto)] = texto
+
+
+def encabezado_sua(mes='02', año='2024', rp=RP):
+    linea = [' '] * 295
+    _poner(linea, 0, '02')
+    _poner(linea, 2, rp)
+    _poner(linea, 26, año)
+    _poner(linea, 30, mes)
+    return ''.join(linea)
+
+
+def registro_sua(nss, nombre, rp=RP, n_credito='', **campos):
+    """
+    Registro de trabajador de 295 caracteres. Los campos numéricos se dan ya como el
+    texto del archivo (importes en centavos, base62 con 3 caracteres) y se alinean a la
+    derecha con ceros; los que no se dan quedan en blanco.
+    """
+    linea = [' '] * 295
+    _poner(linea, 0, '03')
+    _poner(linea, 2, rp)
+    _poner(linea, 33, nss)
+    _poner(linea, 44, f'RFC{nss[-4:]}')
+    _poner(linea, 57, f'CURP{nss[-4:]}')
+    _poner(linea, 75, n_credito)
+    _poner(linea, 93, '01')
+    _poner(linea, 95, nombre)
+    for campo, valor in campos.items():
+        inicio, ancho = CAMPOS_NUMERICOS[campo]
+        _poner(linea, inicio, str(valor).rjust(ancho, '0'))
+    return ''.join(linea)
+
+
+def contenido_sua(registros, mes='02', año='2024', rp=RP, separador='\r\n'):
+    """Texto completo de un .SUA: encabezado, registros y un registro de otro tipo (04) al final"""
+    lineas = [encabezado_sua(mes, año, rp)] + list(registros) + ['04' + ' ' * 293]
+    return separador.join(lineas) + separador
+
+
+def escribir_sua(ruta, registros, **opciones):
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        f.write(contenido_sua(registros, **opciones))
+    return str(ruta)
@@ -0,0 +1,87 @@
+import os
+import zipfile
+
+import estructurar_emision_mod
+import estructurar_sua_mod
+from archivos_zip import abrir_archivo, carpeta_real, dividir_ruta_zip, estado_archivo, leer_bytes, ruta_en_zip
+from buscar_archivos import buscar_archivos
+from datos_emision import COLUMNAS_EMA, escribir_emision, fila
+from datos_sua import contenido_sua, registro_sua
+from estructurar_visor import buscar_archivos_visor
+
+
+def escribir_zip(ruta, archivos):
+    with zipfile.ZipFile(ruta, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for nombre, contenido in archivos.items():
+            zip_ref.writestr(nombre, contenido)
+    return str(ruta)
+
+
+def test_rutas_virtuales(tmp_path):
+    ruta_zip = escribir_zip(tmp_path / 'IDSE_02.zip', {'IDSE/CDEMMO99.txt': 'línea\n', 'raiz.txt': b'\x00\x01'})
+    ruta = os.path.join(ruta_zip, 'IDSE', 'CDEMMO99.txt')
+
+    assert ruta_en_zip(ruta_zip, 'IDSE/CDEMMO99.txt') == ruta
+    assert dividir_ruta_zip(ruta) == (ruta_zip, 'IDSE/CDEMMO99.txt')
+    assert dividir_ruta_zip(os.path.join(ruta_zip, 'raiz.txt')) == (ruta_zip, 'raiz.txt')
+    # Rutas en disco, aunque pasen por una carpeta que se llama como un .zip
+    assert dividir_ruta_zip(str(tmp_path / 'otro.zip' / 'a.txt')) == (None, None)
+    assert dividir_ruta_zip(ruta_zip) == (None, None)
+
+    with abrir_archivo(ruta, 'r', encoding='utf-8') as archivo:
+        assert archivo.read() == 'línea\n'
+    assert leer_bytes(os.path.join(ruta_zip, 'raiz.txt')) == b'\x00\x01'
+
+    # Los resultados se escriben junto al .zip
+    assert carpeta_real(ruta) == str(tmp_path)
+    assert carpeta_real(ruta_zip) == str(tmp_path)
+    assert carpeta_real(str(tmp_path)) == str(tmp_path)
+
+    # El estado cambia si cambia el contenido del archivo dentro del .zip
+    anterior = estado_archivo(ruta)
+    escribir_zip(tmp_path / 'IDSE_02.zip', {'IDSE/CDEMMO99.txt': 'otra\n', 'raiz.txt': b'\x00\x01'})
+    assert estado_archivo(ruta) != anterior
+
+
+def test_buscar_en_zip(tmp_path):
+    (tmp_path / 'patron').mkdir()
+    (tmp_path / 'patron' / 'suelto.SUA').write_text('')
+    ruta_zip = escribir_zip(tmp_path / 'patron' / 'descarga.ZIP', {'SUA/02.sua': '', 'SUA/leeme.txt': '', 'otro/': ''})
+
+    encontrados = buscar_archivos(str(tmp_path), extensiones=('.sua',), en_zip=True, por_nivel=True)
+    assert [(archivo.ruta, archivo.nivel) for archivo in encontrados] == [
+        (str(tmp_path / 'patron' / 'suelto.SUA'), 1),
+        (os.path.join(ruta_zip, 'SUA', '02.sua'), 3),
+    ]
+    # Sin en_zip los .zip no se revisan
+    assert len(buscar_archivos(str(tmp_path), extensiones=('.sua',))) == 1
+    # El .zip también puede ser la carpeta buscada
+    assert [archivo.ruta for archivo in buscar_archivos(ruta_zip, extensiones=('.sua',), en_zip=True)] == [
+        os.path.join(ruta_zip, 'SUA', '02.sua')
+    ]
+
+
+def test_estructurar_desde_zip(tmp_path):
+    registros = [registro_sua('00000000001', 'ANA', DIAS=30, CF=100), registro_sua('00000000002', 'BETO', DIAS=15)]
+    ruta_zip = escribir_zip(tmp_path / 'suas.zip', {'02-2024/A.SUA': contenido_sua(registros)})
+    (tmp_path / 'extraido').mkdir()
+    (tmp_path / 'extraido' / 'A.SUA').write_bytes(contenido_sua(registros).encode('utf-8'))
+
+    desde_zip = estructurar_sua_mod.estructurar_suas(ruta_zip, procesos=1)
+    en_disco = estructurar_sua_mod.estructurar_suas(str(tmp_path / 'extraido'), procesos=1)
+    assert desde_zip['archivos'] == [os.path.join(ruta_zip, '02-2024', 'A.SUA')]
+    assert desde_zip['hojas']['SUA_MENSUAL'].equals(en_disco['hojas']['SUA_MENSUAL'])
+
+    # Emisiones dentro de un .zip
+    escribir_emision(tmp_path / 'emision.xls', [fila(COLUMNAS_EMA, 1, 'ANA', 30)], periodo='01/2024')
+    with zipfile.ZipFile(tmp_path / 'emisiones.zip', 'w') as zip_ref:
+        zip_ref.write(tmp_path / 'emision.xls', 'enero/emision.xls')
+    estructurado = estructurar_emision_mod.estructurar_emisiones(str(tmp_path / 'emisiones.zip'), procesos=1)
+    assert estructurado['hojas']['EMA']['NSS'].to_list() == ['00000000001']
+
+    # Visor dentro de un .zip
+    ruta_visor = escribir_zip(tmp_path / 'visor.zip', {'IDSE/CDEMMO99.txt': '', 'IDSE/CDEBAS99.txt': ''})
+    assert buscar_archivos_visor(ruta_visor) == {os.path.join(ruta_visor, 'IDSE'): {
+        'CDEMMO99.txt': os.path.join(ruta_visor, 'IDSE', 'CDEMMO99.txt'),
+        'CDEBAS99.txt': os.path.join(ruta_visor, 'IDSE', 'CDEBAS99.txt'),
+    }}
@@ -0,0 +1,38 @@
+import buscar_archivos
+from buscar_archivos import buscar_archivos as buscar, limpiar_listados, listar_carpeta
+from estructurar_visor import buscar_archivos_visor
+
+
+def test_nombres_sin_distinguir_mayusculas(tmp_path):
+    (tmp_path / 'patron').mkdir()
+    (tmp_path / 'patron' / 'cdemmo99.TXT').write_text('')
+    (tmp_path / 'patron' / 'CDEBAS99.txt').write_text('')
+    (tmp_path / 'patron' / 'otro.txt').write_text('')
+
+    encontrados = buscar(str(tmp_path), nombres=('CDEMMO99.txt',))
+    assert [archivo.nombre for archivo in encontrados] == ['cdemmo99.TXT']
+
+    # El visor los guarda con el nombre de ARCHIVOS_VISOR
+    carpetas = buscar_archivos_visor(str(tmp_path))
+    assert carpetas == {str(tmp_path / 'patron'): {
+        'CDEMMO99.txt': str(tmp_path / 'patron' / 'cdemmo99.TXT'),
+        'CDEBAS99.txt': str(tmp_path / 'patron' / 'CDEBAS99.txt'),
+    }}
+
+
+def test_listados_limitados(tmp_path, monkeypatch):
+    monkeypatch.setattr(buscar_archivos, 'MAX_LISTADOS', 2)
+    limpiar_listados()
+    carpetas = []
+    for numero in range(3):
+        carpeta = tmp_path / str(numero)
+        carpeta.mkdir()
+        carpetas.append(str(carpeta))
+
+    listar_carpeta(carpetas[0])
+    listar_carpeta(carpetas[1])
+    # Usar la primera otra vez: la que se olvida es la segunda
+    listar_carpeta(carpetas[0])
+    listar_carpeta(carpetas[2])
+    assert [carpeta for carpeta, _ in buscar_archivos._listados] == [carpetas[0], carpetas[2]]
+    limpiar_listados()
@@ -0,0 +1,94 @@
+import os
+import time
+
+import polars as pl
+
+import cache_estructurados
+from cache_estructurados import clave_archivo, guardar_cache, leer_cache, recortar_cache
+
+
+def guardar(ruta, tipo='sua', filas=1):
+    clave = clave_archivo(str(ruta), tipo)
+    guardar_cache(clave, {'hoja': pl.DataFrame({'NSS': [f'{numero:011d}' for numero in range(filas)]})})
+    return clave
+
+
+def archivos_cache():
+    return sorted(os.listdir(cache_estructurados.CARPETA_CACHE))
+
+
+def usar_hace(clave, dias):
+    antes = time.time() - dias * 24 * 60 * 60
+    os.utime(os.path.join(cache_estructurados.CARPETA_CACHE, f'{clave}.json'), (antes, antes))
+
+
+def test_reemplazar_entrada_del_mismo_archivo(tmp_path):
+    ruta = tmp_path / 'archivo.SUA'
+    ruta.write_text('uno')
+    anterior = guardar(ruta)
+    otro = guardar(tmp_path / 'archivo.SUA', tipo='emision')
+
+    # El archivo cambió: la nueva versión reemplaza a la anterior del mismo origen
+    ruta.write_text('dos con otro tamaño')
+    nueva = guardar(ruta)
+    assert nueva != anterior
+    assert archivos_cache() == sorted([f'{nueva}.json', f'{nueva}_hoja.parquet', f'{otro}.json', f'{otro}_hoja.parquet'])
+    assert leer_cache(anterior) is None
+    assert leer_cache(nueva)[0]['hoja'].height == 1
+
+
+def test_clave_incluye_codigo(tmp_path, monkeypatch):
+    ruta = tmp_path / 'archivo.SUA'
+    ruta.write_text('uno')
+    clave = clave_archivo(str(ruta), 'sua')
+    monkeypatch.setattr(cache_estructurados, 'huella_codigo', lambda: 'otro parser')
+    assert clave_archivo(str(ruta), 'sua') != clave
+
+
+def test_recortar_cache(tmp_path):
+    claves = []
+    for numero in range(4):
+        ruta = tmp_path / f'{numero}.SUA'
+        ruta.write_text(str(numero))
+        claves.append(guardar(ruta, filas=100))
+    usar_hace(claves[0], 40)
+    usar_hace(claves[1], 3)
+    usar_hace(claves[2], 2)
+    usar_hace(claves[3], 1)
+
+    # Leer una entrada la marca como usada
+    leer_cache(claves[1])
+
+    # Sin usar en más de 30 días
+    assert recortar_cache() == 1
+    assert leer_cache(claves[0]) is None
+
+    # Por tamaño se eliminan primero las usadas hace más tiempo
+    tamaño = sum(os.path.getsize(os.path.join(cache_estructurados.CARPETA_CACHE, nombre))
+                 for nombre in archivos_cache() if nombre.startswith(claves[3]))
+    assert recortar_cache(tamaño_maximo=tamaño * 2) == 1
+    assert leer_cache(claves[2]) is None
+    assert leer_cache(claves[1]) is not None
+    assert leer_cache(claves[3]) is not None
+
+
+def test_huella_solo_de_los_parsers(tmp_path, monkeypatch):
+    carpeta = tmp_path / 'scripts'
+    carpeta.mkdir()
+    for nombre in cache_estructurados.MODULOS_CACHE + ('confrontas.py',):
+        (carpeta / nombre).write_text(f'# {nombre}\n')
+    monkeypatch.setattr(cache_estructurados, '__file__', str(carpeta / 'cache_estructurados.py'))
+
+    def huella():
+        cache_estructurados.huella_codigo.cache_clear()
+        return cache_estructurados.huella_codigo()
+
+    try:
+        anterior = huella()
+        # Otros scripts (interfaz, descargas) no invalidan la caché
+        (carpeta / 'confrontas.py').write_text('# otro cambio\n')
+        assert huella() == anterior
+        (carpeta / 'esquemas.py').write_text('# tipos nuevos\n')
+        assert huella() != anterior
+    finally:
+        cache_estructurados.huella_codigo.cache_clear()
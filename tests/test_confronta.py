@@ -0,0 +1,153 @@
+import polars as pl
+import pytest
+
+from confronta import leer_hoja, comparar_mensual, comparar_bimestral
+
+
+# Los resultados esperados son los del cálculo fila por fila original (antes del join por ID_UNICO)
+
+RP = 'A1234567890'
+CUOTAS = {'CF': 100.25, 'EXC_PAT': 10.5, 'EXC_OBR': 3.75, 'PD_PAT': 20.1, 'PD_OBR': 7.05, 'GMP_PAT': 30.3,
+          'GMP_OBR': 11.15, 'RT': 40.4, 'IV_PAT': 50.5, 'IV_OBR': 18.2, 'GPS': 60.6}
+
+
+def fila_mensual(nss, nombre, dias, inc=0, **cambios):
+    cuotas = {**CUOTAS, **cambios}
+    return {'RP': RP, 'NSS': nss, 'NOMBRE ASEGURADO': nombre, 'DIAS': dias, 'SDI': 500.0,
+            'INC': inc, 'AUS': 0, **cuotas, 'TOTAL': round(sum(cuotas.values()), 2)}
+
+
+def fila_bimestral(nss, nombre, dias, n_credito='-', inc=0, retiro=200.0, ceav_pat=300.5, ceav_obr=100.25,
+                   amortizacion=0.0):
+    return {'RP': RP, 'NSS': nss, 'NOMBRE ASEGURADO': nombre, 'DIAS': dias, 'SDI': 500.0, 'INC': inc,
+            'N_CREDITO': n_credito, 'RETIRO': retiro, 'CEAV_PAT': ceav_pat, 'CEAV_OBR': ceav_obr,
+            'APORTACION_PAT': 250.0, 'AMORTIZACION': amortizacion,
+            'TOTAL': round(retiro + ceav_pat + ceav_obr + 250.0 + amortizacion, 2)}
+
+
+def fila_eba(fila, t_credito, v_credito):
+    eba = {columna: valor for columna, valor in fila.items() if columna != 'INC'}
+    eba['TOTAL_RCV'] = round(fila['RETIRO'] + fila['CEAV_PAT'] + fila['CEAV_OBR'], 2)
+    eba['TOTAL_INF'] = round(fila['APORTACION_PAT'] + fila['AMORTIZACION'], 2)
+    eba['T_CREDITO'] = t_credito
+    eba['V_CREDITO'] = v_credito
+    return eba
+
+
+def hojas(sua, emision, numero_hoja):
+    """Lee las hojas igual que sua_vs_emision con resultados en memoria"""
+    return (leer_hoja({'nombre': '02-2024_SUA', 'hojas': sua}, numero_hoja),
+            leer_hoja({'nombre': '02-2024_EMISION', 'hojas': emision}, numero_hoja))
+
+
+@pytest.fixture
+def resultado_mensual():
+    sua = pl.DataFrame([
+        fila_mensual('00000000001', 'ANA', 30),
+        fila_mensual('00000000002', 'BETO', 30),
+        fila_mensual('00000000003', 'CARLA', 30, RT=45.4),
+        fila_mensual('00000000004', 'DANIEL', 30, GMP_PAT=0.0, GMP_OBR=0.0, IV_PAT=0.0, IV_OBR=0.0),
+        fila_mensual('00000000005', 'ELENA', 28, inc=2,
+                     **{columna: round(valor * 28 / 30, 2) for columna, valor in CUOTAS.items()}),
+        fila_mensual('00000000006', 'FER', 30),
+        fila_mensual('00000000001', 'ANA DUPLICADA', 10),
+        fila_mensual('00000000008', 'HUGO', 20),
+    ])
+    ema = pl.DataFrame([
+        fila_mensual('00000000008', 'HUGO', 30),
+        fila_mensual('00000000001', 'ANA', 30),
+        fila_mensual('00000000002', 'BETO', 28),
+        fila_mensual('00000000003', 'CARLA', 30),
+        fila_mensual('00000000004', 'DANIEL', 30),
+        fila_mensual('00000000005', 'ELENA', 30),
+        fila_mensual('00000000007', 'GABY', 30),
+    ]).drop('INC', 'AUS')
+    return comparar_mensual(*hojas({'SUA_MENSUAL': sua}, {'EMA': ema}, 1))
+
+
+@pytest.fixture
+def resultado_bimestral():
+    sua = [
+        fila_bimestral('00000000001', 'ANA', 61),
+        fila_bimestral('00000000002', 'BETO', 61, n_credito='1234567890', amortizacion=150.0),
+        fila_bimestral('00000000003', 'CARLA', 61, n_credito='1111111111', amortizacion=80.0),
+        fila_bimestral('00000000004', 'DANIEL', 59, inc=2, retiro=193.44, ceav_pat=290.65, ceav_obr=96.96),
+        fila_bimestral('00000000005', 'ELENA', 61, retiro=210.0),
+        fila_bimestral('00000000006', 'FER', 61),
+    ]
+    eba = [
+        fila_eba(fila_bimestral('00000000001', 'ANA', 61), '-', '-'),
+        fila_eba(fila_bimestral('00000000002', 'BETO', 61, amortizacion=150.0), '-', '-'),
+        fila_eba(fila_bimestral('00000000003', 'CARLA', 61, n_credito='2222222222', amortizacion=80.0), '%', 20.0),
+        fila_eba(fila_bimestral('00000000004', 'DANIEL', 61), '-', '-'),
+        fila_eba(fila_bimestral('00000000005', 'ELENA', 61), '-', '-'),
+        fila_eba(fila_bimestral('00000000007', 'GABY', 61, n_credito='3333333333', amortizacion=90.0), 'VSM', 3.5),
+    ]
+    return comparar_bimestral(*hojas(
+        {'SUA_MENSUAL': pl.DataFrame(sua), 'SUA_BIMESTRAL': pl.DataFrame(sua)},
+        {'EMA': pl.DataFrame(eba, strict=False), 'EBA': pl.DataFrame(eba, strict=False)}, 2
+    ))
+
+
+def por_nss(resultado, columna):
+    return dict(zip(resultado['NSS'].to_list(), resultado[columna].to_list()))
+
+
+def test_observaciones_mensual(resultado_mensual):
+    assert resultado_mensual.select('NSS', 'OBSERVACIONES').rows() == [
+        ('00000000007', 'NO APARECE EN SUA'),
+        ('00000000001', 'SIN DIFERENCIAS'),
+        ('00000000002', 'MAS DIAS EN SUA'),
+        ('00000000003', 'REVISAR PRIMA DE RIESGO, DIFERENCIAS'),
+        ('00000000004', 'PENSIONADO, DIFERENCIAS'),
+        ('00000000005', 'MAS DIAS EN EMISION, SIN DIFERENCIAS POR INCAPACIDAD/AUSENTISMO'),
+        ('00000000006', 'NO APARECE EN EMISION'),
+        ('00000000008', 'MAS DIAS EN EMISION'),
+    ]
+
+
+def test_diferencias_mensual(resultado_mensual):
+    dias = por_nss(resultado_mensual, 'DIAS')
+    assert dias == {'00000000007': None, '00000000001': 0, '00000000002': 2, '00000000003': 0,
+                    '00000000004': 0, '00000000005': -2, '00000000006': 30, '00000000008': -10}
+
+    # Las diferencias de importes son exactas a 2 decimales
+    total = {nss: None if valor is None else float(valor) for nss, valor in por_nss(resultado_mensual, 'TOTAL').items()}
+    assert total == {'00000000007': None, '00000000001': 0.0, '00000000002': 0.0, '00000000003': 5.0,
+                     '00000000004': -110.15, '00000000005': -23.51, '00000000006': 352.8, '00000000008': 0.0}
+    assert float(por_nss(resultado_mensual, 'RT')['00000000005']) == -2.69
+
+    # Un ID repetido en el SUA se compara con su primera fila
+    assert por_nss(resultado_mensual, 'NOMBRE ASEGURADO')['00000000001'] == 'ANA'
+
+
+def test_observaciones_bimestral(resultado_bimestral):
+    assert resultado_bimestral.select('NSS', 'OBSERVACIONES').rows() == [
+        ('00000000007', 'NO APARECE EN SUA'),
+        ('00000000001', 'SIN DIFERENCIAS'),
+        ('00000000002', 'SIN DIFERENCIAS'),
+        ('00000000003', 'NUMERO DE CREDITO DIFERENTE'),
+        ('00000000004', 'MAS DIAS EN EMISION, DIFERENCIAS'),
+        ('00000000005', 'DIFERENCIAS'),
+        ('00000000006', 'NO APARECE EN EMISION'),
+    ]
+
+
+def test_creditos_bimestral(resultado_bimestral):
+    # N_CREDITO de emisión si tiene uno, si no el del SUA; T_CREDITO siempre de emisión
+    assert por_nss(resultado_bimestral, 'N_CREDITO') == {
+        '00000000007': '3333333333', '00000000001': '-', '00000000002': '1234567890',
+        '00000000003': '2222222222', '00000000004': '-', '00000000005': '-', '00000000006': '-',
+    }
+    assert por_nss(resultado_bimestral, 'T_CREDITO') == {
+        '00000000007': 'VSM', '00000000001': '-', '00000000002': '-', '00000000003': '%',
+        '00000000004': '-', '00000000005': '-', '00000000006': None,
+    }
+
+    columnas = resultado_bimestral.columns
+    assert columnas.index('T_CREDITO') < columnas.index('V_CREDITO') < columnas.index('N_CREDITO')
+
+    total = por_nss(resultado_bimestral, 'TOTAL')
+    assert float(total['00000000004']) == -19.7
+    assert float(total['00000000006']) == 850.75
+    assert float(por_nss(resultado_bimestral, 'RETIRO')['00000000004']) == -6.56
@@ -0,0 +1,75 @@
+import polars as pl
+import pytest
+
+from confrontar_suas import comparar_suas
+from esquemas import aplicar_esquema
+
+
+# Los resultados esperados son los del cálculo fila por fila original (antes del join por ID_UNICO)
+
+COLUMNAS_NUMERICAS = ["DIAS", "CF", "EXC_PAT", "EXC_OBR", "PD_PAT", "PD_OBR",
+                      "GMP_PAT", "GMP_OBR", "RT", "IV_PAT", "IV_OBR", "GPS", "TOTAL"]
+
+
+def hoja(filas):
+    columnas = ['RP', 'NSS', 'NOMBRE ASEGURADO', 'RFC', 'CURP', 'N_MOVS', 'SDI', 'DIAS', 'CF', 'TOTAL']
+    return aplicar_esquema(pl.DataFrame([dict(zip(columnas, fila)) for fila in filas], orient='row'))
+
+
+def comparar(sua1, sua2):
+    resultado = comparar_suas(hoja(sua1), hoja(sua2), COLUMNAS_NUMERICAS,
+                              ["NOMBRE ASEGURADO", "RFC", "CURP", "N_MOVS", "SDI"],
+                              ["RFC", "CURP", "N_MOVS", "INC", "AUS"])
+    return resultado.sort_values('ID_UNICO').reset_index(drop=True)
+
+
+def test_comparar_suas():
+    resultado = comparar(
+        [
+            ('A1234567890', '00000000001', 'ANA', 'RFC1', 'CURP1', 1, 500.0, 30, 100.25, 150.5),
+            ('A1234567890', '00000000002', 'BETO', 'RFC2', 'CURP2', 2, 400.0, 30, 80.1, 120.3),
+            ('A1234567890', '00000000003', 'CARLA', 'RFC3', 'CURP3', 0, 300.0, 15, 40.0, 60.0),
+            ('A1234567890', '00000000001', 'ANA REPETIDA', 'RFC9', 'CURP9', 9, 1.0, 1, 1.0, 1.0),
+        ],
+        [
+            ('A1234567890', '00000000001', 'ANA', 'RFC1', 'CURP1', 1, 500.0, 30, 100.25, 150.5),
+            # Mismo ID: el RP solo se compara en sus primeras 10 posiciones
+            ('A1234567899', '00000000002', 'BETO B', 'RFC2B', 'CURP2B', 3, 450.0, 28, 80.0, 110.2),
+            ('A1234567890', '00000000004', 'DANIEL', 'RFC4', 'CURP4', 1, 200.0, 30, 20.0, 30.0),
+        ],
+    )
+
+    assert list(resultado['ID_UNICO']) == ['A123456789_00000000001', 'A123456789_00000000002',
+                                           'A123456789_00000000003', 'A123456789_00000000004']
+    assert list(resultado['RP']) == ['A1234567890'] * 4
+
+    # En ambos: nombre, RFC, CURP, movimientos y SDI del segundo SUA; diferencias SUA1 - SUA2
+    assert list(resultado['NOMBRE ASEGURADO']) == ['ANA', 'BETO B', 'CARLA', 'DANIEL']
+    assert list(resultado['RFC'])[:3] == ['RFC1', 'RFC2B', 'RFC3']
+    assert list(resultado['N_MOVS'])[:3] == [1, 3, 0]
+    assert float(resultado['SDI'][1]) == 450.0
+    assert list(resultado['DIAS'])[:3] == [0, 2, 15]
+    assert [float(valor) for valor in resultado['CF'][:3]] == [0.0, 0.1, 40.0]
+    assert [float(valor) for valor in resultado['TOTAL'][:3]] == [0.0, 10.1, 60.0]
+
+    # Solo en el segundo SUA: RP, NSS y nombre; lo demás vacío
+    solo_sua2 = resultado.iloc[3]
+    assert solo_sua2['NSS'] == '00000000004'
+    assert solo_sua2[['RFC', 'CURP', 'N_MOVS', 'SDI', 'DIAS', 'TOTAL']].isna().all()
+
+
+def test_columna_faltante_en_sua2():
+    sua1 = hoja([('A1234567890', '00000000001', 'ANA', 'RFC1', 'CURP1', 1, 500.0, 30, 100.25, 150.5)])
+    sua2 = hoja([('A1234567890', '00000000001', 'ANA', 'RFC1', 'CURP1', 1, 500.0, 28, 100.0, 150.0)])
+
+    # Como en el cálculo fila por fila: sin N_MOVS en el segundo SUA no se puede comparar
+    with pytest.raises(KeyError, match='N_MOVS'):
+        comparar_suas(sua1, sua2.drop('N_MOVS'), COLUMNAS_NUMERICAS,
+                      ["NOMBRE ASEGURADO", "RFC", "CURP", "N_MOVS", "SDI"], ["RFC", "CURP", "N_MOVS", "INC", "AUS"])
+
+    # Una columna numérica que falta no se resta y conserva el valor del primer SUA
+    resultado = comparar_suas(sua1, sua2.drop('CF'), COLUMNAS_NUMERICAS,
+                              ["NOMBRE ASEGURADO", "RFC", "CURP", "N_MOVS", "SDI"],
+                              ["RFC", "CURP", "N_MOVS", "INC", "AUS"])
+    assert float(resultado['CF'][0]) == 100.25
+    assert list(resultado['DIAS']) == [2]
@@ -0,0 +1,66 @@
+import os
+import json
+import zipfile
+
+import descomprimir_sub
+from descomprimir_sub import MANIFIESTO_ZIP, procesar_archivos_zip
+
+
+def escribir_zip(ruta, archivos):
+    with zipfile.ZipFile(ruta, 'w') as zip_ref:
+        for nombre, contenido in archivos.items():
+            zip_ref.writestr(nombre, contenido)
+
+
+def test_omitir_zip_sin_cambios(tmp_path):
+    (tmp_path / 'patron').mkdir()
+    escribir_zip(tmp_path / 'patron' / 'idse.zip', {'IDSE/CDEMMO99.txt': 'uno', 'IDSE/CDEBAS99.txt': 'dos'})
+
+    assert procesar_archivos_zip(str(tmp_path), hilos=1) == ['Descomprimido exitosamente: idse.zip']
+    assert (tmp_path / 'patron' / 'CDEMMO99.txt').read_text() == 'uno'
+
+    # Sin cambios en el .zip ni en sus archivos: se omite
+    assert procesar_archivos_zip(str(tmp_path), hilos=1) == ['Sin cambios, se omite: idse.zip']
+
+    # Falta un archivo extraído: se vuelve a descomprimir, sin reescribir el que sigue igual
+    (tmp_path / 'patron' / 'CDEBAS99.txt').unlink()
+    assert procesar_archivos_zip(str(tmp_path), hilos=1) == [
+        'Descomprimido exitosamente: idse.zip (1 archivos sin cambios)'
+    ]
+    assert (tmp_path / 'patron' / 'CDEBAS99.txt').read_text() == 'dos'
+
+
+def test_manifiesto_danado(tmp_path):
+    (tmp_path / 'patron').mkdir()
+    escribir_zip(tmp_path / 'patron' / 'idse.zip', {'CDEMMO99.txt': 'uno'})
+    procesar_archivos_zip(str(tmp_path), hilos=1)
+
+    # Entrada con otro formato: se descarta y el .zip se revisa de nuevo
+    ruta_manifiesto = tmp_path / MANIFIESTO_ZIP
+    manifiesto = json.loads(ruta_manifiesto.read_text(encoding='utf-8'))
+    manifiesto['patron/idse.zip'] = {'tamaño': 'x', 'archivos': []}
+    ruta_manifiesto.write_text(json.dumps(manifiesto), encoding='utf-8')
+    assert descomprimir_sub.leer_manifiesto(str(tmp_path)) == {}
+    assert procesar_archivos_zip(str(tmp_path), hilos=1) == [
+        'Descomprimido exitosamente: idse.zip (1 archivos sin cambios)'
+    ]
+
+
+def test_error_en_un_zip(tmp_path, monkeypatch):
+    (tmp_path / 'uno').mkdir()
+    (tmp_path / 'dos').mkdir()
+    escribir_zip(tmp_path / 'uno' / 'a.zip', {'A.txt': 'a'})
+    escribir_zip(tmp_path / 'dos' / 'b.zip', {'B.txt': 'b'})
+    descomprimir = descomprimir_sub.descomprimir_archivo
+
+    def falla_en_a(ruta_zip, **opciones):
+        if ruta_zip.endswith('a.zip'):
+            raise RuntimeError('falla inesperada')
+        return descomprimir(ruta_zip, **opciones)
+    monkeypatch.setattr(descomprimir_sub, 'descomprimir_archivo', falla_en_a)
+
+    # El error se informa y los demás .zip terminan
+    resultados = procesar_archivos_zip(str(tmp_path), hilos=2)
+    assert sorted(resultados) == ['Descomprimido exitosamente: b.zip',
+                                  'Error al descomprimir a.zip: falla inesperada']
+    assert list(descomprimir_sub.leer_manifiesto(str(tmp_path))) == [os.path.join('dos', 'b.zip')]
@@ -0,0 +1,61 @@
+import os
+
+import openpyxl
+import polars as pl
+import xlwt
+
+import estructurar_emision_mod
+from datos_emision import COLUMNAS_EBA, COLUMNAS_EMA, escribir_emision, fila
+from esquemas import IMPORTE
+
+
+def test_pocos_archivos_sin_procesos(tmp_path, monkeypatch):
+    # Con pocos archivos se procesan en el proceso actual, sin arrancar procesos nuevos
+    def sin_procesos(*args, **kwargs):
+        raise AssertionError('no se esperaba un ProcessPoolExecutor')
+    monkeypatch.setattr(estructurar_emision_mod, 'ProcessPoolExecutor', sin_procesos)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+
+    for numero in range(estructurar_emision_mod.ARCHIVOS_POR_PROCESO * 2 - 1):
+        escribir_emision(tmp_path / f'{numero}.xls', [fila(COLUMNAS_EMA, numero + 1, 'ANA', 30)],
+                         periodo='01/2024', rp=f'A{numero:010d}')
+
+    estructurado = estructurar_emision_mod.estructurar_emisiones(str(tmp_path))
+    assert estructurado['hojas']['EMA'].height == estructurar_emision_mod.ARCHIVOS_POR_PROCESO * 2 - 1
+
+
+def test_omitir_xls_que_no_son_emision(tmp_path, capsys):
+    escribir_emision(tmp_path / 'emision.xls', [fila(COLUMNAS_EMA, 1, 'ANA', 30)], periodo='01/2024')
+    (tmp_path / 'reporte.xls').write_text('<html><table></table></html>')
+    libro = xlwt.Workbook()
+    libro.add_sheet('Hoja1').write(0, 0, 'otro')
+    libro.save(str(tmp_path / 'una_hoja.xls'))
+
+    assert not estructurar_emision_mod.es_archivo_emision(str(tmp_path / 'reporte.xls'))
+
+    estructurado = estructurar_emision_mod.estructurar_emisiones(str(tmp_path), procesos=1)
+    assert sorted(os.path.basename(ruta) for ruta in estructurado['archivos']) == ['emision.xls', 'una_hoja.xls']
+    assert estructurado['hojas']['EMA']['NSS'].to_list() == ['00000000001']
+    assert 'una_hoja.xls no es un archivo de emisión' in capsys.readouterr().out
+
+
+def test_eba_con_creditos_mezclados(tmp_path):
+    # Tipo y valor de descuento: '-' sin crédito, número con crédito
+    escribir_emision(tmp_path / 'emision.xls', [fila(COLUMNAS_EMA, 1, 'ANA', 30), fila(COLUMNAS_EMA, 2, 'BETO', 30)],
+                     [fila(COLUMNAS_EBA, 1, 'ANA', 30),
+                      fila(COLUMNAS_EBA, 2, 'BETO', 30, t_credito=3, v_credito=20.5, n_credito=1234567890)])
+
+    estructurado = estructurar_emision_mod.estructurar_emision(str(tmp_path / 'emision.xls'))
+    eba = estructurado['hojas']['EBA']
+    assert eba.schema['V_CREDITO'] == pl.Float64
+    assert eba.schema['TOTAL'] == IMPORTE
+    assert eba.select('NSS', 'T_CREDITO', 'V_CREDITO', 'N_CREDITO').rows() == [
+        ('00000000001', '-', None, '-'),
+        ('00000000002', '3', 20.5, '1234567890'),
+    ]
+
+    # En el Excel, sin crédito se muestra '-' como en la versión anterior
+    ruta_excel = estructurar_emision_mod.guardar_emision_excel(estructurado, str(tmp_path))
+    filas = list(openpyxl.load_workbook(ruta_excel, read_only=True)['EBA'].values)
+    columnas = [filas[0].index(columna) for columna in ('T_CREDITO', 'V_CREDITO', 'N_CREDITO')]
+    assert [tuple(fila[i] for i in columnas) for fila in filas[1:]] == [('-', '-', '-'), ('3', 20.5, '1234567890')]
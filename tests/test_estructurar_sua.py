@@ -0,0 +1,131 @@
+import os
+from decimal import Decimal
+
+import polars as pl
+import pytest
+
+import estructurar_sua_mod
+from datos_sua import contenido_sua, escribir_sua, registro_sua
+from estructurar_sua_mod import BASE62_CHARS, decode_base62, decode_base62_columna, decodificar_registros_sua
+
+
+# Los resultados esperados son los del recorrido registro por registro original
+
+
+def decodificar(registros):
+    return decodificar_registros_sua(contenido_sua(registros), nombre_archivo='02-2024.SUA')
+
+
+def test_decodificar_registros():
+    mensual, bimestral = decodificar([
+        registro_sua('00000000001', 'PEREZ$JUAN', n_credito='1234567890',
+                     SDI=50025, DIAS=30, CF=10025, EXC_PAT=1050, RT=4040, EXC_OBR='00A', IV_OBR='1Zz',
+                     RETIRO=20000, AMORTIZACION=15050),
+        # Campos vacíos: 0
+        registro_sua('00000000002', 'LOPEZ/ANA', DIAS=28, INCAPACIDAD=2),
+    ])
+
+    assert mensual['NSS'].to_list() == ['00000000001', '00000000002']
+    assert mensual['RP'].cast(str).to_list() == ['A1234567890'] * 2
+    assert mensual['NOMBRE ASEGURADO'].to_list() == ['PEREZ$JUAN', 'LOPEZ/ANA']
+    assert mensual['DIAS'].to_list() == [30, 28]
+    assert mensual['INCAPACIDAD'].to_list() == [0, 2]
+    assert mensual['SDI'].to_list() == [Decimal('500.25'), Decimal('0.00')]
+    assert mensual['CF'].to_list() == [Decimal('100.25'), Decimal('0.00')]
+
+    # base62: '00A' = 10 centavos, '1Zz' = 62**2 + 35 * 62 + 61 = 6075 centavos
+    assert mensual['EXC_OBR'].to_list() == [Decimal('0.10'), Decimal('0.00')]
+    assert mensual['IV_OBR'].to_list() == [Decimal('60.75'), Decimal('0.00')]
+    assert mensual['TOTAL'].to_list() == [Decimal('100.25') + Decimal('10.50') + Decimal('0.10')
+                                          + Decimal('40.40') + Decimal('60.75'), Decimal('0.00')]
+
+    # Sin crédito se muestra '-' (esquemas)
+    assert bimestral['N_CREDITO'].to_list() == ['1234567890', '-']
+    assert bimestral['TOTAL'].to_list() == [Decimal('350.50'), Decimal('0.00')]
+
+
+def test_registro_invalido(capsys):
+    mensual, bimestral = decodificar([
+        registro_sua('00000000001', 'ANA', DIAS=30, CF=100),
+        # Base62 inválido: solo afecta a SUA_MENSUAL
+        registro_sua('00000000002', 'BETO', DIAS=30, PD_OBR='0!0', RETIRO=500),
+        # DIAS inválido: afecta a ambas hojas
+        registro_sua('00000000003', 'CARLA', DIAS='x1'),
+        registro_sua('00000000004', 'DANIEL', DIAS=15),
+    ])
+
+    assert mensual['NSS'].to_list() == ['00000000001', '00000000004']
+    assert bimestral['NSS'].to_list() == ['00000000001', '00000000002', '00000000004']
+
+    # Se reporta la posición del registro en el archivo (encabezado y registros de 295 + \r\n)
+    salida = capsys.readouterr().out
+    assert 'Error procesando registro en 02-2024.SUA, posición 594: valor inválido en PD_OBR' in salida
+    assert 'Error procesando registro en 02-2024.SUA, posición 891: valor inválido en DIAS' in salida
+    assert 'Error procesando registro SUA_BIMESTRAL en 02-2024.SUA, posición 891: valor inválido en DIAS' in salida
+    assert 'posición 297' not in salida
+
+
+def test_decode_base62_columna():
+    # Todos los caracteres en cada posición, comparados con la decodificación de uno en uno
+    codigos = [a + b + c for a, b, c in zip(BASE62_CHARS, reversed(BASE62_CHARS), BASE62_CHARS[5:] + BASE62_CHARS[:5])]
+    codigos += ['000', 'zzz', '00A', '1Zz']
+    assert decode_base62_columna(pl.Series(codigos)).to_list() == [decode_base62(codigo) for codigo in codigos]
+
+    # Caracteres fuera del alfabeto: nulo en la columna, ValueError uno por uno
+    invalidos = ['0!0', ' 1A', 'ñ00']
+    assert decode_base62_columna(pl.Series(invalidos)).to_list() == [None] * 3
+    for codigo in invalidos:
+        with pytest.raises(ValueError):
+            decode_base62(codigo)
+
+
+def test_pocos_archivos_sin_procesos(tmp_path, monkeypatch):
+    # Con pocos archivos se procesan en el proceso actual, sin arrancar procesos nuevos
+    def sin_procesos(*args, **kwargs):
+        raise AssertionError('no se esperaba un ProcessPoolExecutor')
+    monkeypatch.setattr(estructurar_sua_mod, 'ProcessPoolExecutor', sin_procesos)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+
+    for numero in range(estructurar_sua_mod.ARCHIVOS_POR_PROCESO * 2 - 1):
+        escribir_sua(tmp_path / f'{numero}.SUA', [registro_sua(f'{numero:011d}', 'ANA', DIAS=30)])
+
+    estructurado = estructurar_sua_mod.estructurar_suas(str(tmp_path))
+    assert estructurado['hojas']['SUA_MENSUAL'].height == estructurar_sua_mod.ARCHIVOS_POR_PROCESO * 2 - 1
+
+
+@pytest.mark.parametrize('tamaño_bloque', [1, 100, 297, 297 * 2 + 13, estructurar_sua_mod.BLOQUE_SUA])
+def test_por_bloques_igual_que_completo(tmp_path, capsys, tamaño_bloque):
+    # Registros partidos entre bloques (también a la mitad de un carácter de varios bytes)
+    # y registros inválidos en distintos bloques
+    ruta = escribir_sua(tmp_path / '02-2024.SUA', [
+        registro_sua('00000000001', 'NUÑEZ$ÑANDÚ', DIAS=30, CF=100, RETIRO=500),
+        registro_sua('00000000002', 'BETO', DIAS=30, PD_OBR='0!0', RETIRO=500),
+        registro_sua('00000000003', 'CARLA', DIAS='x1'),
+        registro_sua('00000000004', 'DANIEL', DIAS=0, RETIRO=100),
+        registro_sua('00000000005', 'EMMA', DIAS=15, IV_OBR='1Zz'),
+        registro_sua('00000000006', 'FÉLIX', DIAS='3-'),
+    ])
+    contenido = estructurar_sua_mod.leer_archivo_sua(ruta)
+
+    bloques = list(estructurar_sua_mod.leer_bloques_sua(ruta, tamaño_bloque))
+    inicios = estructurar_sua_mod.localizar_registros_sua(contenido)
+    assert [posicion for posiciones, _ in bloques for posicion in posiciones] == inicios
+    assert [texto for _, textos in bloques for texto in textos] == [
+        contenido[i:i + estructurar_sua_mod.LONGITUD_REGISTRO] for i in inicios
+    ]
+
+    completo = estructurar_sua_mod.estructurar_1sua(ruta)
+    errores_completo = [linea for linea in capsys.readouterr().out.splitlines() if linea.startswith('Error')]
+    (tmp_path / 'temporal').mkdir()
+    por_bloques = estructurar_sua_mod.estructurar_1sua_por_bloques(ruta, str(tmp_path / 'temporal'),
+                                                                   tamaño_bloque=tamaño_bloque)
+    errores_bloques = [linea for linea in capsys.readouterr().out.splitlines() if linea.startswith('Error')]
+
+    # Los registros inválidos se reportan una vez, con su posición en el archivo (por bloques,
+    # los de cada bloque van juntos)
+    assert sorted(errores_bloques) == sorted(errores_completo)
+    assert len(errores_completo) == 5
+    for nombre_hoja in ('SUA_MENSUAL', 'SUA_BIMESTRAL'):
+        assert por_bloques['hojas'][nombre_hoja].collect().equals(completo['hojas'][nombre_hoja])
+    assert sorted(completo['hojas']['SUA_MENSUAL']['NSS']) == ['00000000001', '00000000005']
+    assert sorted(completo['hojas']['SUA_BIMESTRAL']['NSS']) == ['00000000001', '00000000002', '00000000005']
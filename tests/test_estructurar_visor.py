@@ -0,0 +1,162 @@
+from decimal import Decimal
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import polars as pl
+
+from esquemas import DIAS, IMPORTE
+from estructurar_visor import (DISEÑOS_VISOR, estructurar_visor_datos, guardar_visor_excel, leer_archivo_visor,
+                               orden_fecha_reciente)
+
+
+# Referencias: el cálculo línea por línea y por grupo original, antes de la versión columnar
+
+
+def referencia_numero(texto, centavos):
+    ignorados = texto.strip().replace('-', '') if centavos else texto.strip().replace('.', '').replace('-', '')
+    if not ignorados.isdigit():
+        return 0.0
+    return float(texto) / 100 if centavos else float(texto)
+
+
+def referencia_linea(linea, tipo):
+    registro = {}
+    for columna, inicio, fin, tipo_campo in DISEÑOS_VISOR[tipo]['campos']:
+        texto = linea[inicio:fin]
+        if tipo_campo == 'texto':
+            registro[columna] = texto.strip()
+        elif tipo_campo == 'nombre':
+            registro[columna] = texto.strip().replace('$', ' ')
+        elif tipo_campo == 'tipo_credito':
+            registro[columna] = {'0': '-', '1': '%', '2': 'CF', '3': 'VSM'}.get(texto.strip(), texto.strip())
+        elif tipo_campo == 'entero':
+            registro[columna] = int(texto) if texto.strip().isdigit() else 0
+        else:
+            registro[columna] = referencia_numero(texto, tipo_campo == 'centavos')
+    for columna, sumandos in DISEÑOS_VISOR[tipo]['totales']:
+        registro[columna] = sum(registro[sumando] for sumando in sumandos)
+    return registro
+
+
+def get_latest_value(group, value_col, date_col):
+    if group[date_col].isna().all():
+        return group[value_col].iloc[-1]
+    latest_idx = group[date_col].idxmax()
+    return group.loc[latest_idx, value_col]
+
+
+def linea(largo, *campos):
+    """Línea de `largo` caracteres con cada (inicio, texto) en su posición"""
+    caracteres = [' '] * largo
+    for inicio, texto in campos:
+        caracteres[inicio:inicio + len(texto)] = texto
+    return ''.join(caracteres)
+
+
+def test_leer_cdemmo99(tmp_path):
+    lineas = [
+        linea(142, (0, 'A1234567890'), (23, '00000000001'), (35, '1'), (36, '01-02-2024'), (46, '30'),
+              (48, '050025'), (56, '010025'), (64, '-00150'), (72, ' 12345'), (136, '000001')),
+        # Campos vacíos o no numéricos: 0
+        linea(150, (0, 'A1234567890'), (23, '00000000002'), (35, 'x'), (46, ' 7'), (48, 'ABC123'),
+              (56, '      '), (128, '1 2 3 '), (136, '999999')),
+        # Línea corta: se descarta
+        linea(141, (0, 'A1234567890'), (23, '00000000003'), (136, '00001')),
+    ]
+    ruta = tmp_path / 'CDEMMO99.txt'
+    ruta.write_text('\n'.join(lineas) + '\n', encoding='utf-8')
+
+    resultado = leer_archivo_visor(str(ruta), 'cdemmo99')
+    esperado = pd.DataFrame([referencia_linea(texto, 'cdemmo99') for texto in lineas[:2]])
+    assert resultado.to_dict('list') == esperado.to_dict('list')
+    assert resultado['EXC_PAT'].tolist() == [-1.5, 0.0]
+    assert resultado['DIAS'].tolist() == [30, 7]
+
+
+def test_leer_cdebas99(tmp_path):
+    lineas = [
+        linea(150, (0, 'A1234567890'), (21, '00000000001'), (33, 'PEREZ$LOPEZ$JUAN'), (85, '  12.50'),
+              (92, ' 100.25'), (109, '1234567890'), (119, '3'), (120, '   20.505'), (140, '0000000000')),
+        linea(150, (0, 'A1234567890'), (21, '00000000002'), (33, 'ANA'), (92, '-  3.00'), (109, '0000000000'),
+              (119, '0'), (120, 'x'), (140, '0000000000')),
+        # Línea corta sin contar los espacios finales: se descarta
+        linea(160, (0, 'A1234567890'), (21, '00000000003'), (33, 'CARLA'), (119, '1')),
+    ]
+    ruta = tmp_path / 'CDEBAS99.txt'
+    ruta.write_text('\n'.join(lineas), encoding='utf-8')
+
+    resultado = leer_archivo_visor(str(ruta), 'cdebas99')
+    esperado = pd.DataFrame([referencia_linea(texto, 'cdebas99') for texto in lineas[:2]])
+    assert resultado.to_dict('list') == esperado.to_dict('list')
+    assert resultado['NOMBRE ASEGURADO'].tolist() == ['PEREZ LOPEZ JUAN', 'ANA']
+    assert resultado['T_CREDITO'].tolist() == ['VSM', '-']
+    assert resultado['V_CREDITO'].tolist() == [20.505, 0.0]
+    assert resultado['APORTACION_PAT'].tolist() == [12.5, 0.0]
+    assert resultado['AMORTIZACION'].tolist() == [100.25, 0.0]
+    assert resultado['TOTAL_INF'].tolist() == [112.75, 0.0]
+
+
+def test_orden_fecha_reciente():
+    # Índice no consecutivo (como después de filtrar TIP_MOV y quitar duplicados)
+    movimientos = pd.DataFrame({
+        'RP': ['A'] * 9 + ['B'] * 3,
+        'NSS': ['1', '1', '1', '2', '2', '2', '3', '3', '3', '1', '1', '1'],
+        'FECHA_MOV': ['01-02-2024', '15-02-2024', '03-02-2024',
+                      # Misma fecha más alta dos veces: la primera
+                      '10-02-2024', 'xx', '10-02-2024',
+                      # Sin fechas válidas: la última
+                      '-', '', 'yy',
+                      '-', '05-02-2024', '-'],
+        'SDI': [100.0, 200.0, 300.0, 400.0, 500.0, 600.0, 700.0, 800.0, 900.0, 110.0, 120.0, 130.0],
+        'T_CREDITO': ['-', '%', 'VSM', 'CF', '-', '%', 'VSM', 'CF', '-', '%', 'VSM', 'CF'],
+    }, index=np.arange(12) * 3 + 1)
+    movimientos['FECHA_MOV'] = pd.to_datetime(movimientos['FECHA_MOV'], format='%d-%m-%Y', errors='coerce')
+    movimientos['ORDEN_FECHA'] = orden_fecha_reciente(movimientos['FECHA_MOV'])
+
+    agrupado = movimientos.groupby(['RP', 'NSS']).agg({'ORDEN_FECHA': 'idxmax'}).reset_index()
+    referencia = movimientos.groupby(['RP', 'NSS'])[['SDI', 'T_CREDITO', 'FECHA_MOV']].apply(
+        lambda grupo: pd.Series({columna: get_latest_value(grupo, columna, 'FECHA_MOV')
+                                 for columna in ['SDI', 'T_CREDITO']})
+    ).reset_index()
+
+    for columna in ['SDI', 'T_CREDITO']:
+        assert movimientos.loc[agrupado['ORDEN_FECHA'], columna].tolist() == referencia[columna].tolist()
+    assert referencia['SDI'].tolist() == [200.0, 400.0, 900.0, 120.0]
+
+
+def test_hojas_con_esquema(tmp_path):
+    (tmp_path / 'CDEMMO99.txt').write_text(
+        linea(142, (0, 'A1234567890'), (23, '00000000001'), (35, '1'), (36, '01-02-2024'), (46, '30'),
+              (48, '050025'), (56, '010025'), (136, '000001')) + '\n', encoding='utf-8')
+    (tmp_path / 'CDEBMO99.txt').write_text('\n'.join(
+        linea(100, (0, 'A1234567890'), (21, nss), (33, '1'), (34, '01-02-2024'), (44, '30'), (46, '050025'),
+              (54, '001000'), (85, '  12.50'), (92, '  100.25'))
+        for nss in ('00000000001', '00000000002')
+    ) + '\n', encoding='utf-8')
+    # Con crédito (VSM, 20.505) y sin crédito ('-' en lugar de 0)
+    (tmp_path / 'CDEBAS99.txt').write_text('\n'.join([
+        linea(150, (0, 'A1234567890'), (21, '00000000001'), (33, 'PEREZ$JUAN'), (109, '1234567890'),
+              (119, '3'), (120, '   20.505'), (140, '0000000000')),
+        linea(150, (0, 'A1234567890'), (21, '00000000002'), (33, 'ANA'), (109, '0000000000'),
+              (119, '0'), (140, '0000000000')),
+    ]) + '\n', encoding='utf-8')
+
+    estructurado = estructurar_visor_datos(str(tmp_path))
+    hojas = estructurado['hojas']
+    for nombre_hoja in ('EMA', 'EBA'):
+        assert isinstance(hojas[nombre_hoja], pl.DataFrame)
+        assert hojas[nombre_hoja].schema['RP'] == pl.Categorical
+        assert hojas[nombre_hoja].schema['DIAS'] == DIAS
+        assert hojas[nombre_hoja].schema['SDI'] == IMPORTE
+    assert hojas['EMA']['CF'].to_list() == [Decimal('100.25')]
+    assert hojas['EBA'].sort('NSS').select('NSS', 'T_CREDITO', 'V_CREDITO', 'N_CREDITO', 'TOTAL_INF').rows() == [
+        ('00000000001', 'VSM', 20.505, '1234567890', Decimal('112.75')),
+        ('00000000002', '-', None, '-', Decimal('112.75')),
+    ]
+
+    # En el Excel, sin crédito se muestra '-' como en la versión anterior
+    ruta_excel = guardar_visor_excel(estructurado, str(tmp_path))
+    filas = list(openpyxl.load_workbook(ruta_excel, read_only=True)['EBA'].values)
+    v_credito = filas[0].index('V_CREDITO')
+    assert sorted((fila[1], fila[v_credito]) for fila in filas[1:]) == [('00000000001', 20.505), ('00000000002', '-')]
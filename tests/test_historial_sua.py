@@ -0,0 +1,79 @@
+import polars as pl
+
+import estructurar_sua_mod
+import historial_sua
+from datos_sua import escribir_sua, registro_sua
+from estructurar_sua_mod import cargar_sua_historial, estructurar_suas
+
+
+def carpeta_sua(carpeta, *archivos):
+    """Carpeta con un .SUA por cada (rp, lista de (nss, nombre))"""
+    carpeta.mkdir(exist_ok=True)
+    for numero, (rp, trabajadores) in enumerate(archivos):
+        escribir_sua(carpeta / f'{numero}.SUA', [registro_sua(nss, nombre, rp=rp, DIAS=30, CF=100)
+                                                 for nss, nombre in trabajadores], rp=rp)
+    return str(carpeta)
+
+
+def test_agregar_por_lote(tmp_path, monkeypatch):
+    guardados = []
+    monkeypatch.setattr(estructurar_sua_mod, 'guardar_ingeridos',
+                        lambda ingeridos: guardados.append(historial_sua.guardar_ingeridos(ingeridos)))
+    carpeta = carpeta_sua(tmp_path / 'suas', ('A1234567890', [('00000000001', 'ANA')]),
+                          ('B1234567890', [('00000000002', 'BETO')]), ('C1234567890', [('00000000003', 'CARLA')]))
+
+    estructurar_suas(carpeta, procesos=1, historial=True)
+    # El registro de archivos agregados se escribe una vez por lote
+    assert len(guardados) == 1
+    assert len(historial_sua.leer_ingeridos()) == 3
+
+    consulta = historial_sua.consultar_historial()
+    assert consulta.select('NSS', 'periodo', 'registro_patronal').sort('NSS').collect().rows() == [
+        ('00000000001', '2024-02', 'A1234567890'),
+        ('00000000002', '2024-02', 'B1234567890'),
+        ('00000000003', '2024-02', 'C1234567890'),
+    ]
+
+    # Los archivos sin cambios se reconocen sin volver a calcular su huella
+    def sin_huella(ruta):
+        raise AssertionError('no se esperaba leer el archivo completo')
+    monkeypatch.setattr(estructurar_sua_mod, 'huella_archivo', sin_huella)
+    estructurar_suas(carpeta, procesos=1, historial=True)
+    assert len(guardados) == 1
+
+
+def test_sua_corregido_reemplaza_al_anterior(tmp_path, capsys):
+    original = carpeta_sua(tmp_path / 'original', ('A1234567890', [('00000000001', 'ANA'), ('00000000002', 'BETO')]),
+                           ('B1234567890', [('00000000009', 'OTRO RP')]))
+    corregido = carpeta_sua(tmp_path / 'corregido', ('A1234567890', [('00000000001', 'ANA'), ('00000000003', 'CARLA')]))
+
+    estructurar_suas(original, procesos=1, historial=True)
+    estructurar_suas(corregido, procesos=1, historial=True)
+
+    # Solo cuenta el SUA corregido del mismo periodo y registro patronal; el otro RP se conserva
+    hoja = cargar_sua_historial('02', '2024')['hojas']['SUA_MENSUAL']
+    assert hoja.sort('NSS')['NSS'].to_list() == ['00000000001', '00000000003', '00000000009']
+    assert historial_sua.periodos_en_historial()['archivos'].to_list() == [1, 1]
+
+    # El archivo reemplazado no se vuelve a agregar
+    capsys.readouterr()
+    estructurar_suas(original, procesos=1, historial=True)
+    assert '0.SUA ya está en el historial' in capsys.readouterr().out
+    hoja = cargar_sua_historial('02', '2024', ['A1234567890'])['hojas']['SUA_MENSUAL']
+    assert hoja['NSS'].sort().to_list() == ['00000000001', '00000000003']
+    assert hoja['RP'].dtype == pl.Categorical
+
+
+def test_sua_complementario_se_conserva(tmp_path):
+    # Un SUA normal y su complementario del mismo periodo y registro patronal, en una carpeta
+    carpeta = tmp_path / 'suas'
+    carpeta.mkdir()
+    escribir_sua(carpeta / 'normal.SUA', [registro_sua('00000000001', 'ANA', DIAS=30, CF=100)])
+    escribir_sua(carpeta / 'complementario.SUA', [registro_sua('00000000002', 'BETO', DIAS=30, CF=100)])
+
+    estructurar_suas(str(carpeta), procesos=1, historial=True)
+
+    consulta = historial_sua.consultar_historial()
+    assert consulta.select('NSS').sort('NSS').collect()['NSS'].to_list() == ['00000000001', '00000000002']
+    assert historial_sua.periodos_en_historial()['archivos'].to_list() == [2]
+    assert not any('reemplazado_por' in datos for datos in historial_sua.leer_ingeridos().values())
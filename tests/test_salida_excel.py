@@ -0,0 +1,23 @@
+import polars as pl
+
+from salida_excel import filas_dataframe, lotes_consulta
+
+
+def test_lotes_consulta(tmp_path):
+    ruta = tmp_path / 'hoja.parquet'
+    pl.DataFrame({'NSS': [f'{numero:011d}' for numero in range(10_000)], 'DIAS': [numero % 31 for numero in range(10_000)]}
+                 ).write_parquet(ruta, row_group_size=700)
+    consulta = pl.scan_parquet(ruta).filter(pl.col('DIAS') != 0).sort('DIAS', 'NSS', descending=[True, False])
+
+    lotes = list(lotes_consulta(consulta, filas=1_000))
+    assert len(lotes) > 1
+    assert pl.concat(lotes).equals(consulta.collect())
+    assert list(filas_dataframe(consulta)) == consulta.collect().rows()
+
+
+def test_vacios_excel():
+    # V_CREDITO sin crédito es nulo en la hoja y '-' en Excel; las demás columnas quedan en blanco
+    hoja = pl.DataFrame({'V_CREDITO': [20.5, None, float('nan')], 'SDI': [1.0, None, 2.0]})
+    esperado = [(20.5, 1.0), ('-', None), ('-', 2.0)]
+    assert list(filas_dataframe(hoja)) == esperado
+    assert list(filas_dataframe(hoja.to_pandas())) == esperado